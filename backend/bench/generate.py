@@ -0,0 +1,154 @@
+"""Deterministic synthetic dataset for benchmarks and load tests.
+
+Fills DIR/data with several years of realistic days (busy weekdays, sparse
+weekends, back-to-back blocks of work on a skewed set of projects), the
+matching settings with colors, a running timer and ready-built indexes.
+The same seed and options always produce the same data.
+
+    cd backend
+    python -m bench.generate /tmp/tt-bench --years 5 --seed 1
+    STORAGE_ENGINE=sqlite python -m bench.generate /tmp/tt-bench-sqlite
+
+Use the same STORAGE_ENGINE as the server that will read the data.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date as date_cls, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ["Development", "Meetings", "Code Review", "Design", "Support", "Planning", "Research", "Admin"]
+WORDS = ["fix", "refactor", "review", "deploy", "sync", "investigate", "document", "test", "migrate",
+         "login", "billing", "invoice", "dashboard", "export", "search", "report", "calendar", "api",
+         "database", "cache", "timer", "sidebar", "onboarding", "release", "bug", "flaky", "build"]
+
+
+def make_projects(rng: random.Random, count: int) -> list[str]:
+    prefixes = ["Atlas", "Beacon", "Cobalt", "Delta", "Ember", "Falcon", "Granite", "Harbor", "Iris", "Juniper"]
+    suffixes = ["App", "API", "Website", "Platform", "Migration", "Redesign", "Internal", "Client"]
+    names = []
+    while len(names) < count:
+        name = f"{rng.choice(prefixes)} {rng.choice(suffixes)}"
+        if name in names:
+            name = f"{name} {len(names)}"
+        names.append(name)
+    return names
+
+
+def make_day(rng: random.Random, day: date_cls, projects: list[str], weights: list[float], entries_per_day: int) -> list:
+    """Back-to-back blocks of work from a morning start, with short gaps"""
+    weekend = day.weekday() >= 5
+    if weekend and rng.random() > 0.2:
+        return []
+    count = rng.randint(0, 3) if weekend else max(1, int(rng.gauss(entries_per_day, entries_per_day / 3)))
+    clock = datetime(day.year, day.month, day.day, 7, 30, tzinfo=timezone.utc) + timedelta(minutes=rng.randint(0, 120))
+    entries = []
+    for _ in range(count):
+        minutes = rng.choice([15, 25, 30, 45, 60, 60, 90, 120, 180])
+        start = clock
+        end = start + timedelta(minutes=minutes)
+        if end.date() != day:
+            break
+        ticket = f"{rng.choice('ABCDEFGH')}{rng.choice('ABCDEFGH')}-{rng.randint(1, 999)}"
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5)))
+        entries.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "project": rng.choices(projects, weights)[0],
+            "category": rng.choice(CATEGORIES),
+            "description": f"{ticket} {words}" if rng.random() < 0.7 else words,
+            "start_time": start.isoformat(),
+            "end_time": end.isoformat(),
+            "duration": minutes * 60,
+            "date": day.isoformat(),
+        })
+        clock = end + timedelta(minutes=rng.choice([0, 0, 5, 10, 15, 30, 60]))
+    return entries
+
+
+def generate(directory: str, years: float, seed: int, entries_per_day: int, project_count: int, end: date_cls) -> dict:
+    """Write the dataset into directory/data and return what was written"""
+    os.makedirs(os.path.join(directory, "data"), exist_ok=True)
+    os.chdir(directory)
+    # Imported here: the route module opens the storage engine relative to the working directory
+    from routes import timers
+
+    rng = random.Random(seed)
+    projects = make_projects(rng, project_count)
+    # A few projects take most of the time, like real work does
+    weights = [1 / (rank + 1) for rank in range(len(projects))]
+    first = end - timedelta(days=int(years * 365))
+    timers.storage.start()
+    days = entries = 0
+    day = first
+    while day <= end:
+        day_entries = make_day(rng, day, projects, weights, entries_per_day)
+        if day_entries:
+            timers.storage.save_day(day.isoformat(), {
+                "date": day.isoformat(),
+                "entries": day_entries,
+                "total_duration": sum(entry["duration"] for entry in day_entries),
+            })
+            days += 1
+            entries += len(day_entries)
+        day += timedelta(days=1)
+
+    project_colors = {}
+    category_colors = {}
+    for project in projects:
+        project_colors[project] = timers.get_color_for_project(project, project_colors, category_colors)
+    for category in CATEGORIES:
+        category_colors[category] = timers.get_color_for_category(category, category_colors, project_colors)
+    timers.storage.save_settings({
+        "projects": projects,
+        "categories": CATEGORIES,
+        "project_colors": project_colors,
+        "category_colors": category_colors,
+    })
+    started = datetime.now(timezone.utc) - timedelta(minutes=rng.randint(5, 90))
+    timers.storage.save_active_timer({
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "project": projects[0],
+        "category": CATEGORIES[0],
+        "description": "benchmark running timer",
+        "start_time": started.isoformat(),
+        "date": started.strftime("%Y-%m-%d"),
+    })
+
+    # Build the persisted indexes now so the first server start doesn't have to
+    timers.load_entry_index()
+    timers.load_rollups()
+    timers.load_change_log()
+    timers.load_search_index()
+    timers.storage.close()
+    return {"first": first.isoformat(), "last": end.isoformat(), "days": days, "entries": entries,
+            "projects": len(projects), "categories": len(CATEGORIES)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="directory to create data/ in")
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--entries-per-day", type=int, default=8, help="average entries on a weekday")
+    parser.add_argument("--projects", type=int, default=25)
+    parser.add_argument("--end", default=None, help="last day (YYYY-MM-DD, default today)")
+    args = parser.parse_args()
+
+    directory = os.path.abspath(args.directory)
+    if os.path.isdir(os.path.join(directory, "data")) and os.listdir(os.path.join(directory, "data")):
+        print(f"{directory}/data is not empty; pick a new directory")
+        return 1
+    end = date_cls.fromisoformat(args.end) if args.end else date_cls.today()
+    started = time.perf_counter()
+    summary = generate(directory, args.years, args.seed, args.entries_per_day, args.projects, end)
+    print(f"Wrote {summary['entries']} entries over {summary['days']} days "
+          f"({summary['first']} to {summary['last']}) in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""Concurrent load driver that replays what the frontend asks for.
+
+Each client thread loops over weighted scenarios taken from the frontend:
+
+  week    Calendar/Reports opening a week: GET /timers/week/{monday},
+          /stats/week/{monday}, /settings/colors and /timer/active, sending
+          back ETags like a browser cache does
+  crawl   the Projects page loading the last 90 days: GET /timers/range
+  typing  editing the running timer: a burst of PATCH /timer/active, one per
+          keystroke of the description
+
+and reports p50/p95/p99 and throughput per endpoint. By default a uvicorn
+server is started on the dataset; --url targets one that is already
+running and --in-process uses TestClient instead.
+
+    cd backend
+    python -m bench.generate /tmp/tt-bench
+    python -m bench.load /tmp/tt-bench --clients 16 --duration 30 --output load.json
+    python -m bench.load /tmp/tt-bench --clients 16 --duration 30 --compare load.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import date as date_cls, timedelta
+from urllib.parse import urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench.report import compare, print_table, save_results, summarize  # noqa: E402
+
+DEFAULT_MIX = "week=6,crawl=1,typing=3"
+CRAWL_DAYS = 90
+
+
+class HttpSession:
+    """One keep-alive connection, like a browser tab"""
+
+    def __init__(self, host: str, port: int, prefix: str):
+        self.host = host
+        self.port = port
+        self.prefix = prefix
+        self.conn = None
+
+    def request(self, method: str, path: str, body: dict | None = None, headers: dict | None = None) -> tuple:
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.conn.request(method, self.prefix + path, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                return response.status, response.read(), response.getheader("ETag")
+            except (http.client.HTTPException, OSError):
+                # The server closed an idle keep-alive connection; reconnect once
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+
+
+class TestClientSession:
+    def __init__(self, client):
+        self.client = client
+
+    def request(self, method: str, path: str, body: dict | None = None, headers: dict | None = None) -> tuple:
+        response = self.client.request(method, "/api" + path, json=body, headers=headers)
+        return response.status_code, response.content, response.headers.get("etag")
+
+    def close(self) -> None:
+        pass
+
+
+class Recorder:
+    """Latencies and error counts per endpoint, shared by all client threads"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, ok: bool) -> None:
+        if not self.recording:
+            return
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+class Client:
+    def __init__(self, session, recorder: Recorder, rng: random.Random, today: date_cls, weeks: int):
+        self.session = session
+        self.recorder = recorder
+        self.rng = rng
+        self.today = today
+        self.weeks = weeks
+        self.etags = {}
+
+    def call(self, name: str, method: str, path: str, body: dict | None = None, expect=(200,)) -> tuple:
+        headers = {}
+        if method == "GET" and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        started = time.perf_counter()
+        try:
+            status, content, etag = self.session.request(method, path, body, headers)
+        except (http.client.HTTPException, OSError):
+            self.recorder.add(name, time.perf_counter() - started, False)
+            return None, b""
+        self.recorder.add(name, time.perf_counter() - started, status in expect or status == 304)
+        if etag:
+            self.etags[path] = etag
+        return status, content
+
+    def week(self) -> None:
+        # Mostly the current and recent weeks, sometimes one further back
+        back = min(int(self.rng.expovariate(0.5)), self.weeks)
+        monday = self.today - timedelta(days=self.today.weekday(), weeks=back)
+        self.call("GET /timers/week/{date}", "GET", f"/timers/week/{monday.isoformat()}")
+        self.call("GET /stats/week/{date}", "GET", f"/stats/week/{monday.isoformat()}")
+        self.call("GET /settings/colors", "GET", "/settings/colors")
+        self.call("GET /timer/active", "GET", "/timer/active")
+
+    def crawl(self) -> None:
+        start = self.today - timedelta(days=CRAWL_DAYS - 1)
+        self.call("GET /timers/range (90 days)", "GET", f"/timers/range?from={start.isoformat()}&to={self.today.isoformat()}")
+
+    def typing(self) -> None:
+        word = "".join(self.rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(self.rng.randint(3, 10)))
+        for length in range(1, len(word) + 1):
+            status, _ = self.call("PATCH /timer/active", "PATCH", "/timer/active",
+                                  {"description": f"typing {word[:length]}"}, expect=(200, 404))
+            if status == 404:
+                ensure_active_timer(self.session)
+
+
+def ensure_active_timer(session) -> None:
+    """Start a timer if none is running, so keystroke PATCHes have something to edit"""
+    status, content, _ = session.request("GET", "/timer/active")
+    if status == 200 and not json.loads(content).get("active"):
+        session.request("POST", "/timer/start?project=Benchmark&category=Development&description=typing")
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("week", "crawl", "typing"):
+            raise SystemExit(f"Unknown scenario in --mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(directory: str, workers: int) -> tuple:
+    """Run uvicorn on the dataset directory and wait until it answers"""
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--log-level", "warning", "--no-access-log"]
+    if workers > 1:
+        command += ["--workers", str(workers)]
+    process = subprocess.Popen(command, cwd=directory, env=env)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("The server exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process, f"http://127.0.0.1:{port}/api"
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("The server did not start within 120s")
+
+
+def run(make_session, args) -> tuple:
+    mix = parse_mix(args.mix)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    recorder = Recorder()
+    stop = threading.Event()
+    today = date_cls.fromisoformat(args.end) if args.end else date_cls.today()
+
+    setup = make_session()
+    ensure_active_timer(setup)
+    setup.close()
+
+    def worker(n: int) -> None:
+        session = make_session()
+        client = Client(session, recorder, random.Random(args.seed * 1000 + n), today, args.weeks)
+        try:
+            while not stop.is_set():
+                getattr(client, client.rng.choices(names, weights)[0])()
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+    recorder.recording = True
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    recorder.recording = False
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    results = {}
+    everything = []
+    for name in sorted(recorder.samples):
+        samples = recorder.samples[name]
+        everything += samples
+        results[name] = summarize(samples, recorder.errors.get(name, 0), elapsed)
+    results["all"] = summarize(everything, sum(recorder.errors.values()), elapsed)
+    return results, elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", help="dataset directory from bench.generate (not needed with --url)")
+    parser.add_argument("--url", help="API base of a running server, e.g. http://127.0.0.1:8000/api")
+    parser.add_argument("--in-process", action="store_true", help="drive the app through TestClient instead of HTTP")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the started server")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of load before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--weeks", type=int, default=52, help="how far back week views may go")
+    parser.add_argument("--end", default=None, help="last day of the dataset (YYYY-MM-DD, default today)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="save results as JSON")
+    parser.add_argument("--compare", help="compare with a saved JSON result")
+    args = parser.parse_args()
+    if not args.url and not args.directory:
+        parser.error("give a dataset directory or --url")
+
+    server = None
+    client = None
+    if args.url:
+        target = args.url
+    elif args.in_process:
+        target = "TestClient"
+        os.chdir(args.directory)
+        from fastapi.testclient import TestClient
+        from main import app
+        client = TestClient(app)
+        client.__enter__()
+    else:
+        server, target = start_server(os.path.abspath(args.directory), args.workers)
+
+    if client is not None:
+        def make_session():
+            return TestClientSession(client)
+    else:
+        parts = urlsplit(target)
+        def make_session():
+            return HttpSession(parts.hostname, parts.port or 80, parts.path.rstrip("/"))
+
+    try:
+        print(f"{args.clients} clients for {args.duration:g}s against {target} (mix {args.mix})")
+        results, elapsed = run(make_session, args)
+    finally:
+        if client is not None:
+            client.__exit__(None, None, None)
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print_table(results)
+    if args.compare:
+        compare(args.compare, results)
+    if args.output:
+        params = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+        save_results(args.output, "load", params, results)
+    return 0 if not results["all"]["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Micro-benchmarks of the storage hot paths on a generated dataset.
+
+Times the functions the routes lean on, without HTTP in the way:
+load_day_data with a cold and a warm cache, get_week_stats, find_entry
+(the lookup behind PUT/DELETE /timers/{id}) and the project/category
+color helpers.
+
+    cd backend
+    python -m bench.generate /tmp/tt-bench
+    python -m bench.micro /tmp/tt-bench --output micro.json
+    python -m bench.micro /tmp/tt-bench --compare micro.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.report import compare, print_table, save_results, summarize  # noqa: E402
+
+timers = None
+
+
+def clear_caches() -> None:
+    """Empty the day/settings cache of engines that have one, so the next read hits the disk"""
+    engine = timers.storage
+    for owner in (engine, getattr(engine, "base", None)):
+        cache = getattr(owner, "cache", None)
+        if cache is not None:
+            cache.clear()
+
+
+def measure(fn, args_list: list, before=None) -> dict:
+    """Call fn once per argument tuple and summarize the per-call latencies"""
+    samples = []
+    for args in args_list:
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def fake_request():
+    from starlette.requests import Request
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+
+
+def run(rng: random.Random, iterations: int) -> dict:
+    dates = timers.list_day_dates()
+    if not dates:
+        raise SystemExit("No days found; run bench.generate first")
+    timers.load_entry_index()
+    timers.load_rollups()
+    sample_dates = [(rng.choice(dates),) for _ in range(iterations)]
+    results = {}
+
+    results["load_day_data cold"] = measure(timers.load_day_data, sample_dates, before=clear_caches)
+    for (date,) in sample_dates:
+        timers.load_day_data(date)
+    results["load_day_data warm"] = measure(timers.load_day_data, sample_dates)
+
+    loop = asyncio.new_event_loop()
+    request = fake_request()
+    mondays = []
+    for (date,) in sample_dates:
+        day = datetime.strptime(date, "%Y-%m-%d")
+        mondays.append(((day - timedelta(days=day.weekday())).strftime("%Y-%m-%d"),))
+    results["get_week_stats"] = measure(
+        lambda monday: loop.run_until_complete(timers.get_week_stats(monday, request)), mondays)
+    loop.close()
+
+    entry_ids = []
+    for (date,) in sample_dates:
+        entries = timers.load_day_data(date)["entries"]
+        if entries:
+            entry_ids.append((rng.choice(entries)["id"],))
+    results["find_entry"] = measure(timers.find_entry, entry_ids)
+    results["find_entry missing"] = measure(timers.find_entry, [(f"missing-{n}",) for n in range(iterations)])
+
+    settings = timers.load_settings()
+    project_colors = dict(settings.get("project_colors", {}))
+    category_colors = dict(settings.get("category_colors", {}))
+    names = [(f"New project {n}", project_colors, category_colors) for n in range(iterations)]
+    results["get_color_for_project"] = measure(timers.get_color_for_project, names)
+    names = [(f"New category {n}", category_colors, project_colors) for n in range(iterations)]
+    results["get_color_for_category"] = measure(timers.get_color_for_category, names)
+    return results
+
+
+def main() -> int:
+    global timers
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="dataset directory from bench.generate")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="save results as JSON")
+    parser.add_argument("--compare", help="compare with a saved JSON result")
+    args = parser.parse_args()
+
+    os.chdir(args.directory)
+    # Imported here: the route module opens the storage engine relative to the working directory
+    from routes import timers
+    timers.storage.start()
+    try:
+        results = run(random.Random(args.seed), args.iterations)
+    finally:
+        timers.storage.close()
+
+    print(f"{args.iterations} calls each, engine {timers.storage.name}:")
+    print_table(results)
+    if args.compare:
+        compare(args.compare, results)
+    if args.output:
+        save_results(args.output, "micro", {"directory": os.path.abspath(args.directory),
+                                            "iterations": args.iterations, "seed": args.seed}, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
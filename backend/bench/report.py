@@ -0,0 +1,81 @@
+"""Latency summaries and JSON result files shared by the benchmarks"""
+import json
+import os
+import platform
+import subprocess
+import time
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, round(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(samples: list[float], errors: int = 0, elapsed: float | None = None) -> dict:
+    """Count, mean and p50/p95/p99/max of latencies in seconds, reported in milliseconds"""
+    ordered = sorted(samples)
+    summary = {
+        "count": len(ordered),
+        "errors": errors,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+    if elapsed:
+        summary["throughput_rps"] = round(len(ordered) / elapsed, 1)
+    return summary
+
+
+def print_table(results: dict) -> None:
+    print(f"  {'':<34} {'count':>7} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for name, summary in results.items():
+        print(f"  {name:<34} {summary['count']:>7} {summary['errors']:>5} {summary['p50_ms']:>9.3f} "
+              f"{summary['p95_ms']:>9.3f} {summary['p99_ms']:>9.3f} {summary.get('throughput_rps', ''):>8}")
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path: str, benchmark: str, params: dict, results: dict) -> None:
+    """Write results with enough context (revision, engine, machine) to compare runs later"""
+    document = {
+        "benchmark": benchmark,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": git_revision(),
+        "engine": os.getenv("STORAGE_ENGINE", "json"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    print(f"Results saved to {path}")
+
+
+def compare(path: str, results: dict) -> None:
+    """Print how each result's p50/p95 moved against a saved run"""
+    with open(path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"Compared with {path} (revision {baseline.get('revision')}):")
+    for name, summary in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            print(f"  {name:<34} (new)")
+            continue
+        changes = []
+        for key in ("p50_ms", "p95_ms"):
+            if old[key]:
+                changes.append(f"{key[:3]} {old[key]:.3f} -> {summary[key]:.3f} ms ({(summary[key] / old[key] - 1) * 100:+.0f}%)")
+        print(f"  {name:<34} " + ", ".join(changes))
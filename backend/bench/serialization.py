@@ -0,0 +1,131 @@
+"""Benchmark for JSON serialization on the hot read and write paths.
+
+Compares, on a synthetic day of entries:
+
+- response bodies built the old way (entries validated into the response
+  models, then encoded by the standard library) with the direct path the
+  routes use now (stored dicts encoded as they are)
+- day files written pretty-printed by the standard library with the
+  compact files written now, including parse time and size on disk
+- end-to-end GET /timers/{date} and /timers/week/{date} through the app
+
+    cd backend
+    python -m bench.serialization --entries 40 --rounds 2000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.timer import DayActivitySummary, TimerEntry  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from storage import serialization  # noqa: E402
+
+
+def make_day(date: str, entries: int) -> dict:
+    start = datetime.strptime(date, "%Y-%m-%d").replace(hour=8, tzinfo=timezone.utc)
+    day = []
+    for n in range(entries):
+        begin = start + timedelta(minutes=15 * n)
+        day.append({
+            "id": f"{date}-{n:04d}",
+            "project": f"Project {n % 7}",
+            "category": f"Category {n % 3}",
+            "description": f"Synthetic entry {n} for the serialization benchmark",
+            "start_time": begin.isoformat(),
+            "end_time": (begin + timedelta(minutes=10)).isoformat(),
+            "duration": 600,
+            "date": date,
+        })
+    return {"date": date, "entries": day, "total_duration": 600 * entries}
+
+
+def timed(fn, rounds: int) -> float:
+    """Mean microseconds per call"""
+    fn()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def report(label: str, before: float, after: float, unit: str = "us") -> None:
+    print(f"  {label:<28} {before:>10.1f} {unit} -> {after:>9.1f} {unit}  ({before / after:.1f}x)")
+
+
+def bench_responses(day: dict, rounds: int) -> None:
+    adapter = TypeAdapter(DayActivitySummary)
+
+    def validated():
+        # What FastAPI did with the model the route returned: dump it,
+        # validate it against response_model, serialize it, then json.dumps
+        summary = DayActivitySummary(date=day["date"], total_duration=day["total_duration"],
+                                     entries=[TimerEntry(**entry) for entry in day["entries"]])
+        content = adapter.validate_python(summary.model_dump())
+        content = adapter.dump_python(content, mode="json")
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def direct():
+        return serialization.dumps(day)
+
+    print(f"response body ({len(day['entries'])} entries, {serialization.backend()})")
+    report("day", timed(validated, rounds), timed(direct, rounds))
+
+
+def bench_files(day: dict, rounds: int) -> None:
+    pretty = json.dumps(day, indent=2).encode("utf-8")
+    compact = serialization.dumps(day)
+    print("day file")
+    report("encode", timed(lambda: json.dumps(day, indent=2).encode("utf-8"), rounds),
+           timed(lambda: serialization.dumps(day), rounds))
+    report("parse", timed(lambda: json.loads(pretty), rounds), timed(lambda: serialization.loads(compact), rounds))
+    report("size", len(pretty), len(compact), unit="B")
+
+
+def bench_http(day: dict, rounds: int) -> None:
+    from fastapi.testclient import TestClient
+    import main
+    from routes import timers
+
+    date = day["date"]
+    week = [(datetime.strptime(date, "%Y-%m-%d") + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
+    with TestClient(main.app) as client:
+        for other in week:
+            data = make_day(other, len(day["entries"]))
+            timers.save_day_data(other, data)
+        print("end to end (TestClient, no ETag)")
+        for label, url in (("GET /timers/{date}", f"/api/timers/{date}"),
+                           ("GET /timers/week/{date}", f"/api/timers/week/{date}")):
+            per_call = timed(lambda: client.get(url), rounds // 4)
+            print(f"  {label:<28} {per_call:>10.1f} us")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=40, help="entries per day")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    day = make_day("2024-03-04", args.entries)
+    bench_responses(day, args.rounds)
+    bench_files(day, args.rounds)
+
+    workdir = tempfile.mkdtemp(prefix="bench-serialization-")
+    os.chdir(workdir)
+    os.makedirs("data")
+    try:
+        bench_http(day, args.rounds)
+    finally:
+        os.chdir("/")
+        shutil.rmtree(workdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
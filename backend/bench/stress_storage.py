@@ -0,0 +1,92 @@
+"""Stress test for the storage layer.
+
+Hammers a single date from many threads through the real route functions
+and checks that no entry is lost, then repeats with writers spread over
+several dates to show that they no longer serialize on each other.
+
+    cd backend
+    python -m bench.stress_storage --threads 32 --writes 50
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.timer import TimerCreate  # noqa: E402
+from routes import tenants, timers  # noqa: E402
+
+
+def make_timer(date: str, n: int) -> TimerCreate:
+    start = datetime.strptime(date, "%Y-%m-%d").replace(hour=9, tzinfo=timezone.utc)
+    return TimerCreate(project=f"Project {n % 5}", category="Stress", description=f"write {n}",
+                       start_time=start, end_time=start, duration=60, date=date)
+
+
+def hammer(dates: list[str], threads: int, writes: int) -> float:
+    """Create threads * writes entries round-robin over dates; return elapsed seconds"""
+    def worker(t: int) -> None:
+        for i in range(writes):
+            date = dates[(t + i) % len(dates)]
+            # The route is async; call the blocking body it runs on the I/O pool
+            timers.create_timer.__wrapped__(make_timer(date, t * writes + i))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    return time.perf_counter() - started
+
+
+def check(dates: list[str], expected: int) -> bool:
+    """Verify every day loads and the entry count and totals add up"""
+    stored = 0
+    for date in dates:
+        day_data = timers.load_day_data(date)
+        entries = day_data["entries"]
+        if day_data["total_duration"] != sum(entry["duration"] for entry in entries):
+            print(f"  {date}: total_duration out of sync")
+            return False
+        stored += len(entries)
+    print(f"  stored {stored}/{expected} entries")
+    return stored == expected
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--writes", type=int, default=50, help="writes per thread")
+    parser.add_argument("--dates", type=int, default=8, help="dates for the spread-out run")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="stress-storage-")
+    os.chdir(workdir)
+    os.makedirs(tenants.DATA_DIR)
+    timers.load_entry_index()
+    expected = args.threads * args.writes
+    ok = True
+    try:
+        single = ["2024-01-01"]
+        elapsed = hammer(single, args.threads, args.writes)
+        print(f"one date:  {expected} writes in {elapsed:.2f}s ({expected / elapsed:.0f}/s)")
+        ok &= check(single, expected)
+
+        spread = [f"2024-02-{day:02d}" for day in range(1, args.dates + 1)]
+        elapsed = hammer(spread, args.threads, args.writes)
+        print(f"{len(spread)} dates:   {expected} writes in {elapsed:.2f}s ({expected / elapsed:.0f}/s)")
+        ok &= check(spread, expected)
+    finally:
+        timers.storage.close()
+        os.chdir("/")
+        shutil.rmtree(workdir)
+
+    print("OK" if ok else "FAILED: entries were lost or corrupted")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,35 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from routes.timers import router as timers_router
+from routes.events import router as events_router
+from routes.metrics import PROMETHEUS_CONTENT_TYPE, RequestMetrics, metrics
+from routes.tenants import STORAGE_ENGINE, TENANT_MODE, WORKERS, TenantScope, registry
+from routes.timers import router as timers_router, catch_up_async, io_pool, storage, warm_up
 import os
 
-app = FastAPI(title="Time Tracking App")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WORKERS > 1 and STORAGE_ENGINE == "wal":
+        raise RuntimeError("STORAGE_ENGINE=wal keeps unsaved changes in memory; run it with WORKERS=1")
+    if TENANT_MODE == "off":
+        # Recover the storage engine, load (or rebuild) the entry id -> date
+        # index, stats rollups, change log and search index, and preload
+        # recent days before serving requests. Tenants are opened the same
+        # way (without the preload) as their first requests arrive instead
+        registry.default()
+        warm_up()
+    yield
+    # End open event streams so clients reconnect to the next process,
+    # checkpoint pending active timer edits, then flush anything the engines
+    # still hold in memory (e.g. WAL compaction)
+    registry.end_streams()
+    registry.close()
+
+app = FastAPI(title="Time Tracking App", lifespan=lifespan)
+
+# Routes /api requests to the tenant named by their header or token when
+# TENANT_MODE is on (see routes/tenants.py); inside CORS so preflights pass
+app.add_middleware(TenantScope)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -12,19 +38,49 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile"],
 )
 
+# Per-route latency and storage I/O for /metrics; with REQUEST_PROFILING=1 a
+# request sent with "X-Profile: 1" is also profiled (see routes/metrics.py)
+app.add_middleware(RequestMetrics)
+
 # Create data directory if it doesn't exist
 os.makedirs("data", exist_ok=True)
 
 # Include routes
-app.include_router(timers_router, prefix="/api", tags=["timers"])
+# Each request first picks up changes other worker processes saved
+app.include_router(timers_router, prefix="/api", tags=["timers"], dependencies=[Depends(catch_up_async)])
+app.include_router(events_router, prefix="/api", tags=["events"])
 
 @app.get("/")
 def read_root():
     return {"message": "Time Tracking App API"}
 
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Request, storage and cache metrics in the Prometheus text format"""
+    gauges = {
+        "io_pool": {"threads": len(io_pool._threads), "queued": io_pool._work_queue.qsize()},
+        "tenants": registry.stats(),
+    }
+    if TENANT_MODE == "off":
+        gauges["storage"] = storage.stats()
+    return Response(metrics.render(gauges), media_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
+
+    class Server(uvicorn.Server):
+        def handle_exit(self, sig, frame):
+            # Event streams never finish on their own, so end them before
+            # uvicorn waits for open connections to close
+            registry.end_streams()
+            super().handle_exit(sig, frame)
+
     port = int(os.getenv("BACKEND_PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    if WORKERS > 1:
+        # Each worker imports the app itself; uvicorn restarts any that die
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=WORKERS, timeout_graceful_shutdown=5)
+    else:
+        Server(uvicorn.Config(app, host="0.0.0.0", port=port, timeout_graceful_shutdown=5)).run()
@@ -0,0 +1,144 @@
+"""Maintenance commands for the backend's data directory.
+
+Run from the backend directory, with the same STORAGE_ENGINE as the server:
+
+    python manage.py rebuild-index     # rebuild the entry id -> date index
+    python manage.py rebuild-rollups   # recompute stats rollups from all days
+    python manage.py check-rollups     # verify rollups match the stored days
+    python manage.py rebuild-changes   # start a new change log (clients resync in full)
+    python manage.py rebuild-search    # re-index every entry for full-text search
+    python manage.py import FILE       # bulk import a JSON array, NDJSON or CSV file (--format to override)
+    python manage.py compact-json      # rewrite stored JSON compactly (stop the server first)
+    python manage.py archive           # pack day files of older months into archive segments (--keep-months)
+    python manage.py issue-token --tenant NAME    # new access token for TENANT_MODE=token
+    python manage.py revoke-tokens --tenant NAME  # invalidate all of a tenant's tokens
+
+Commands work on the single-user data in data/ unless --tenant names another tenant.
+"""
+import argparse
+import functools
+import sys
+from routes import tenants, timers
+from storage.bulk import IMPORT_FORMATS, detect_format, iter_records
+
+
+def rebuild_index(args) -> int:
+    timers.rebuild_entry_index()
+    print(f"Indexed {len(timers.entry_index)} entries")
+    return 0
+
+
+def rebuild_rollups(args) -> int:
+    timers.rebuild_rollups()
+    print("Rollups rebuilt")
+    return 0
+
+
+def check_rollups(args) -> int:
+    problems = timers.check_rollups()
+    for problem in problems:
+        print(problem)
+    print("Rollups are consistent" if not problems else f"{len(problems)} mismatches (run rebuild-rollups)")
+    return 1 if problems else 0
+
+
+def rebuild_changes(args) -> int:
+    timers.rebuild_change_log()
+    print(f"Change log restarted at version {timers.change_log.version}")
+    return 0
+
+
+def rebuild_search(args) -> int:
+    timers.rebuild_search_index()
+    print(f"Indexed {len(timers.search_index)} entries for search")
+    return 0
+
+
+def import_file(args) -> int:
+    if not args.path:
+        print("import needs a FILE to read")
+        return 2
+    fmt = args.format or detect_format(None, args.path)
+    if fmt is None:
+        print("Can't tell the format from the file name; pass --format")
+        return 2
+    # Keep the indexes up to date as days are written instead of rebuilding them later
+    timers.load_entry_index()
+    timers.load_rollups()
+    timers.load_change_log()
+    timers.load_search_index()
+    with open(args.path, 'rb') as f:
+        try:
+            result = timers.import_entries(iter_records(iter(functools.partial(f.read, 64 * 1024), b""), fmt))
+        except ValueError as error:
+            print(f"Nothing imported: {error}")
+            return 1
+    for error in result["errors"]:
+        print(f"record {error['record']}: {error['error']}")
+    print(f"Imported {result['inserted']} of {result['received']} records into {result['days']} days "
+          f"({result['duplicates']} duplicates skipped, {result['rejected']} rejected)")
+    return 1 if result["rejected"] else 0
+
+
+def compact_json(args) -> int:
+    result = timers.storage.reformat()
+    print(f"Rewrote {result['rewritten']} of {result['items']} items: "
+          f"{result['bytes_before']} -> {result['bytes_after']} bytes")
+    return 0
+
+
+def archive(args) -> int:
+    result = timers.archive_days(args.keep_months)
+    if not result["months"]:
+        print("Nothing to archive")
+        return 0
+    print(f"Archived {result['days']} day files into {result['months']} monthly segments: "
+          f"{result['bytes_before']} -> {result['bytes_after']} bytes")
+    return 0
+
+
+def issue_token(args) -> int:
+    print(tenants.tokens.issue(args.tenant))
+    return 0
+
+
+def revoke_tokens(args) -> int:
+    print(f"Revoked {tenants.tokens.revoke(args.tenant)} tokens of {args.tenant}")
+    return 0
+
+
+COMMANDS = {
+    "rebuild-index": rebuild_index,
+    "rebuild-rollups": rebuild_rollups,
+    "check-rollups": check_rollups,
+    "rebuild-changes": rebuild_changes,
+    "rebuild-search": rebuild_search,
+    "import": import_file,
+    "compact-json": compact_json,
+    "archive": archive,
+    "issue-token": issue_token,
+    "revoke-tokens": revoke_tokens,
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("path", nargs="?", help="file to read (import)")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="import format (default: from the file name)")
+    parser.add_argument("--keep-months", type=int, default=2,
+                        help="archive: months to keep as day files, this one included (default: %(default)s)")
+    parser.add_argument("--tenant", default=tenants.DEFAULT_TENANT, help="tenant to work on (default: %(default)s)")
+    args = parser.parse_args()
+    if not tenants.TENANT_ID_PATTERN.match(args.tenant):
+        print("Tenant names are letters, digits, '-' and '_'")
+        return 2
+    tenants.select_tenant(tenants.registry.open(args.tenant))
+    try:
+        return COMMANDS[args.command](args)
+    finally:
+        tenants.registry.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
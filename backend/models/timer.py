@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Literal
 from datetime import datetime
 
 class TimerEntry(BaseModel):
@@ -21,6 +21,19 @@ class TimerCreate(BaseModel):
     duration: int
     date: str  # YYYY-MM-DD format - explicit date to avoid timezone issues
 
+class ActiveTimerUpdate(BaseModel):
+    project: Optional[str] = None
+    category: Optional[str] = None
+    description: Optional[str] = None
+
+class TimerUpsert(TimerCreate):
+    id: Optional[str] = None  # Entry being edited; a new entry is created when omitted
+
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[str] = None  # Entry to update or delete
+    entry: Optional[TimerCreate] = None  # New contents for create and update
+
 class DayActivitySummary(BaseModel):
     date: str
     total_duration: int  # in seconds
@@ -0,0 +1,146 @@
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+from routes.tenants import TenantAttribute
+from collections import deque
+import asyncio
+import json
+import os
+import threading
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 256))
+
+
+class Subscriber:
+    """One connected client: a bounded queue drained by its own event loop"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, event: tuple | None) -> None:
+        """Queue an event (runs on the subscriber's loop).
+
+        A client that falls a whole queue behind has its backlog replaced by a
+        single "resync" event telling it to refetch, so one slow client never
+        holds memory for, or slows down, the others.
+        """
+        if self.queue.full():
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            if event is not None:
+                event = (event[0], "resync", "{}")
+        self.queue.put_nowait(event)
+
+
+class EventBroker:
+    """Fans change events out to every subscribed client.
+
+    publish() may be called from any thread (routes run in the threadpool);
+    each subscriber's queue is only touched from its own event loop. Recent
+    events are kept so a reconnecting client can resume from Last-Event-ID.
+    """
+
+    def __init__(self, queue_size: int = 256, history: int = 1024):
+        self.queue_size = queue_size
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, data: dict) -> int:
+        with self._lock:
+            event = (self._next_id, event_type, json.dumps(data))
+            self._next_id += 1
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+            except RuntimeError:
+                # The subscriber's loop is gone; it can't be reached any more
+                self.unsubscribe(subscriber)
+        return event[0]
+
+    def subscribe(self, last_event_id: int | None = None) -> Subscriber:
+        """Register a client on the running loop, replaying what it missed since last_event_id"""
+        subscriber = Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if last_event_id is not None and last_event_id < self._next_id - 1:
+                missed = [event for event in self._history if event[0] > last_event_id]
+                if not missed or missed[0][0] != last_event_id + 1:
+                    # Older than the history we keep: the client must refetch
+                    missed = [(self._next_id - 1, "resync", "{}")]
+                for event in missed:
+                    subscriber.offer(event)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def close(self) -> None:
+        """End every open stream"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, None)
+            except RuntimeError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "last_event_id": self._next_id - 1,
+                "dropped": sum(subscriber.dropped for subscriber in self._subscribers),
+            }
+
+
+# Each tenant has its own broker, so clients only hear about their own changes
+broker = TenantAttribute("broker")
+
+
+@router.get("/events")
+async def stream_events(request: Request, last_event_id: str | None = Header(None)):
+    """Stream timer and entry changes as Server-Sent Events"""
+    try:
+        resume_from = int(last_event_id) if last_event_id else None
+    except ValueError:
+        resume_from = None
+    subscriber = broker.subscribe(resume_from)
+
+    async def generate():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                event_id, event_type, data = event
+                yield f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/events/stats", response_model=dict)
+def get_event_stats():
+    """Get the number of connected event subscribers and events dropped for slow clients"""
+    return broker.stats()
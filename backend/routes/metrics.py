@@ -0,0 +1,313 @@
+import bisect
+import contextvars
+import cProfile
+import functools
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+from storage import iostats
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+# With REQUEST_PROFILING=1, a request sent with "X-Profile: 1" runs under
+# cProfile and leaves a pstats summary (.txt) and raw profile (.prof) in
+# PROFILE_DIR. Off by default: any client could otherwise trigger it
+PROFILE_HEADER = b"x-profile"
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))
+PROFILE_LINES = int(os.getenv("PROFILE_LINES", 40))
+PROFILE_KEEP = 20
+
+
+class Histogram:
+    """Prometheus-style histogram: per-bucket counts, sum and count"""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # Buckets are "less than or equal"; the last slot is +Inf
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Per-route request latency and storage I/O, plus storage operation timings.
+
+    Recorded by RequestMetrics and the storage helpers' timed() hooks,
+    rendered in the Prometheus text format by render().
+    """
+
+    def __init__(self):
+        self._requests = {}
+        self._durations = {}
+        self._reads = {}
+        self._io = {}
+        self._operations = {}
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, io_stats: dict) -> None:
+        key = (method, route)
+        with self._lock:
+            self._requests[key + (str(status),)] = self._requests.get(key + (str(status),), 0) + 1
+            if key not in self._durations:
+                self._durations[key] = Histogram(DURATION_BUCKETS)
+                self._reads[key] = Histogram(COUNT_BUCKETS)
+                self._io[key] = dict.fromkeys(iostats.FIELDS, 0)
+            self._durations[key].observe(seconds)
+            self._reads[key].observe(io_stats["reads"])
+            totals = self._io[key]
+            for field, amount in io_stats.items():
+                totals[field] += amount
+
+    def observe_operation(self, operation: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._operations.get(operation)
+            if histogram is None:
+                histogram = self._operations[operation] = Histogram(DURATION_BUCKETS)
+            histogram.observe(seconds)
+
+    def timed(self, operation: str):
+        """Decorator recording how long each call of a storage helper takes"""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe_operation(operation, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def render(self, gauges: dict | None = None) -> str:
+        """All metrics in the Prometheus text exposition format.
+
+        gauges is nested stats (e.g. from the storage engine); their numeric
+        leaves are exported as gauges named by their path.
+        """
+        out = []
+        with self._lock:
+            _family(out, "http_requests_total", "counter", "Requests served",
+                    [(_labels(method=m, route=r, status=s), n) for (m, r, s), n in sorted(self._requests.items())])
+            _family(out, "http_requests_in_flight", "gauge", "Requests being served", [("", self.in_flight)])
+            _histograms(out, "http_request_duration_seconds", "Time from receiving a request to sending its last byte",
+                        {_labels(method=m, route=r): h for (m, r), h in sorted(self._durations.items())})
+            _histograms(out, "http_request_storage_reads", "Storage reads (files, or SQLite days/keys) per request",
+                        {_labels(method=m, route=r): h for (m, r), h in sorted(self._reads.items())})
+            for field, name, description in _IO_FAMILIES:
+                _family(out, f"http_request_{name}", "counter", f"{description} while serving requests, by route",
+                        [(_labels(method=m, route=r), totals[field]) for (m, r), totals in sorted(self._io.items())])
+            _histograms(out, "storage_operation_duration_seconds", "Time spent in each storage helper",
+                        {_labels(operation=name): h for name, h in sorted(self._operations.items())})
+        process = iostats.totals.snapshot()
+        for field, name, description in _IO_FAMILIES:
+            _family(out, f"process_{name}", "counter", f"{description} since the process started", [("", process[field])])
+        for name, value in _flatten(gauges or {}):
+            _family(out, name, "gauge", None, [("", value)])
+        return "\n".join(out) + "\n"
+
+
+_IO_FAMILIES = (
+    ("reads", "storage_reads_total", "Storage reads"),
+    ("writes", "storage_writes_total", "Storage writes"),
+    ("bytes_read", "storage_read_bytes_total", "Bytes read from storage"),
+    ("bytes_written", "storage_written_bytes_total", "Bytes written to storage"),
+    ("parses", "json_parses_total", "JSON documents parsed"),
+    ("parse_seconds", "json_parse_seconds_total", "Seconds spent parsing JSON"),
+    ("locks", "storage_locks_total", "Storage lock acquisitions"),
+    ("lock_wait_seconds", "storage_lock_wait_seconds_total", "Seconds spent waiting for storage locks"),
+)
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _family(out: list, name: str, kind: str, description: str | None, samples: list) -> None:
+    if description:
+        out.append(f"# HELP {name} {description}")
+    out.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        out.append(f"{name}{labels} {_number(value)}")
+
+
+def _histograms(out: list, name: str, description: str, histograms: dict) -> None:
+    out.append(f"# HELP {name} {description}")
+    out.append(f"# TYPE {name} histogram")
+    for labels, histogram in histograms.items():
+        prefix = labels[:-1] + "," if labels else "{"
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+            cumulative += count
+            out.append(f'{name}_bucket{prefix}le="{bound}"}} {cumulative}')
+        out.append(f"{name}_sum{labels} {_number(histogram.sum)}")
+        out.append(f"{name}_count{labels} {histogram.count}")
+
+
+def _flatten(data: dict, prefix: str = "") -> list:
+    """(metric name, value) for every numeric leaf of nested stats"""
+    leaves = []
+    for key, value in data.items():
+        name = f"{prefix}_{key}" if prefix else str(key)
+        name = "".join(char if char.isalnum() or char == "_" else "_" for char in name)
+        if isinstance(value, dict):
+            leaves += _flatten(value, name)
+        elif isinstance(value, (int, float)):
+            leaves.append((name, int(value) if isinstance(value, bool) else value))
+    return leaves
+
+
+metrics = Metrics()
+
+
+# ==================== PROFILING ====================
+
+class ProfileSession:
+    """cProfile profilers for one request: one on the event loop, one per I/O pool call"""
+
+    def __init__(self):
+        self.profilers = [cProfile.Profile()]
+        self._lock = threading.Lock()
+
+    def add_profiler(self) -> cProfile.Profile:
+        profiler = cProfile.Profile()
+        with self._lock:
+            self.profilers.append(profiler)
+        return profiler
+
+
+_profiling = contextvars.ContextVar("profile_session", default=None)
+# cProfile on the event loop thread also sees other requests' coroutines, so
+# only one request is profiled at a time
+_profile_slot = threading.Lock()
+_profile_numbers = itertools.count(1)
+
+
+def profiled(call):
+    """Wrap a blocking call so it is profiled on its worker thread when the current request is"""
+    session = _profiling.get()
+    if session is None:
+        return call
+
+    def run():
+        profiler = session.add_profiler()
+        profiler.enable()
+        try:
+            return call()
+        finally:
+            profiler.disable()
+    return run
+
+
+def _write_profile(session: ProfileSession, name: str, title: str) -> None:
+    """Save the raw profile and a pstats summary of its top functions by cumulative time"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stats = pstats.Stats(*session.profilers)
+    stats.dump_stats(os.path.join(PROFILE_DIR, name + ".prof"))
+    summary = io.StringIO()
+    summary.write(title + "\n")
+    stats.stream = summary
+    stats.strip_dirs().sort_stats("cumulative").print_stats(PROFILE_LINES)
+    with open(os.path.join(PROFILE_DIR, name + ".txt"), 'w', encoding='utf-8') as f:
+        f.write(summary.getvalue())
+    # Keep only the most recent profiles
+    names = sorted(os.listdir(PROFILE_DIR))
+    for old in names[:max(0, len(names) - 2 * PROFILE_KEEP)]:
+        os.remove(os.path.join(PROFILE_DIR, old))
+
+
+# ==================== MIDDLEWARE ====================
+
+class RequestMetrics:
+    """ASGI middleware timing every HTTP request and counting its storage I/O.
+
+    A request counts until its last body byte is sent, so streamed exports
+    are measured in full; event streams (which never finish on their own)
+    are left out. Routes are labelled by their path template, not the URL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._paths = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        session = None
+        name = None
+        if REQUEST_PROFILING and dict(scope["headers"]).get(PROFILE_HEADER, b"") not in (b"", b"0") \
+                and _profile_slot.acquire(blocking=False):
+            session = ProfileSession()
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{next(_profile_numbers):06d}"
+        response = {"status": 500, "stream": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                headers = dict(message.get("headers", []))
+                response["stream"] = headers.get(b"content-type", b"").startswith(b"text/event-stream")
+                if session is not None:
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile", f"{name}.txt".encode())]
+            await send(message)
+
+        stats, token = iostats.track()
+        profile_token = _profiling.set(session) if session is not None else None
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        if session is not None:
+            session.profilers[0].enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.in_flight -= 1
+            iostats.untrack(token)
+            route = self._route(scope)
+            if session is not None:
+                session.profilers[0].disable()
+                _profiling.reset(profile_token)
+                # Imported here: routes.timers imports this module
+                from routes.timers import run_io
+                try:
+                    title = f"{scope['method']} {scope['path']} -> {response['status']} in {elapsed * 1000:.1f} ms"
+                    await run_io(_write_profile, session, name, f"{title} ({route})")
+                finally:
+                    _profile_slot.release()
+            if not response["stream"]:
+                method = scope["method"] if scope["method"] in METHODS else "OTHER"
+                metrics.observe_request(method, route, response["status"], elapsed, stats.snapshot())
+
+    def _route(self, scope) -> str:
+        """Path template of the route that handled the request, e.g. /api/timers/{date}"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._paths.get(endpoint)
+        if path is None:
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is not None:
+                    self._paths[route.endpoint] = route.path
+            path = self._paths.get(endpoint, getattr(endpoint, "__name__", "unknown"))
+        return path
@@ -0,0 +1,14 @@
+from fastapi.responses import JSONResponse
+from storage import serialization
+
+
+class FastJSONResponse(JSONResponse):
+    """Compact JSON response, serialized with orjson when it is installed.
+
+    Routes return one for data they built from storage themselves, which
+    skips FastAPI's response_model validation and jsonable_encoder pass; the
+    content must already be plain JSON data (str keys, no datetimes).
+    """
+
+    def render(self, content) -> bytes:
+        return serialization.dumps(content)
@@ -0,0 +1,433 @@
+import asyncio
+import contextvars
+import hashlib
+import os
+import re
+import secrets
+import threading
+from collections import OrderedDict
+from fastapi.responses import JSONResponse
+from storage.active_timer import ActiveTimerStore
+from storage.changelog import ChangeLog
+from storage.columnar import ColumnarStore
+from storage.engine import open_engine
+from storage.entry_index import EntryIndex
+from storage.files import KeyedLocks, atomic_write_json
+from storage.generation import SharedCounters
+from storage.intervals import IntervalIndex
+from storage.json_engine import file_stamp, read_json_file
+from storage.rollups import RollupStore
+from storage.search import SearchIndex
+
+DATA_DIR = "data"
+
+# Worker processes serving the app (`python main.py` starts this many). They
+# share everything through data/: per-date file locks, append-only indexes
+# each worker tails, and counters that say when to catch up
+WORKERS = int(os.getenv("WORKERS", 1))
+
+# "json" (one file per day), "wal" (append-only log compacted into day files)
+# or "sqlite" (indexed database, imports existing day files on first start)
+STORAGE_ENGINE = os.getenv("STORAGE_ENGINE", "json")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 512))
+
+# "off" serves a single user from data/ itself. "header" serves the tenant
+# named by TENANT_HEADER (set by an authenticating proxy); "token" serves the
+# tenant an "Authorization: Bearer" token was issued for (manage.py
+# issue-token). Each tenant gets its own directory under data/tenants/, and
+# the tenant called "default" is the single-user data in data/
+TENANT_MODE = os.getenv("TENANT_MODE", "off")
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant")
+TENANT_MODES = ("off", "header", "token")
+if TENANT_MODE not in TENANT_MODES:
+    raise ValueError(f"Unknown TENANT_MODE: {TENANT_MODE}")
+DEFAULT_TENANT = "default"
+TENANTS_DIR = os.path.join(DATA_DIR, "tenants")
+TENANT_TOKENS_FILE = os.path.join(DATA_DIR, "tenant_tokens.json")
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+# Tenants kept open (caches, indexes, running timer) per worker; the least
+# recently used idle one is closed to make room for another
+MAX_OPEN_TENANTS = int(os.getenv("MAX_OPEN_TENANTS", 64))
+# I/O pool threads one tenant's requests may occupy at once (0: no limit)
+TENANT_IO_CONCURRENCY = int(os.getenv("TENANT_IO_CONCURRENCY", 0 if TENANT_MODE == "off" else 8))
+STARTUP_LOCK = "startup"
+# Directory (under TENANTS_DIR) of the always-empty tenant serving reads for
+# tenants with no data yet; tenant names can't start with a dot
+BLANK_TENANT = ".blank"
+
+
+def tenant_dir(tenant_id: str) -> str:
+    """Data directory of a tenant; the default tenant keeps the single-user layout in data/"""
+    if tenant_id == DEFAULT_TENANT:
+        return DATA_DIR
+    return os.path.join(TENANTS_DIR, tenant_id)
+
+
+class Tenant:
+    """One user's (or workspace's) data directory and everything kept in memory for it.
+
+    Storage engine and caches, locks, indexes, the running timer and event
+    subscribers are all per tenant, so one busy tenant can't evict another's
+    cached days or hold its locks.
+    """
+
+    def __init__(self, tenant_id: str, data_dir: str):
+        # routes.events looks the current tenant's broker up through this module
+        from routes.events import EVENT_QUEUE_SIZE, EventBroker
+
+        self.id = tenant_id
+        self.data_dir = data_dir
+        self.storage = open_engine(STORAGE_ENGINE, data_dir, CACHE_MAX_ENTRIES)
+
+        # Serializes read-modify-write cycles per date (and for settings/active timer)
+        self.storage_locks = KeyedLocks(os.path.join(data_dir, ".locks"))
+
+        # Bumped by whichever process saves days or the running timer, so the
+        # others know to catch up; reading one is a single memory access
+        self.generations = SharedCounters(os.path.join(data_dir, ".generation"), ("days", "active_timer"))
+        self.days_generation_seen = 0
+        self.catch_up_lock = threading.Lock()
+
+        # The running timer lives in memory; field edits are checkpointed at most
+        # ACTIVE_TIMER_FLUSH_SECONDS later (0 writes every edit through, which
+        # several workers need so they all see the same timer)
+        self.active_timer = ActiveTimerStore(
+            self.storage, 0 if WORKERS > 1 else float(os.getenv("ACTIVE_TIMER_FLUSH_SECONDS", 2)), self.generations)
+
+        # Maps entry id -> date so edits and deletes open only the file holding the entry
+        self.entry_index = EntryIndex(os.path.join(data_dir, "entry_index.jsonl"), self.storage_locks)
+
+        # Per day/week/month/year totals so stats don't re-read every entry
+        self.rollups = RollupStore(os.path.join(data_dir, "rollups.jsonl"), self.storage_locks)
+
+        # Version number of the latest change to each entry and to settings, for delta sync
+        self.change_log = ChangeLog(os.path.join(data_dir, "changes.jsonl"), self.storage_locks)
+
+        # Inverted index over entry descriptions, projects and categories for /search
+        self.search_index = SearchIndex(os.path.join(data_dir, "search_index.jsonl"), self.storage_locks)
+
+        # Per-day entries sorted by time, for finding the entries a new one overlaps
+        self.intervals = IntervalIndex(CACHE_MAX_ENTRIES)
+
+        # Entries as NumPy columns for range reports; built on the first report request
+        self.columns = ColumnarStore()
+        self.columns_build_lock = threading.Lock()
+
+        self.broker = EventBroker(EVENT_QUEUE_SIZE)
+
+        # Caps the I/O pool threads this tenant's requests occupy at once
+        self.io_slots = asyncio.Semaphore(TENANT_IO_CONCURRENCY) if TENANT_IO_CONCURRENCY > 0 else None
+        self.in_flight = 0
+
+    def start(self) -> None:
+        """Start the engine and load the persisted indexes, rebuilding any that are missing or stale.
+
+        Every process serving the tenant keeps all its indexes loaded, so
+        each one sees every write wherever it is made. Stale indexes are
+        rebuilt together from a single read of every day; processes starting
+        together take turns, so only the first one rebuilds.
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.storage.start()
+        with self.storage_locks.hold(STARTUP_LOCK):
+            # Anything saved from here on is caught up on by the first request
+            self.days_generation_seen = self.generations.read("days")
+            newest = self.storage.newest_change()
+            indexes = [self.rollups, self.change_log, self.search_index]
+            if not self.storage.indexes_entries:
+                indexes.insert(0, self.entry_index)
+            stale = [index for index in indexes if not index.load(newest)]
+            if stale:
+                days = [(date, (self.storage.load_day(date) or {}).get("entries", []))
+                        for date in self.storage.list_dates()]
+                for index in stale:
+                    index.rebuild(days)
+
+    def close(self) -> None:
+        """End event streams, checkpoint the running timer and flush the engine"""
+        self.broker.close()
+        self.active_timer.close()
+        self.storage.close()
+        self.generations.close()
+
+
+class TenantRegistry:
+    """The tenants open in this process, opened on first use.
+
+    Beyond max_open, opening another closes the least recently used tenant
+    with no request (or event stream) in flight. The default tenant's first
+    use is never released, so it stays open. Reads for a tenant that has no
+    data directory yet are served by a shared empty tenant instead, so they
+    leave nothing behind on disk.
+    """
+
+    def __init__(self, max_open: int):
+        self.max_open = max_open
+        self._tenants = OrderedDict()
+        self._lock = threading.Lock()
+        # Tenant id -> event set once the thread opening (or closing) it is
+        # done; only requests for that tenant wait, so a slow start (e.g. a
+        # full index rebuild) never holds up any other tenant
+        self._pending = {}
+        self._blank = None
+        self._blank_lock = threading.Lock()
+
+    def acquire(self, tenant_id: str) -> Tenant | None:
+        """The tenant if it is open, counted as in use until release(); None if it isn't"""
+        with self._lock:
+            return self._acquire(tenant_id)
+
+    def open(self, tenant_id: str, create: bool = True) -> Tenant:
+        """Acquire a tenant, opening it (and starting its engine) if needed. Blocks on storage.
+
+        With create=False a tenant without a data directory isn't created:
+        the shared empty tenant is returned instead.
+        """
+        if not create and not os.path.isdir(tenant_dir(tenant_id)):
+            return self._acquire_blank()
+        while True:
+            with self._lock:
+                tenant = self._acquire(tenant_id)
+                if tenant is not None:
+                    return tenant
+                pending = self._pending.get(tenant_id)
+                if pending is None:
+                    self._pending[tenant_id] = threading.Event()
+                    break
+            pending.wait()
+        evicted = []
+        try:
+            tenant = Tenant(tenant_id, tenant_dir(tenant_id))
+            tenant.start()
+            with self._lock:
+                idle = [other for other in self._tenants.values() if other.in_flight == 0]
+                evicted = idle[:max(0, len(self._tenants) + 1 - self.max_open)]
+                for other in evicted:
+                    # Not reopened until it is closed, so it is never open twice at once
+                    del self._tenants[other.id]
+                    self._pending[other.id] = threading.Event()
+                tenant.in_flight = 1
+                self._tenants[tenant_id] = tenant
+        finally:
+            self._done(tenant_id)
+        for other in evicted:
+            try:
+                other.close()
+            finally:
+                self._done(other.id)
+        if self._blank is not None:
+            # Streams opened before this tenant had data reconnect to it
+            self._blank.broker.close()
+        return tenant
+
+    def release(self, tenant: Tenant) -> None:
+        with self._lock:
+            tenant.in_flight -= 1
+
+    def _acquire(self, tenant_id: str) -> Tenant | None:
+        tenant = self._tenants.get(tenant_id)
+        if tenant is not None:
+            self._tenants.move_to_end(tenant_id)
+            tenant.in_flight += 1
+        return tenant
+
+    def _acquire_blank(self) -> Tenant:
+        with self._blank_lock:
+            if self._blank is None:
+                blank = Tenant(BLANK_TENANT, os.path.join(TENANTS_DIR, BLANK_TENANT))
+                blank.start()
+                self._blank = blank
+        with self._lock:
+            self._blank.in_flight += 1
+            return self._blank
+
+    def _done(self, tenant_id: str) -> None:
+        with self._lock:
+            pending = self._pending.pop(tenant_id)
+        pending.set()
+
+    def default(self) -> Tenant:
+        """The tenant in data/ itself: the only one when TENANT_MODE is off"""
+        tenant = self._tenants.get(DEFAULT_TENANT)
+        if tenant is None:
+            tenant = self.open(DEFAULT_TENANT)
+        return tenant
+
+    def end_streams(self) -> None:
+        """End every tenant's open event streams"""
+        with self._lock:
+            tenants = list(self._tenants.values())
+        if self._blank is not None:
+            tenants.append(self._blank)
+        for tenant in tenants:
+            tenant.broker.close()
+
+    def close(self) -> None:
+        with self._lock:
+            tenants = list(self._tenants.values())
+            self._tenants.clear()
+        with self._blank_lock:
+            if self._blank is not None:
+                tenants.append(self._blank)
+                self._blank = None
+        for tenant in tenants:
+            tenant.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open": len(self._tenants),
+                "in_flight": sum(tenant.in_flight for tenant in self._tenants.values()),
+            }
+
+
+class TenantTokens:
+    """Bearer tokens and the tenant each one opens.
+
+    Only SHA-256 digests of the tokens are stored, as a JSON object of
+    digest -> tenant id; the file is re-read when it changes on disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tokens = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def lookup(self, token: str) -> str | None:
+        with self._lock:
+            self._reload()
+            return self._tokens.get(_digest(token))
+
+    def issue(self, tenant_id: str) -> str:
+        """Create a new token for a tenant and return it (it can't be recovered later)"""
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._reload()
+            tokens = dict(self._tokens, **{_digest(token): tenant_id})
+            atomic_write_json(self.path, tokens)
+            self._tokens = tokens
+        return token
+
+    def revoke(self, tenant_id: str) -> int:
+        """Remove every token of a tenant; returns how many there were"""
+        with self._lock:
+            self._reload()
+            tokens = {digest: owner for digest, owner in self._tokens.items() if owner != tenant_id}
+            revoked = len(self._tokens) - len(tokens)
+            if revoked:
+                atomic_write_json(self.path, tokens)
+                self._tokens = tokens
+            return revoked
+
+    def _reload(self) -> None:
+        stamp = file_stamp(self.path)
+        if stamp != self._stamp:
+            self._tokens = read_json_file(self.path) if stamp else {}
+            self._stamp = stamp
+
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+registry = TenantRegistry(MAX_OPEN_TENANTS)
+tokens = TenantTokens(TENANT_TOKENS_FILE)
+_current = contextvars.ContextVar("tenant", default=None)
+
+
+def current_tenant() -> Tenant:
+    """The tenant the current request was routed to, or the default tenant outside of one"""
+    tenant = _current.get()
+    return tenant if tenant is not None else registry.default()
+
+
+def select_tenant(tenant: Tenant):
+    """Make a tenant current (e.g. for maintenance commands); returns a token for reset_tenant"""
+    return _current.set(tenant)
+
+
+def reset_tenant(token) -> None:
+    _current.reset(token)
+
+
+class TenantAttribute:
+    """Module-level stand-in for one of the current tenant's objects.
+
+    Attribute lookups (and assignments) go to that object on whichever
+    tenant is current, so code can keep writing e.g. ``storage.load_day(date)``.
+    """
+
+    __slots__ = ("_name",)
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attr):
+        return getattr(getattr(current_tenant(), self._name), attr)
+
+    def __setattr__(self, attr, value) -> None:
+        setattr(getattr(current_tenant(), self._name), attr, value)
+
+    def __delattr__(self, attr) -> None:
+        delattr(getattr(current_tenant(), self._name), attr)
+
+    def __len__(self) -> int:
+        return len(getattr(current_tenant(), self._name))
+
+    def __repr__(self) -> str:
+        return f"<current tenant's {self._name}>"
+
+
+# ==================== MIDDLEWARE ====================
+
+class TenantScope:
+    """ASGI middleware serving each /api request from its tenant.
+
+    The tenant comes from TENANT_HEADER or a bearer token, per TENANT_MODE;
+    requests naming none, or an invalid one, are refused. The tenant stays
+    current (and open) until the response's last byte, streams included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._header = TENANT_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if TENANT_MODE == "off" or scope["type"] != "http" or not scope["path"].startswith("/api"):
+            await self.app(scope, receive, send)
+            return
+
+        tenant_id, error = self._identify(dict(scope["headers"]))
+        if error is not None:
+            await error(scope, receive, send)
+            return
+        tenant = registry.acquire(tenant_id)
+        if tenant is None:
+            # Opening starts the tenant's engine, which may read from disk.
+            # Only a write creates a tenant; reads of one that doesn't exist
+            # yet see an empty tenant
+            create = scope["method"] not in ("GET", "HEAD")
+            tenant = await asyncio.get_running_loop().run_in_executor(None, registry.open, tenant_id, create)
+        token = _current.set(tenant)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+            registry.release(tenant)
+
+    def _identify(self, headers: dict) -> tuple:
+        """(tenant id, None), or (None, error response)"""
+        if TENANT_MODE == "header":
+            tenant_id = headers.get(self._header, b"").decode("latin-1").strip()
+            if not tenant_id:
+                return None, JSONResponse({"detail": f"Missing {TENANT_HEADER} header"}, status_code=400)
+            if not TENANT_ID_PATTERN.match(tenant_id):
+                return None, JSONResponse({"detail": "Invalid tenant name"}, status_code=400)
+            return tenant_id, None
+        scheme, _, credentials = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+        tenant_id = tokens.lookup(credentials.strip()) if scheme.lower() == "bearer" and credentials else None
+        if tenant_id is None:
+            return None, JSONResponse({"detail": "Invalid or missing access token"}, status_code=401,
+                                      headers={"WWW-Authenticate": "Bearer"})
+        return tenant_id, None
@@ -1,66 +1,420 @@
-from fastapi import APIRouter, HTTPException
-from models.timer import TimerEntry, TimerCreate, DayActivitySummary, ProjectListSync, CategoryListSync, SettingName, ColorUpdate
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from routes.events import broker
+from routes.metrics import metrics, profiled
+from routes.responses import FastJSONResponse
+from routes.tenants import TenantAttribute, current_tenant
+from pydantic import ValidationError
+from models.timer import TimerEntry, TimerCreate, TimerUpsert, ActiveTimerUpdate, BatchOperation, DayActivitySummary, ProjectListSync, CategoryListSync, SettingName, ColorUpdate
+from storage import serialization
+from storage.bulk import detect_format, iter_records
+from storage.changelog import SETTINGS_KEY
+from storage.export import EXPORT_FORMATS, export_stream
+from storage.intervals import entry_span
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
-import json
+from itertools import chain
+import asyncio
+import contextvars
+import functools
+import hashlib
 import os
+import re
+import tempfile
 import uuid
 
 router = APIRouter()
 
-DATA_DIR = "data"
-SETTINGS_FILE = os.path.join(DATA_DIR, "settings.json")
-ACTIVE_TIMER_FILE = os.path.join(DATA_DIR, "active_timer.json")
+# Clients may keep responses but must revalidate them (cheaply, via ETag) before reuse
+CACHE_CONTROL = "private, no-cache"
+PERIOD_PATTERN = re.compile(r"^\d{4}(-\d{2}(-\d{2})?|-W\d{2})?$")
+MONTH_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+YEAR_PATTERN = re.compile(r"^\d{4}$")
+# Bulk imports are validated this many records at a time; request bodies
+# are buffered in memory up to BULK_SPOOL_BYTES, then on disk
+BULK_CHUNK_SIZE = 1000
+BULK_SPOOL_BYTES = 8 * 1024 * 1024
+BULK_MAX_ERRORS = 100
+BATCH_MAX_OPERATIONS = 1000
+# Days preloaded into the cache at startup, counting back from today
+WARM_DAYS = int(os.getenv("WARM_DAYS", 35))
 
-def get_data_file(date: str) -> str:
-    """Get the path to the data file for a given date (YYYY-MM-DD)"""
-    return os.path.join(DATA_DIR, f"{date}.json")
+SETTINGS_LOCK = "settings"
+ACTIVE_TIMER_LOCK = "active_timer"
 
+# The storage engine, locks, indexes and running timer of the tenant being
+# served (see routes/tenants.py); with TENANT_MODE off there is just the one
+storage = TenantAttribute("storage")
+storage_locks = TenantAttribute("storage_locks")
+generations = TenantAttribute("generations")
+active_timer = TenantAttribute("active_timer")
+entry_index = TenantAttribute("entry_index")
+rollups = TenantAttribute("rollups")
+change_log = TenantAttribute("change_log")
+search_index = TenantAttribute("search_index")
+intervals = TenantAttribute("intervals")
+columns = TenantAttribute("columns")
+
+# Blocking storage work from the async routes runs on this pool, so a slow
+# disk ties up at most IO_CONCURRENCY threads and never the event loop
+io_pool = ThreadPoolExecutor(max_workers=int(os.getenv("IO_CONCURRENCY", 16)), thread_name_prefix="storage-io")
+
+def list_day_dates(start: str | None = None, end: str | None = None) -> list[str]:
+    """List the dates that have stored data, in ascending order, optionally within [start, end]"""
+    return storage.list_dates(start, end)
+
+@metrics.timed("load_day_data")
 def load_day_data(date: str) -> dict:
     """Load all entries for a specific day"""
-    file_path = get_data_file(date)
-    if os.path.exists(file_path):
-        with open(file_path, 'r') as f:
-            return json.load(f)
+    day_data = storage.load_day(date)
+    if day_data is not None:
+        return day_data
     return {"date": date, "entries": [], "total_duration": 0}
 
+@metrics.timed("save_day_data")
 def save_day_data(date: str, data: dict) -> None:
     """Save entries for a specific day"""
-    file_path = get_data_file(date)
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
+    storage.save_day(date, data)
+    intervals.invalidate(date)
+    if entry_index.loaded and not storage.indexes_entries:
+        entry_index.update_day(date, data.get("entries", []))
+    if rollups.loaded:
+        rollups.update_day(date, data.get("entries", []))
+    if columns.loaded:
+        columns.update_day(date, data.get("entries", []))
+    if change_log.loaded:
+        change_log.update_day(date, data.get("entries", []))
+    if search_index.loaded:
+        search_index.update_day(date, data.get("entries", []))
+    note_days_saved()
 
+@metrics.timed("load_active_timer")
 def load_active_timer() -> dict | None:
-    """Load the currently active timer from file"""
-    if os.path.exists(ACTIVE_TIMER_FILE):
-        with open(ACTIVE_TIMER_FILE, 'r') as f:
-            return json.load(f)
-    return None
+    """Load the currently active timer"""
+    return active_timer.get()
 
 def save_active_timer(timer_data: dict | None) -> None:
-    """Save the active timer to file"""
-    if timer_data is None:
-        if os.path.exists(ACTIVE_TIMER_FILE):
-            os.remove(ACTIVE_TIMER_FILE)
-    else:
-        with open(ACTIVE_TIMER_FILE, 'w') as f:
-            json.dump(timer_data, f, indent=2)
+    """Save the active timer, or clear it with None"""
+    active_timer.set(timer_data)
+
+def publish_entry_change(event: str, date: str, day_data: dict, **data) -> None:
+    """Tell event subscribers about an entry change, with the day's new total"""
+    broker.publish(event, {"date": date, "total_duration": day_data["total_duration"], **data})
 
 def calculate_total_duration(entries: list) -> int:
     """Calculate total duration from entries in seconds"""
     return sum(entry.get("duration", 0) for entry in entries)
 
+def load_entry_index() -> None:
+    """Load the entry index, rebuilding it from the day files if it is missing or stale"""
+    if storage.indexes_entries:
+        return
+    if not entry_index.load(storage.newest_change()):
+        rebuild_entry_index()
+
+def rebuild_entry_index(dates: list[str] | None = None) -> None:
+    """Rebuild the entry index by reading every day file"""
+    if dates is None:
+        dates = list_day_dates()
+    entry_index.rebuild((date, load_day_data(date).get("entries", [])) for date in dates)
+
+def load_rollups() -> None:
+    """Load the stats rollups, rebuilding them from stored days if missing or stale"""
+    if not rollups.load(storage.newest_change()):
+        rebuild_rollups()
+
+def rebuild_rollups() -> None:
+    """Recompute the stats rollups from every stored day"""
+    rollups.rebuild((date, load_day_data(date).get("entries", [])) for date in list_day_dates())
+
+def check_rollups() -> list[str]:
+    """Compare the stats rollups against the stored days and list any mismatches"""
+    if not rollups.loaded:
+        rollups.load()
+    return rollups.check((date, load_day_data(date).get("entries", [])) for date in list_day_dates())
+
+def load_change_log() -> None:
+    """Load the change log, rebuilding it from stored days if missing or stale"""
+    if not change_log.load(storage.newest_change()):
+        rebuild_change_log()
+
+def rebuild_change_log() -> None:
+    """Start a new change log from every stored day; existing replicas will reload in full"""
+    change_log.rebuild((date, load_day_data(date).get("entries", [])) for date in list_day_dates())
+
+def load_search_index() -> None:
+    """Load the search index, rebuilding it from stored days if missing or stale"""
+    if not search_index.load(storage.newest_change()):
+        rebuild_search_index()
+
+def rebuild_search_index() -> None:
+    """Re-index every stored entry for full-text search"""
+    search_index.rebuild((date, load_day_data(date).get("entries", [])) for date in list_day_dates())
+
+def load_columns() -> None:
+    """Build the columnar entry store from every stored day, once"""
+    with current_tenant().columns_build_lock:
+        if not columns.loaded:
+            columns.rebuild((date, load_day_data(date).get("entries", [])) for date in list_day_dates())
+
+def archive_days(keep_months: int = 2) -> dict:
+    """Pack the days of every month before the last keep_months (this one included) into archive segments.
+
+    Each month is packed holding the locks of its dates, so concurrent
+    writes land either before it (and are packed) or after (in a new day file).
+    """
+    today = datetime.now(timezone.utc)
+    first_kept = today.year * 12 + today.month - max(keep_months, 1)
+    before = f"{first_kept // 12:04d}-{first_kept % 12 + 1:02d}"
+    totals = {"months": 0, "days": 0, "bytes_before": 0, "bytes_after": 0}
+    for month in storage.archive_months(before):
+        with storage_locks.hold(*list_day_dates(f"{month}-01", f"{month}-31")):
+            result = storage.archive_month(month)
+        for key in totals:
+            totals[key] += result[key]
+    return totals
+
+def warm_up() -> None:
+    """Preload the last WARM_DAYS days into the cache, for startup"""
+    first = (datetime.now(timezone.utc) - timedelta(days=WARM_DAYS)).strftime("%Y-%m-%d")
+    for date in list_day_dates(first):
+        load_day_data(date)
+
+def catch_up() -> None:
+    """Apply the days other worker processes saved since this one last looked.
+
+    The lines they appended to the indexes are read in, and the dates they
+    changed are dropped from the overlap cache and re-read into the columnar
+    store. Costs one memory read when nothing changed.
+    """
+    tenant = current_tenant()
+    if tenant.generations.read("days") == tenant.days_generation_seen:
+        return
+    with tenant.catch_up_lock:
+        current = tenant.generations.read("days")
+        if current == tenant.days_generation_seen:
+            return
+        for index in (tenant.entry_index, tenant.rollups, tenant.search_index):
+            if index.loaded:
+                index.refresh()
+        dates = tenant.change_log.refresh() if tenant.change_log.loaded else None
+        if dates is None:
+            tenant.intervals.clear()
+            tenant.columns.unload()
+        else:
+            for date in dates:
+                tenant.intervals.invalidate(date)
+                if tenant.columns.loaded:
+                    tenant.columns.update_day(date, load_day_data(date).get("entries", []))
+        tenant.days_generation_seen = current
+
+def note_days_saved() -> None:
+    """Tell other worker processes that days were saved"""
+    tenant = current_tenant()
+    generation = tenant.generations.bump("days")
+    with tenant.catch_up_lock:
+        # Nothing to catch up on if only our own save happened since we last looked
+        if generation == tenant.days_generation_seen + 1:
+            tenant.days_generation_seen = generation
+
+async def catch_up_async() -> None:
+    """Route dependency: catch up with other workers before handling the request"""
+    tenant = current_tenant()
+    if tenant.generations.read("days") != tenant.days_generation_seen:
+        await run_io(catch_up)
+
+def stored_entry_date(entry_id: str) -> str | None:
+    """Date an entry id is stored under according to the index, without loading any day"""
+    if storage.indexes_entries:
+        return storage.find_entry_date(entry_id)
+    if not entry_index.loaded:
+        load_entry_index()
+    return entry_index.lookup(entry_id)
+
+def find_entry(entry_id: str) -> tuple[str, dict, int] | None:
+    """Locate an entry, returning (date, day_data, position) or None if it doesn't exist"""
+    if storage.indexes_entries:
+        date = storage.find_entry_date(entry_id)
+        if date is None:
+            return None
+        day_data = load_day_data(date)
+        for idx, entry in enumerate(day_data["entries"]):
+            if entry["id"] == entry_id:
+                return date, day_data, idx
+        return None
+    if not entry_index.loaded:
+        load_entry_index()
+    for attempt in range(2):
+        date = entry_index.lookup(entry_id)
+        if date is not None:
+            day_data = load_day_data(date)
+            for idx, entry in enumerate(day_data["entries"]):
+                if entry["id"] == entry_id:
+                    return date, day_data, idx
+        # The index missed or pointed at the wrong file. Another worker may
+        # have just saved it; otherwise that only happens if a day file was
+        # edited by hand, so rebuild once if one is newer
+        if attempt > 0:
+            break
+        catch_up()
+        if entry_index.lookup(entry_id) != date:
+            continue  # another worker created or moved it; look again
+        if not entry_index.is_stale(storage.newest_change()):
+            break
+        rebuild_entry_index()
+    return None
+
+@contextmanager
+def locked_entry(entry_id: str, *other_dates: str):
+    """Lock the day holding an entry (plus any other dates) and yield (date, day_data, position).
+
+    Raises a 404 if the entry doesn't exist. The lookup is repeated under the
+    lock in case a concurrent request moved the entry in the meantime.
+    """
+    while True:
+        found = find_entry(entry_id)
+        if found is None:
+            raise HTTPException(status_code=404, detail="Timer entry not found")
+        with storage_locks.hold(found[0], *other_dates):
+            confirmed = find_entry(entry_id)
+            if confirmed is None:
+                raise HTTPException(status_code=404, detail="Timer entry not found")
+            if confirmed[0] == found[0]:
+                yield confirmed
+                return
+
+def make_etag(kind: str, *stamps: str) -> str:
+    """Strong ETag for a response built from data with the given storage stamps.
+
+    Stamps must be read before the data is loaded, so a concurrent write can
+    only make the tag older than the body (a wasted refetch), never newer.
+    """
+    digest = hashlib.blake2b("\0".join((kind,) + stamps).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers.update(cache_headers(etag))
+
+def parse_date(date: str) -> datetime:
+    """Parse a YYYY-MM-DD string, raising a 400 if it is malformed"""
+    try:
+        return datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+def normalize_date(date: str) -> str:
+    """A date zero-padded as YYYY-MM-DD (as day files are named), raising a 400 if it is malformed.
+
+    strptime also accepts e.g. 2024-5-5, which must not end up in a file
+    name nothing else reads.
+    """
+    return parse_date(date).strftime("%Y-%m-%d")
+
+def load_checked_day(date: str) -> dict:
+    """Load a day, correcting its total_duration if the entries no longer add up to it"""
+    return ensure_total_duration(date, load_day_data(date))
+
 def ensure_total_duration(date: str, day_data: dict) -> dict:
-    """Ensure total_duration matches actual sum of entries"""
+    """Ensure total_duration matches actual sum of entries.
+
+    The corrected total is only written back when it actually differs (e.g.
+    entries were deleted from the file by hand), so reads don't rewrite files.
+    """
     entries = day_data.get("entries", [])
-    day_data["total_duration"] = calculate_total_duration(entries)
+    total_duration = calculate_total_duration(entries)
+    if day_data.get("total_duration") != total_duration:
+        day_data["total_duration"] = total_duration
+        if storage.has_day(date):
+            with storage_locks.hold(date):
+                # Re-read under the lock so a concurrent write isn't clobbered
+                fresh = load_day_data(date)
+                fresh["total_duration"] = calculate_total_duration(fresh.get("entries", []))
+                save_day_data(date, fresh)  # Save corrected data
     return day_data
 
+# ==================== ASYNC STORAGE ====================
+
+async def run_io(fn, *args, **kwargs):
+    """Run a blocking storage call on the I/O pool and wait for it without blocking the loop.
+
+    The call sees the request's context, so its storage I/O is counted (and
+    profiled) as part of the request and it uses the request's tenant. With
+    TENANT_IO_CONCURRENCY set it first waits for one of that tenant's slots,
+    so one busy tenant can't occupy the whole pool.
+    """
+    call = profiled(functools.partial(fn, *args, **kwargs))
+    slots = current_tenant().io_slots
+    if slots is None:
+        return await asyncio.get_running_loop().run_in_executor(io_pool, contextvars.copy_context().run, call)
+    async with slots:
+        return await asyncio.get_running_loop().run_in_executor(io_pool, contextvars.copy_context().run, call)
+
+def offload(route):
+    """Make a blocking route async by running its whole body on the I/O pool.
+
+    Used for read-modify-write routes: storage locks are thread locks, so a
+    locked cycle has to start and finish on the same thread.
+    """
+    @functools.wraps(route)
+    async def wrapper(*args, **kwargs):
+        return await run_io(route, *args, **kwargs)
+    return wrapper
+
+async def iterate_io(iterator):
+    """Drain a blocking iterator on the I/O pool one item at a time, for streaming responses"""
+    done = object()
+    try:
+        while True:
+            item = await run_io(next, iterator, done)
+            if item is done:
+                break
+            yield item
+    finally:
+        # Release what the iterator holds (e.g. a database cursor) if the client went away
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await run_io(close)
+
+async def load_day_data_async(date: str) -> dict:
+    return await run_io(load_day_data, date)
+
+async def load_days_async(start: str, end: str) -> dict:
+    """Load every stored day between start and end (inclusive) concurrently, as date -> day_data"""
+    dates = await run_io(list_day_dates, start, end)
+    days = await asyncio.gather(*(run_io(load_checked_day, date) for date in dates))
+    return dict(zip(dates, days))
+
+async def load_settings_async() -> dict:
+    return await run_io(load_settings)
+
+async def load_active_timer_async() -> dict | None:
+    return await run_io(load_active_timer)
+
+async def day_stamps_async(dates: list[str]) -> list[str]:
+    return await run_io(lambda: [storage.day_stamp(date) for date in dates])
+
 # ==================== ACTIVE TIMER ENDPOINTS ====================
 
 @router.get("/timer/active")
-def get_active_timer():
+async def get_active_timer():
     """Get the currently running timer, if any"""
-    timer = load_active_timer()
+    timer = await load_active_timer_async()
     if timer is None:
         return {"active": False, "timer": None}
     
@@ -78,96 +432,108 @@ def get_active_timer():
     }
 
 @router.post("/timer/start")
+@offload
 def start_timer(project: str = "", category: str = "", description: str = ""):
     """Start a new timer on the backend"""
-    # Check if there's already an active timer
-    existing = load_active_timer()
-    if existing:
-        raise HTTPException(status_code=400, detail="A timer is already running")
-    
-    now = datetime.now(timezone.utc)
-    timer_data = {
-        "id": str(uuid.uuid4()),
-        "project": project,
-        "category": category,
-        "description": description,
-        "start_time": now.isoformat(),
-        "date": now.strftime("%Y-%m-%d")
-    }
-    
-    save_active_timer(timer_data)
+    with storage_locks.hold(ACTIVE_TIMER_LOCK):
+        # Check if there's already an active timer
+        existing = load_active_timer()
+        if existing:
+            raise HTTPException(status_code=400, detail="A timer is already running")
+        
+        now = datetime.now(timezone.utc)
+        timer_data = {
+            "id": str(uuid.uuid4()),
+            "project": project,
+            "category": category,
+            "description": description,
+            "start_time": now.isoformat(),
+            "date": now.strftime("%Y-%m-%d")
+        }
+        
+        save_active_timer(timer_data)
+        broker.publish("timer.started", {"timer": timer_data})
     return {"message": "Timer started", "timer": timer_data}
 
 @router.put("/timer/update")
-def update_active_timer(project: str = None, category: str = None, description: str = None):
+async def update_active_timer(project: str = None, category: str = None, description: str = None):
     """Update the currently running timer's details"""
-    timer = load_active_timer()
+    return await patch_active_timer(ActiveTimerUpdate(project=project, category=category, description=description))
+
+@router.patch("/timer/active")
+@offload
+def patch_active_timer(changes: ActiveTimerUpdate):
+    """Update any of the running timer's project, category and description at once"""
+    fields = changes.model_dump(exclude_none=True)
+    with storage_locks.hold(ACTIVE_TIMER_LOCK):
+        timer = active_timer.update(fields)
     if timer is None:
         raise HTTPException(status_code=404, detail="No active timer")
-    
-    if project is not None:
-        timer["project"] = project
-    if category is not None:
-        timer["category"] = category
-    if description is not None:
-        timer["description"] = description
-    
-    save_active_timer(timer)
+    broker.publish("timer.updated", {"timer": timer})
     return {"message": "Timer updated", "timer": timer}
 
 @router.post("/timer/stop")
+@offload
 def stop_timer():
     """Stop the current timer and save as an entry"""
-    timer = load_active_timer()
-    if timer is None:
-        raise HTTPException(status_code=404, detail="No active timer")
-    
-    start_time = datetime.fromisoformat(timer["start_time"])
-    end_time = datetime.now(timezone.utc)
-    duration = int((end_time - start_time).total_seconds())
-    
-    # Use the start date for the entry
-    date = timer["date"]
-    
-    entry_dict = {
-        "id": timer["id"],
-        "project": timer["project"],
-        "category": timer["category"],
-        "description": timer["description"],
-        "start_time": start_time.isoformat(),
-        "end_time": end_time.isoformat(),
-        "duration": duration,
-        "date": date
-    }
-    
-    # Save the entry
-    day_data = load_day_data(date)
-    day_data["entries"].append(entry_dict)
-    day_data["total_duration"] = calculate_total_duration(day_data["entries"])
-    save_day_data(date, day_data)
-    
-    # Clear the active timer
-    save_active_timer(None)
+    with storage_locks.hold(ACTIVE_TIMER_LOCK):
+        timer = load_active_timer()
+        if timer is None:
+            raise HTTPException(status_code=404, detail="No active timer")
+        
+        start_time = datetime.fromisoformat(timer["start_time"])
+        end_time = datetime.now(timezone.utc)
+        duration = int((end_time - start_time).total_seconds())
+        
+        # Use the start date for the entry
+        date = timer["date"]
+        
+        entry_dict = {
+            "id": timer["id"],
+            "project": timer["project"],
+            "category": timer["category"],
+            "description": timer["description"],
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "duration": duration,
+            "date": date
+        }
+        
+        # Save the entry
+        with storage_locks.hold(date):
+            day_data = load_day_data(date)
+            day_data["entries"].append(entry_dict)
+            day_data["total_duration"] = calculate_total_duration(day_data["entries"])
+            save_day_data(date, day_data)
+            publish_entry_change("entry.created", date, day_data, entry=entry_dict)
+        
+        # Clear the active timer
+        save_active_timer(None)
+        broker.publish("timer.stopped", {"id": timer["id"], "entry": entry_dict})
     
     return {"message": "Timer stopped", "entry": entry_dict}
 
 @router.delete("/timer/discard")
+@offload
 def discard_timer():
     """Discard the current timer without saving"""
-    timer = load_active_timer()
-    if timer is None:
-        raise HTTPException(status_code=404, detail="No active timer")
-    
-    save_active_timer(None)
+    with storage_locks.hold(ACTIVE_TIMER_LOCK):
+        timer = load_active_timer()
+        if timer is None:
+            raise HTTPException(status_code=404, detail="No active timer")
+        
+        save_active_timer(None)
+        broker.publish("timer.discarded", {"id": timer["id"]})
     return {"message": "Timer discarded"}
 
 # ==================== TIMER ENTRIES ENDPOINTS ====================
 
 @router.post("/timers", response_model=TimerEntry)
+@offload
 def create_timer(timer: TimerCreate):
     """Create a new timer entry"""
     entry_id = str(uuid.uuid4())
-    date = timer.date  # Use the date provided by client to avoid timezone issues
+    date = normalize_date(timer.date)  # Use the date provided by client to avoid timezone issues
     
     entry_dict = {
         "id": entry_id,
@@ -180,80 +546,326 @@ def create_timer(timer: TimerCreate):
         "date": date
     }
     
-    day_data = load_day_data(date)
-    day_data["entries"].append(entry_dict)
+    with storage_locks.hold(date):
+        day_data = load_day_data(date)
+        day_data["entries"].append(entry_dict)
+        day_data["total_duration"] = calculate_total_duration(day_data["entries"])
+        save_day_data(date, day_data)
+        publish_entry_change("entry.created", date, day_data, entry=entry_dict)
+    
+    # entry_dict was built from the validated request; don't validate it again
+    return FastJSONResponse(entry_dict)
+
+def make_entry(entry_id: str, timer: TimerCreate, date: str) -> dict:
+    """The stored form of a validated entry"""
+    return {
+        "id": entry_id,
+        "project": timer.project,
+        "category": timer.category,
+        "description": timer.description,
+        "start_time": timer.start_time.isoformat(),
+        "end_time": timer.end_time.isoformat() if timer.end_time else None,
+        "duration": timer.duration,
+        "date": date
+    }
+
+def validate_import_chunk(chunk: list, seen: set, result: dict) -> list[dict]:
+    """Turn a chunk of (number, record) pairs into new entries, counting rejects and duplicates"""
+    entries = []
+    for number, record in chunk:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            if not isinstance(record, dict):
+                raise ValueError("Expected an object")
+            timer = TimerUpsert.model_validate(record)
+            date = normalize_date(timer.date)
+        except ValidationError as error:
+            reason = "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors())
+            reject_import(result, number, reason)
+            continue
+        except HTTPException as error:
+            reject_import(result, number, error.detail)
+            continue
+        except ValueError as error:
+            reject_import(result, number, str(error))
+            continue
+        
+        entry_id = timer.id or str(uuid.uuid4())
+        if entry_id in seen or (timer.id and stored_entry_date(entry_id) is not None):
+            result["duplicates"] += 1
+            continue
+        seen.add(entry_id)
+        entries.append(make_entry(entry_id, timer, date))
+    return entries
+
+def reject_import(result: dict, number: int, reason: str) -> None:
+    result["rejected"] += 1
+    if len(result["errors"]) < BULK_MAX_ERRORS:
+        result["errors"].append({"record": number, "error": reason})
+
+def import_entries(records) -> dict:
+    """Import (number, record) pairs from iter_records, writing each affected day once.
+
+    Records are validated BULK_CHUNK_SIZE at a time and grouped by date; ids
+    that are already stored or repeat within the import are skipped, so
+    re-running an import is harmless. Raises ValueError if the input itself
+    is malformed, before anything is written.
+    """
+    result = {"received": 0, "inserted": 0, "duplicates": 0, "rejected": 0, "days": 0, "errors": []}
+    by_date = {}
+    seen = set()
+    chunk = []
+    for item in chain(records, [None]):
+        if item is not None:
+            chunk.append(item)
+            if len(chunk) < BULK_CHUNK_SIZE:
+                continue
+        result["received"] += len(chunk)
+        for entry in validate_import_chunk(chunk, seen, result):
+            by_date.setdefault(entry["date"], []).append(entry)
+        chunk = []
+    
+    for date in sorted(by_date):
+        with storage_locks.hold(date):
+            day_data = load_day_data(date)
+            # The day itself has the final say on which ids it already holds
+            existing = {entry.get("id") for entry in day_data["entries"]}
+            new_entries = [entry for entry in by_date[date] if entry["id"] not in existing]
+            result["duplicates"] += len(by_date[date]) - len(new_entries)
+            if not new_entries:
+                continue
+            day_data["entries"].extend(new_entries)
+            day_data["total_duration"] = calculate_total_duration(day_data["entries"])
+            save_day_data(date, day_data)
+        result["inserted"] += len(new_entries)
+        result["days"] += 1
+    
+    if result["inserted"]:
+        # Too many changes to send one by one; clients refetch what they show
+        broker.publish("resync", {"reason": "import"})
+    return result
+
+@router.post("/timers/bulk", response_model=dict)
+async def bulk_import_timers(request: Request, fmt: str | None = Query(None, alias="format", pattern="^(json|ndjson|csv)$")):
+    """Import many entries from a JSON array, NDJSON or CSV request body.
+
+    The format is taken from `format`, else the Content-Type, else JSON.
+    Records use the fields of POST /timers plus an optional `id`. Each day
+    is written once; entries whose id is already stored are skipped. Returns
+    received/inserted/duplicates/rejected counts and the first errors.
+    """
+    fmt = fmt or detect_format(request.headers.get("content-type")) or "json"
+    with tempfile.SpooledTemporaryFile(max_size=BULK_SPOOL_BYTES) as body:
+        async for data in request.stream():
+            await run_io(body.write, data)
+        body.seek(0)
+        return await run_io(import_upload, body, fmt)
+
+def import_upload(body, fmt: str) -> dict:
+    try:
+        return import_entries(iter_records(iter(functools.partial(body.read, 64 * 1024), b""), fmt))
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+def resolve_overlaps(date: str, day_data: dict, entry: dict) -> dict:
+    """Make room for entry in day_data by trimming, splitting or deleting the entries it overlaps.
+
+    Mirrors the rules the edit modal used to apply one request at a time:
+    entries the new one covers are deleted, entries it overlaps at one end
+    are trimmed, and an entry it sits inside is split around it.
+    """
+    new_start, new_end = entry_span(entry)
+    positions = {existing.get("id"): idx for idx, existing in enumerate(day_data["entries"])}
+    changes = {"deleted": [], "trimmed": [], "split": []}
+    removed = set()
+    
+    for entry_id in intervals.get(date, day_data["entries"]).overlapping(new_start, new_end):
+        idx = positions.get(entry_id)
+        if idx is None or entry_id == entry["id"]:
+            continue
+        existing = day_data["entries"][idx]
+        start, end = entry_span(existing)
+        if start >= end or new_start >= end or new_end <= start:
+            continue
+        
+        if new_start <= start and new_end >= end:
+            removed.add(idx)
+            changes["deleted"].append(entry_id)
+        elif new_start > start and new_end >= end:
+            existing["end_time"] = entry["start_time"]
+            existing["duration"] = int((new_start - start).total_seconds())
+            changes["trimmed"].append(entry_id)
+        elif new_start <= start:
+            existing["start_time"] = entry["end_time"]
+            existing["duration"] = int((end - new_end).total_seconds())
+            changes["trimmed"].append(entry_id)
+        else:
+            tail = {
+                **existing,
+                "id": str(uuid.uuid4()),
+                "start_time": entry["end_time"],
+                "duration": int((end - new_end).total_seconds()),
+            }
+            existing["end_time"] = entry["start_time"]
+            existing["duration"] = int((new_start - start).total_seconds())
+            day_data["entries"].append(tail)
+            changes["split"].append({"id": entry_id, "new_id": tail["id"]})
+    
+    day_data["entries"] = [existing for idx, existing in enumerate(day_data["entries"]) if idx not in removed]
+    day_data["entries"].append(entry)
     day_data["total_duration"] = calculate_total_duration(day_data["entries"])
-    save_day_data(date, day_data)
+    return changes
+
+def publish_overlap_changes(date: str, day_data: dict, entry: dict, changes: dict, old_date: str | None = None) -> None:
+    """Publish one event per entry that an overlap-resolving save touched"""
+    entries = {existing["id"]: existing for existing in day_data["entries"]}
+    for entry_id in changes["deleted"]:
+        publish_entry_change("entry.deleted", date, day_data, id=entry_id)
+    for entry_id in changes["trimmed"]:
+        publish_entry_change("entry.updated", date, day_data, entry=entries[entry_id])
+    for split in changes["split"]:
+        publish_entry_change("entry.updated", date, day_data, entry=entries[split["id"]])
+        publish_entry_change("entry.created", date, day_data, entry=entries[split["new_id"]])
+    if old_date is None:
+        publish_entry_change("entry.created", date, day_data, entry=entry)
+    else:
+        publish_entry_change("entry.updated", date, day_data, entry=entry, previous_date=old_date)
+
+@router.post("/timers/upsert-resolving-overlaps", response_model=dict)
+@offload
+def upsert_resolving_overlaps(timer: TimerUpsert):
+    """Create or update an entry, adjusting the entries it overlaps on its day in the same write"""
+    date = normalize_date(timer.date)
+    end_time = timer.end_time or timer.start_time + timedelta(seconds=timer.duration)
+    if end_time <= timer.start_time:
+        raise HTTPException(status_code=400, detail="End time must be after start time")
+    
+    entry_dict = {
+        "id": timer.id or str(uuid.uuid4()),
+        "project": timer.project,
+        "category": timer.category,
+        "description": timer.description,
+        "start_time": timer.start_time.isoformat(),
+        "end_time": end_time.isoformat(),
+        "duration": timer.duration,
+        "date": date
+    }
+    
+    if timer.id:
+        # Editing: take the entry out of whichever day holds it, then place it
+        with locked_entry(timer.id, date) as (old_date, day_data, idx):
+            day_data["entries"].pop(idx)
+            if old_date != date:
+                day_data["total_duration"] = calculate_total_duration(day_data["entries"])
+                save_day_data(old_date, day_data)
+                day_data = load_day_data(date)
+            changes = resolve_overlaps(date, day_data, entry_dict)
+            save_day_data(date, day_data)
+            publish_overlap_changes(date, day_data, entry_dict, changes, old_date)
+    else:
+        with storage_locks.hold(date):
+            day_data = load_day_data(date)
+            changes = resolve_overlaps(date, day_data, entry_dict)
+            save_day_data(date, day_data)
+            publish_overlap_changes(date, day_data, entry_dict, changes)
+    
+    return FastJSONResponse({"entry": entry_dict, **changes})
+
+@router.get("/timers/range")
+async def get_range_timers(
+    start: str = Query(..., alias="from"),
+    end: str = Query(..., alias="to"),
+    project: str | None = None,
+    category: str | None = None,
+):
+    """Stream all entries between two dates (inclusive) as newline-delimited JSON"""
+    # Day files are named by zero-padded dates, which strptime doesn't require
+    start = normalize_date(start)
+    end = normalize_date(end)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
     
-    return TimerEntry(**entry_dict)
+    def generate():
+        for entry in storage.iter_entries(start, end, project, category):
+            yield serialization.dumps(entry) + b"\n"
+    
+    return StreamingResponse(iterate_io(generate()), media_type="application/x-ndjson")
+
+@router.get("/export")
+async def export_entries(
+    start: str = Query(..., alias="from"),
+    end: str = Query(..., alias="to"),
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson|json)$"),
+    project: str | None = None,
+    category: str | None = None,
+    gzip: bool = False,
+):
+    """Download every entry between two dates (inclusive) as CSV, NDJSON or a JSON array.
+
+    The file is streamed a day at a time, so memory use doesn't grow with
+    the range. gzip=true compresses it on the fly into a .gz download.
+    """
+    start = normalize_date(start)
+    end = normalize_date(end)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    
+    filename = f"time-entries_{start}_{end}.{fmt}" + (".gz" if gzip else "")
+    stream = export_stream(storage.iter_entries(start, end, project, category), fmt, compress=gzip)
+    return StreamingResponse(
+        iterate_io(stream),
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @router.get("/timers/{date}", response_model=DayActivitySummary)
-def get_day_timers(date: str):
+async def get_day_timers(date: str, request: Request):
     """Get all timer entries for a specific day (format: YYYY-MM-DD)"""
     try:
         datetime.strptime(date, "%Y-%m-%d")
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    day_data = load_day_data(date)
+    etag = make_etag("day", *await day_stamps_async([date]))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
     # Ensure total_duration is correct even if entries were manually deleted
-    day_data = ensure_total_duration(date, day_data)
-    save_day_data(date, day_data)  # Save corrected data
-    return DayActivitySummary(
-        date=date,
-        total_duration=day_data.get("total_duration", 0),
-        entries=[TimerEntry(**entry) for entry in day_data.get("entries", [])]
-    )
+    day_data = await run_io(load_checked_day, date)
+    # Stored entries were validated when written, so they go out as they are
+    return FastJSONResponse({
+        "date": date,
+        "total_duration": day_data.get("total_duration", 0),
+        "entries": day_data.get("entries", [])
+    }, headers=cache_headers(etag))
 
 @router.get("/timers/week/{start_date}", response_model=dict)
-def get_week_timers(start_date: str):
+async def get_week_timers(start_date: str, request: Request):
     """Get all timer entries for a week (7 days starting from start_date)"""
-    try:
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    start = parse_date(start_date)
+    dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
     
-    week_data = {}
-    for i in range(7):
-        date = (start + timedelta(days=i)).strftime("%Y-%m-%d")
-        day_data = load_day_data(date)
-        # Ensure total_duration is correct even if entries were manually deleted
-        day_data = ensure_total_duration(date, day_data)
-        save_day_data(date, day_data)  # Save corrected data
+    etag = make_etag("week", *await day_stamps_async(dates))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    # Days without a file stay empty; only existing files are read, all at once
+    week_data = {date: {"total_duration": 0, "entries": []} for date in dates}
+    for date, day_data in (await load_days_async(dates[0], dates[-1])).items():
         week_data[date] = {
             "total_duration": day_data.get("total_duration", 0),
             "entries": day_data.get("entries", [])
         }
     
-    return week_data
+    return FastJSONResponse(week_data, headers=cache_headers(etag))
 
 @router.put("/timers/{entry_id}", response_model=TimerEntry)
+@offload
 def update_timer(entry_id: str, timer: TimerCreate):
     """Update an existing timer entry"""
     new_date = timer.start_time.strftime("%Y-%m-%d")
     
-    # First, find and delete the old entry from any date (past or future)
-    today = datetime.now()
-    old_date = None
-    # Search 30 days in the past and 30 days in the future
-    for i in range(-30, 31):
-        date = (today + timedelta(days=i)).strftime("%Y-%m-%d")
-        day_data = load_day_data(date)
-        
-        for idx, entry in enumerate(day_data["entries"]):
-            if entry["id"] == entry_id:
-                old_date = date
-                day_data["entries"].pop(idx)
-                day_data["total_duration"] = calculate_total_duration(day_data["entries"])
-                save_day_data(date, day_data)
-                break
-        
-        if old_date:
-            break
-    
-    if not old_date:
-        raise HTTPException(status_code=404, detail="Timer entry not found")
-    
     # Create updated entry on new date
     updated_entry = {
         "id": entry_id,
@@ -266,78 +878,288 @@ def update_timer(entry_id: str, timer: TimerCreate):
         "date": new_date
     }
     
-    new_day_data = load_day_data(new_date)
-    new_day_data["entries"].append(updated_entry)
-    new_day_data["total_duration"] = calculate_total_duration(new_day_data["entries"])
-    save_day_data(new_date, new_day_data)
+    # Find and remove the old entry wherever it is stored, holding both days
+    with locked_entry(entry_id, new_date) as (old_date, day_data, idx):
+        day_data["entries"].pop(idx)
+        day_data["total_duration"] = calculate_total_duration(day_data["entries"])
+        save_day_data(old_date, day_data)
+        
+        new_day_data = load_day_data(new_date)
+        new_day_data["entries"].append(updated_entry)
+        new_day_data["total_duration"] = calculate_total_duration(new_day_data["entries"])
+        save_day_data(new_date, new_day_data)
+        publish_entry_change("entry.updated", new_date, new_day_data, entry=updated_entry, previous_date=old_date)
     
-    return TimerEntry(**updated_entry)
+    return FastJSONResponse(updated_entry)
 
 @router.delete("/timers/{entry_id}")
+@offload
 def delete_timer(entry_id: str):
     """Delete a timer entry"""
-    # Search through all recent and future dates to find and delete the entry
-    today = datetime.now()
-    # Search 30 days in the past and 30 days in the future
-    for i in range(-30, 31):
-        date = (today + timedelta(days=i)).strftime("%Y-%m-%d")
-        day_data = load_day_data(date)
-        
-        for idx, entry in enumerate(day_data["entries"]):
-            if entry["id"] == entry_id:
-                day_data["entries"].pop(idx)
-                day_data["total_duration"] = calculate_total_duration(day_data["entries"])
-                save_day_data(date, day_data)
-                return {"message": "Timer entry deleted"}
+    with locked_entry(entry_id) as (date, day_data, idx):
+        day_data["entries"].pop(idx)
+        day_data["total_duration"] = calculate_total_duration(day_data["entries"])
+        save_day_data(date, day_data)
+        publish_entry_change("entry.deleted", date, day_data, id=entry_id)
+    return {"message": "Timer entry deleted"}
+
+@router.post("/timers/batch", response_model=dict)
+@offload
+def batch_timers(operations: list[BatchOperation]):
+    """Apply a list of create/update/delete operations in one request.
+
+    Operations are `{"op": "create", "entry": {...}}`, `{"op": "update",
+    "id", "entry": {...}}` or `{"op": "delete", "id"}`, applied in order.
+    Every affected day is locked, loaded once, changed by all of them and
+    saved once. Returns one result per operation: its status (200, or 400
+    / 404 for one that was skipped) and the saved entry or deleted id.
+    """
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_OPERATIONS} operations per batch")
+    results = [None] * len(operations)
+    # Day each create or update saves its entry to, as the locks and day files name it
+    targets = {}
+    for index, operation in enumerate(operations):
+        if operation.op != "delete" and operation.entry is None:
+            results[index] = {"op": operation.op, "status": 400, "error": "'entry' is required"}
+        elif operation.op != "create" and not operation.id:
+            results[index] = {"op": operation.op, "status": 400, "error": "'id' is required"}
+        elif operation.op == "create":
+            try:
+                targets[index] = normalize_date(operation.entry.date)
+            except HTTPException as error:
+                results[index] = {"op": "create", "status": 400, "error": error.detail}
+        elif operation.op == "update":
+            targets[index] = operation.entry.start_time.strftime("%Y-%m-%d")
+    valid = [(index, operation) for index, operation in enumerate(operations) if results[index] is None]
+    ids = {operation.id for _, operation in valid if operation.op != "create"}
+    target_dates = set(targets.values())
     
-    raise HTTPException(status_code=404, detail="Timer entry not found")
+    while True:
+        located = {entry_id: stored_entry_date(entry_id) for entry_id in ids}
+        dates = target_dates | {date for date in located.values() if date}
+        with storage_locks.hold(*dates):
+            if {entry_id: stored_entry_date(entry_id) for entry_id in ids} != located:
+                continue  # An entry moved before we got the locks; lock its new day instead
+            days = {date: load_day_data(date) for date in dates}
+            changed = set()
+            events = []
+            for index, operation in valid:
+                if operation.op == "create":
+                    date = targets[index]
+                    entry = make_entry(str(uuid.uuid4()), operation.entry, date)
+                    days[date]["entries"].append(entry)
+                    changed.add(date)
+                    results[index] = {"op": "create", "status": 200, "entry": entry}
+                    events.append(("entry.created", date, {"entry": entry}))
+                    continue
+                
+                old_date = located.get(operation.id)
+                entries = days[old_date]["entries"] if old_date else []
+                idx = next((i for i, entry in enumerate(entries) if entry.get("id") == operation.id), None)
+                if idx is None:
+                    results[index] = {"op": operation.op, "status": 404, "id": operation.id, "error": "Timer entry not found"}
+                    continue
+                entries.pop(idx)
+                changed.add(old_date)
+                if operation.op == "delete":
+                    located[operation.id] = None
+                    results[index] = {"op": "delete", "status": 200, "id": operation.id}
+                    events.append(("entry.deleted", old_date, {"id": operation.id}))
+                    continue
+                new_date = targets[index]
+                entry = make_entry(operation.id, operation.entry, new_date)
+                days[new_date]["entries"].append(entry)
+                located[operation.id] = new_date
+                changed.add(new_date)
+                results[index] = {"op": "update", "status": 200, "entry": entry}
+                events.append(("entry.updated", new_date, {"entry": entry, "previous_date": old_date}))
+            
+            for date in sorted(changed):
+                days[date]["total_duration"] = calculate_total_duration(days[date]["entries"])
+                save_day_data(date, days[date])
+            for event, date, data in events:
+                publish_entry_change(event, date, days[date], **data)
+        return FastJSONResponse({"results": results, "days": len(changed)})
+
+@router.get("/changes", response_model=dict)
+@offload
+def get_changes(since: int = Query(0, ge=0), limit: int = Query(1000, ge=1, le=10000), entries: bool = True):
+    """Get entries and settings changed after version `since`, oldest first.
+
+    Pass the returned `version` as `since` next time (and straight away while
+    `more` is true). `reset` means the client's copy is too old to patch and
+    the response lists everything instead. With entries=false only the
+    settings are reported.
+    """
+    if not change_log.loaded:
+        load_change_log()
+    reset, latest, changed = change_log.since(since)
+    if not entries:
+        changed = [(key, record) for key, record in changed if key == SETTINGS_KEY]
+    more = len(changed) > limit
+    changed = changed[:limit]
+    
+    result = {
+        "since": since,
+        "version": changed[-1][1]["v"] if more else latest,
+        "latest": latest,
+        "reset": reset,
+        "more": more,
+        "entries": [],
+        "deleted": [],
+        "settings": None,
+    }
+    wanted = {}
+    for key, record in changed:
+        if key == SETTINGS_KEY:
+            result["settings"] = load_settings()
+        elif record.get("deleted"):
+            result["deleted"].append(key)
+        else:
+            wanted.setdefault(record["date"], set()).add(key)
+    
+    # One load per changed day, however many of its entries changed
+    for date in sorted(wanted):
+        for entry in load_day_data(date).get("entries", []):
+            if entry.get("id") in wanted[date]:
+                result["entries"].append({**entry, "date": date})
+    return result
+
+@router.get("/search", response_model=dict)
+async def search_entries(
+    q: str = Query(..., min_length=1),
+    start: str | None = Query(None, alias="from"),
+    end: str | None = Query(None, alias="to"),
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+):
+    """Find entries whose description, project or category contain every word of q.
+
+    Words also match longer terms they are a prefix of ("tick" finds
+    "ticket"), scoring lower than exact matches. Results are ranked best
+    first, optionally limited to dates between from and to (inclusive), and
+    paginated with offset and limit; `total` counts every match.
+    """
+    if start is not None:
+        start = normalize_date(start)
+    if end is not None:
+        end = normalize_date(end)
+    if not search_index.loaded:
+        await run_io(load_search_index)
+    hits = await run_io(search_index.search, q, start, end)
+    page = hits[offset:offset + limit]
+    
+    # One load per day on the page, all at once
+    dates = sorted({date for _, _, date in page})
+    days = dict(zip(dates, await asyncio.gather(*(load_day_data_async(date) for date in dates))))
+    results = []
+    for score, entry_id, date in page:
+        entry = next((entry for entry in days[date].get("entries", []) if entry.get("id") == entry_id), None)
+        if entry is not None:
+            results.append({**entry, "date": date, "score": round(score, 4)})
+    
+    return FastJSONResponse({"query": q, "total": len(hits), "offset": offset, "limit": limit, "results": results})
+
+@router.get("/cache/stats", response_model=dict)
+@offload
+def get_cache_stats():
+    """Get hit/miss counters for the day and settings file cache, plus storage engine state"""
+    return storage.stats()
 
 @router.get("/stats/week/{start_date}", response_model=dict)
-def get_week_stats(start_date: str):
+async def get_week_stats(start_date: str, request: Request):
     """Get weekly statistics with breakdown by project and category"""
-    try:
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    start = parse_date(start_date)
+    dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
     
-    week_data = {}
-    projects = {}
-    categories = {}
-    total_seconds = 0
+    etag = make_etag("week-stats", *await day_stamps_async(dates))
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
-    for i in range(7):
-        date = (start + timedelta(days=i)).strftime("%Y-%m-%d")
-        day_data = load_day_data(date)
-        
-        week_data[date] = day_data.get("total_duration", 0)
-        total_seconds += day_data.get("total_duration", 0)
-        
-        for entry in day_data.get("entries", []):
-            project = entry.get("project", "Uncategorized")
-            category = entry.get("category", "Uncategorized")
-            duration = entry.get("duration", 0)
-            
-            projects[project] = projects.get(project, 0) + duration
-            categories[category] = categories.get(category, 0) + duration
+    if not rollups.loaded:
+        await run_io(load_rollups)
+    totals = rollups.summarize(dates[0], dates[-1], daily=True)
+    
+    return FastJSONResponse({
+        "total_seconds": totals["total"],
+        "daily_breakdown": totals["daily"],
+        "project_breakdown": totals["projects"],
+        "category_breakdown": totals["categories"]
+    }, headers=cache_headers(etag))
+
+@router.get("/stats/period/{period}", response_model=dict)
+@offload
+def get_period_stats(period: str):
+    """Get totals for one day, ISO week, month or year (YYYY-MM-DD, YYYY-Www, YYYY-MM or YYYY)"""
+    if not PERIOD_PATTERN.match(period):
+        raise HTTPException(status_code=400, detail="Invalid period. Use YYYY-MM-DD, YYYY-Www, YYYY-MM or YYYY")
+    if not rollups.loaded:
+        load_rollups()
+    bucket = rollups.bucket(period)
     
     return {
-        "total_seconds": total_seconds,
-        "daily_breakdown": week_data,
-        "project_breakdown": projects,
-        "category_breakdown": categories
+        "period": period,
+        "total_seconds": bucket["total"],
+        "entry_count": bucket["count"],
+        "project_breakdown": bucket["projects"],
+        "category_breakdown": bucket["categories"]
     }
 
+def range_report(start: str, end: str, top: int, utc_offset: int) -> dict:
+    """Vectorized report over [start, end] from the columnar entry store"""
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    load_columns()
+    return FastJSONResponse(columns.report(start, end, top=top, utc_offset=utc_offset))
+
+@router.get("/stats/range", response_model=dict)
+@offload
+def get_range_stats(
+    start: str = Query(..., alias="from"),
+    end: str = Query(..., alias="to"),
+    top: int = Query(5, ge=0),
+    utc_offset: int = Query(0, ge=-24 * 60, le=24 * 60),
+):
+    """Get totals, project/category/weekday/hour/day/month breakdowns and top projects between two dates inclusive"""
+    start = normalize_date(start)
+    end = normalize_date(end)
+    return range_report(start, end, top, utc_offset)
+
+@router.get("/stats/month/{month}", response_model=dict)
+@offload
+def get_month_stats(month: str, top: int = Query(5, ge=0), utc_offset: int = Query(0, ge=-24 * 60, le=24 * 60)):
+    """Get the range report for one month (YYYY-MM)"""
+    if not MONTH_PATTERN.match(month):
+        raise HTTPException(status_code=400, detail="Invalid month format. Use YYYY-MM")
+    first = datetime.strptime(month, "%Y-%m")
+    last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return range_report(first.strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d"), top, utc_offset)
+
+@router.get("/stats/year/{year}", response_model=dict)
+@offload
+def get_year_stats(year: str, top: int = Query(5, ge=0), utc_offset: int = Query(0, ge=-24 * 60, le=24 * 60)):
+    """Get the range report for one year (YYYY)"""
+    if not YEAR_PATTERN.match(year):
+        raise HTTPException(status_code=400, detail="Invalid year format. Use YYYY")
+    return range_report(f"{year}-01-01", f"{year}-12-31", top, utc_offset)
+
+@metrics.timed("load_settings")
 def load_settings() -> dict:
-    """Load settings from file"""
-    if os.path.exists(SETTINGS_FILE):
-        with open(SETTINGS_FILE, 'r', encoding='utf-8-sig') as f:
-            return json.load(f)
+    """Load settings"""
+    settings = storage.load_settings()
+    if settings is not None:
+        return settings
     return {"projects": [], "categories": [], "project_colors": {}, "category_colors": {}}
 
+@metrics.timed("save_settings")
 def save_settings(settings: dict) -> None:
-    """Save settings to file"""
-    with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(settings, f, indent=2)
+    """Save settings"""
+    if change_log.loaded and storage.load_settings() != settings:
+        storage.save_settings(settings)
+        change_log.record_settings()
+    else:
+        storage.save_settings(settings)
 
 # Enhanced color palette - vibrant, distinct colors that work well in gradients
 # Red/Pink hues
@@ -472,163 +1294,182 @@ def get_color_for_category(category_name: str, category_colors: dict, project_co
     return best_color
 
 @router.get("/settings/projects", response_model=list)
-def get_projects():
+async def get_projects():
     """Get all custom projects"""
-    settings = load_settings()
+    settings = await load_settings_async()
     return settings.get("projects", [])
 
 @router.post("/settings/projects", response_model=list)
+@offload
 def add_project(project: SettingName):
     """Add a new project"""
-    settings = load_settings()
-    projects = settings.get("projects", [])
-    
-    project_name = project.name.strip()
-    if project_name and project_name not in projects:
-        projects.append(project_name)
-        settings["projects"] = projects
+    with storage_locks.hold(SETTINGS_LOCK):
+        settings = load_settings()
+        projects = settings.get("projects", [])
         
-        # Auto-assign color, considering existing category colors
-        project_colors = settings.get("project_colors", {})
-        category_colors = settings.get("category_colors", {})
-        if project_name not in project_colors:
-            project_colors[project_name] = get_color_for_project(project_name, project_colors, category_colors)
-            settings["project_colors"] = project_colors
+        project_name = project.name.strip()
+        if project_name and project_name not in projects:
+            projects.append(project_name)
+            settings["projects"] = projects
         
-        save_settings(settings)
-    
-    return settings.get("projects", [])
+            # Auto-assign color, considering existing category colors
+            project_colors = settings.get("project_colors", {})
+            category_colors = settings.get("category_colors", {})
+            if project_name not in project_colors:
+                project_colors[project_name] = get_color_for_project(project_name, project_colors, category_colors)
+                settings["project_colors"] = project_colors
+        
+            save_settings(settings)
+        
+        return settings.get("projects", [])
 
 @router.put("/settings/projects", response_model=list)
+@offload
 def sync_projects(projects_data: ProjectListSync):
     """Sync projects list (merge with existing)"""
-    settings = load_settings()
-    existing_projects = set(settings.get("projects", []))
-    new_projects = set(projects_data.projects)
-    
-    # Merge both lists
-    merged = sorted(list(existing_projects.union(new_projects)))
-    settings["projects"] = merged
-    
-    # Assign colors to new projects, considering existing category colors
-    project_colors = settings.get("project_colors", {})
-    category_colors = settings.get("category_colors", {})
-    for proj in merged:
-        if proj not in project_colors:
-            project_colors[proj] = get_color_for_project(proj, project_colors, category_colors)
-    settings["project_colors"] = project_colors
-    
-    save_settings(settings)
-    
-    return merged
+    with storage_locks.hold(SETTINGS_LOCK):
+        settings = load_settings()
+        existing_projects = set(settings.get("projects", []))
+        new_projects = set(projects_data.projects)
+        
+        # Merge both lists
+        merged = sorted(list(existing_projects.union(new_projects)))
+        settings["projects"] = merged
+        
+        # Assign colors to new projects, considering existing category colors
+        project_colors = settings.get("project_colors", {})
+        category_colors = settings.get("category_colors", {})
+        for proj in merged:
+            if proj not in project_colors:
+                project_colors[proj] = get_color_for_project(proj, project_colors, category_colors)
+        settings["project_colors"] = project_colors
+        
+        save_settings(settings)
+        
+        return merged
 
 @router.get("/settings/categories", response_model=list)
-def get_categories():
+async def get_categories():
     """Get all custom categories"""
-    settings = load_settings()
+    settings = await load_settings_async()
     return settings.get("categories", [])
 
 @router.post("/settings/categories", response_model=list)
+@offload
 def add_category(category: SettingName):
     """Add a new category"""
-    settings = load_settings()
-    categories = settings.get("categories", [])
-    
-    category_name = category.name.strip()
-    if category_name and category_name not in categories:
-        categories.append(category_name)
-        settings["categories"] = categories
+    with storage_locks.hold(SETTINGS_LOCK):
+        settings = load_settings()
+        categories = settings.get("categories", [])
         
-        # Auto-assign color, considering existing project colors
-        category_colors = settings.get("category_colors", {})
-        project_colors = settings.get("project_colors", {})
-        if category_name not in category_colors:
-            category_colors[category_name] = get_color_for_category(category_name, category_colors, project_colors)
-            settings["category_colors"] = category_colors
+        category_name = category.name.strip()
+        if category_name and category_name not in categories:
+            categories.append(category_name)
+            settings["categories"] = categories
         
-        save_settings(settings)
-    
-    return settings.get("categories", [])
+            # Auto-assign color, considering existing project colors
+            category_colors = settings.get("category_colors", {})
+            project_colors = settings.get("project_colors", {})
+            if category_name not in category_colors:
+                category_colors[category_name] = get_color_for_category(category_name, category_colors, project_colors)
+                settings["category_colors"] = category_colors
+        
+            save_settings(settings)
+        
+        return settings.get("categories", [])
 
 @router.put("/settings/categories", response_model=list)
+@offload
 def sync_categories(categories_data: CategoryListSync):
     """Sync categories list (merge with existing)"""
-    settings = load_settings()
-    existing_categories = set(settings.get("categories", []))
-    new_categories = set(categories_data.categories)
-    
-    # Merge both lists
-    merged = sorted(list(existing_categories.union(new_categories)))
-    settings["categories"] = merged
-    
-    # Assign colors to new categories, considering existing project colors
-    category_colors = settings.get("category_colors", {})
-    project_colors = settings.get("project_colors", {})
-    for cat in merged:
-        if cat not in category_colors:
-            category_colors[cat] = get_color_for_category(cat, category_colors, project_colors)
-    settings["category_colors"] = category_colors
-    
-    save_settings(settings)
-    
-    return merged
+    with storage_locks.hold(SETTINGS_LOCK):
+        settings = load_settings()
+        existing_categories = set(settings.get("categories", []))
+        new_categories = set(categories_data.categories)
+        
+        # Merge both lists
+        merged = sorted(list(existing_categories.union(new_categories)))
+        settings["categories"] = merged
+        
+        # Assign colors to new categories, considering existing project colors
+        category_colors = settings.get("category_colors", {})
+        project_colors = settings.get("project_colors", {})
+        for cat in merged:
+            if cat not in category_colors:
+                category_colors[cat] = get_color_for_category(cat, category_colors, project_colors)
+        settings["category_colors"] = category_colors
+        
+        save_settings(settings)
+        
+        return merged
 
 @router.get("/settings/colors", response_model=dict)
-def get_all_colors():
+@offload
+def get_all_colors(request: Request, response: Response):
     """Get all project and category colors"""
-    settings = load_settings()
-    
-    # Ensure color dicts exist
-    project_colors = settings.get("project_colors", {})
-    category_colors = settings.get("category_colors", {})
-    
-    # Auto-assign colors to any projects/categories without them
-    projects = settings.get("projects", [])
-    categories = settings.get("categories", [])
-    
-    colors_updated = False
-    for project in projects:
-        if project not in project_colors:
-            project_colors[project] = get_color_for_project(project, project_colors, category_colors)
-            colors_updated = True
+    etag = make_etag("colors", storage.settings_stamp())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     
-    for category in categories:
-        if category not in category_colors:
-            category_colors[category] = get_color_for_category(category, category_colors, project_colors)
-            colors_updated = True
-    
-    if colors_updated:
-        settings["project_colors"] = project_colors
-        settings["category_colors"] = category_colors
-        save_settings(settings)
-    
-    return {
-        "project_colors": project_colors,
-        "category_colors": category_colors
-    }
+    with storage_locks.hold(SETTINGS_LOCK):
+        settings = load_settings()
+        
+        # Ensure color dicts exist
+        project_colors = settings.get("project_colors", {})
+        category_colors = settings.get("category_colors", {})
+        
+        # Auto-assign colors to any projects/categories without them
+        projects = settings.get("projects", [])
+        categories = settings.get("categories", [])
+        
+        colors_updated = False
+        for project in projects:
+            if project not in project_colors:
+                project_colors[project] = get_color_for_project(project, project_colors, category_colors)
+                colors_updated = True
+        
+        for category in categories:
+            if category not in category_colors:
+                category_colors[category] = get_color_for_category(category, category_colors, project_colors)
+                colors_updated = True
+        
+        if colors_updated:
+            settings["project_colors"] = project_colors
+            settings["category_colors"] = category_colors
+            save_settings(settings)
+        
+        return {
+            "project_colors": project_colors,
+            "category_colors": category_colors
+        }
 
 @router.put("/settings/project-color/{project_name}", response_model=dict)
+@offload
 def set_project_color(project_name: str, color_data: ColorUpdate):
     """Set a specific color for a project"""
-    settings = load_settings()
-    project_colors = settings.get("project_colors", {})
-    
-    if color_data.color:
-        project_colors[project_name] = color_data.color
-        settings["project_colors"] = project_colors
-        save_settings(settings)
-    
-    return {"project_name": project_name, "color": project_colors.get(project_name)}
+    with storage_locks.hold(SETTINGS_LOCK):
+        settings = load_settings()
+        project_colors = settings.get("project_colors", {})
+        
+        if color_data.color:
+            project_colors[project_name] = color_data.color
+            settings["project_colors"] = project_colors
+            save_settings(settings)
+        
+        return {"project_name": project_name, "color": project_colors.get(project_name)}
 
 @router.put("/settings/category-color/{category_name}", response_model=dict)
+@offload
 def set_category_color(category_name: str, color_data: ColorUpdate):
     """Set a specific color for a category"""
-    settings = load_settings()
-    category_colors = settings.get("category_colors", {})
-    
-    if color_data.color:
-        category_colors[category_name] = color_data.color
-        settings["category_colors"] = category_colors
-        save_settings(settings)
-    
-    return {"category_name": category_name, "color": category_colors.get(category_name)}
+    with storage_locks.hold(SETTINGS_LOCK):
+        settings = load_settings()
+        category_colors = settings.get("category_colors", {})
+        
+        if color_data.color:
+            category_colors[category_name] = color_data.color
+            settings["category_colors"] = category_colors
+            save_settings(settings)
+        
+        return {"category_name": category_name, "color": category_colors.get(category_name)}
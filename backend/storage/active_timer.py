@@ -0,0 +1,87 @@
+import copy
+import threading
+
+
+class ActiveTimerStore:
+    """The running timer, held in memory and checkpointed to the storage engine.
+
+    Reads never touch storage after the first load. Starting, stopping and
+    discarding are written through straight away; field edits only mark the
+    timer dirty and are coalesced into one checkpoint at most flush_seconds
+    later, so at most that window of edits is lost if the process dies.
+
+    With SharedCounters, every checkpoint bumps its "active_timer" counter
+    and a copy is reloaded once another process has bumped it, so worker
+    processes see each other's changes (run those with flush_seconds=0).
+    """
+
+    def __init__(self, storage, flush_seconds: float = 2.0, counters=None):
+        self.storage = storage
+        self.flush_seconds = flush_seconds
+        self.counters = counters
+        self._timer = None
+        self._loaded = False
+        self._seen = 0
+        self._dirty = False
+        self._pending = None
+        self._lock = threading.RLock()
+
+    def get(self) -> dict | None:
+        """A copy of the running timer, or None"""
+        with self._lock:
+            self._load()
+            return copy.deepcopy(self._timer)
+
+    def set(self, timer_data: dict | None) -> None:
+        """Replace (or clear, with None) the running timer and persist it now"""
+        with self._lock:
+            self._loaded = True
+            self._timer = copy.deepcopy(timer_data)
+            self._dirty = True
+            self.flush()
+
+    def update(self, fields: dict) -> dict | None:
+        """Change fields of the running timer; persisted by the next checkpoint.
+
+        Returns the updated timer, or None if no timer is running.
+        """
+        with self._lock:
+            self._load()
+            if self._timer is None:
+                return None
+            self._timer.update(fields)
+            self._dirty = True
+            if self.flush_seconds <= 0:
+                self.flush()
+            elif self._pending is None:
+                self._pending = threading.Timer(self.flush_seconds, self.flush)
+                self._pending.daemon = True
+                self._pending.start()
+            return copy.deepcopy(self._timer)
+
+    def flush(self) -> None:
+        """Write the timer to storage if it changed since the last checkpoint"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.cancel()
+                self._pending = None
+            if self._dirty:
+                self.storage.save_active_timer(self._timer)
+                self._dirty = False
+                if self.counters is not None:
+                    generation = self.counters.bump("active_timer")
+                    # Only our own write happened since we last looked
+                    if generation == self._seen + 1:
+                        self._seen = generation
+
+    def close(self) -> None:
+        self.flush()
+
+    def _load(self) -> None:
+        generation = self.counters.read("active_timer") if self.counters is not None else 0
+        if self._loaded and generation != self._seen and not self._dirty:
+            self._loaded = False
+        if not self._loaded:
+            self._timer = self.storage.load_active_timer()
+            self._loaded = True
+            self._seen = generation
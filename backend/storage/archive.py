@@ -0,0 +1,150 @@
+import mmap
+import os
+import re
+import struct
+import threading
+from storage import iostats, serialization
+from storage.files import atomic_write_bytes, stat_stamp
+
+SEGMENT_FILE_PATTERN = re.compile(r"^(\d{4}-\d{2})\.seg$")
+SEGMENT_MAGIC = b"TTARCH01"
+# Closes every segment: where its index starts, how long it is, and the magic
+TRAILER = struct.Struct("<QQ8s")
+
+
+class ArchiveSegment:
+    """One month of day documents packed into a single read-only file.
+
+    The days' compact JSON is stored back to back, followed by an index of
+    ``date -> [offset, length, mtime]`` and a fixed-size trailer locating
+    it. The file is memory-mapped, so loading a day slices out and parses
+    just that day's bytes.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self.stamp = stat_stamp(st)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < TRAILER.size:
+            raise ValueError(f"{path} is not an archive segment")
+        offset, length, magic = TRAILER.unpack_from(self._map, len(self._map) - TRAILER.size)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not an archive segment")
+        self.index = serialization.loads(self._map[offset:offset + length])
+        self.newest = max((mtime for _, _, mtime in self.index.values()), default=0)
+
+    def read(self, date: str) -> bytes | None:
+        """The stored JSON of one day, or None if the segment doesn't hold it"""
+        location = self.index.get(date)
+        if location is None:
+            return None
+        offset, length, _ = location
+        iostats.record_read(length)
+        return self._map[offset:offset + length]
+
+
+def pack_segment(days: dict) -> bytes:
+    """Lay out a segment from {date: (compact JSON bytes, mtime)}"""
+    body = bytearray()
+    index = {}
+    for date in sorted(days):
+        data, mtime = days[date]
+        index[date] = [len(body), len(data), mtime]
+        body += data
+    index_offset = len(body)
+    encoded = serialization.dumps(index)
+    body += encoded
+    body += TRAILER.pack(index_offset, len(encoded), SEGMENT_MAGIC)
+    return bytes(body)
+
+
+class DayArchive:
+    """Closed months of day documents, one ``archive/YYYY-MM.seg`` segment per month.
+
+    Opened segments are kept, and reopened whenever the file on disk is
+    replaced (e.g. by a repack in another process).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._segments = {}
+        self._lock = threading.Lock()
+
+    def path(self, month: str) -> str:
+        return os.path.join(self.directory, f"{month}.seg")
+
+    def months(self) -> list[str]:
+        """Archived months, ascending"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(match.group(1) for match in map(SEGMENT_FILE_PATTERN.match, os.listdir(self.directory)) if match)
+
+    def has_month(self, month: str) -> bool:
+        return os.path.exists(self.path(month))
+
+    def segment(self, month: str) -> ArchiveSegment | None:
+        """The month's segment, or None if the month isn't archived"""
+        try:
+            stamp = stat_stamp(os.stat(self.path(month)))
+        except FileNotFoundError:
+            with self._lock:
+                self._segments.pop(month, None)
+            return None
+        with self._lock:
+            segment = self._segments.get(month)
+        if segment is None or segment.stamp != stamp:
+            # Mappings being read by other threads stay valid until dropped
+            segment = ArchiveSegment(self.path(month))
+            with self._lock:
+                self._segments[month] = segment
+        return segment
+
+    def dates(self, start: str | None = None, end: str | None = None) -> list[str]:
+        """Archived dates, ascending, optionally within [start, end]"""
+        dates = []
+        for month in self.months():
+            if (start is not None and month < start[:7]) or (end is not None and month > end[:7]):
+                continue
+            segment = self.segment(month)
+            if segment is not None:
+                dates.extend(date for date in segment.index
+                             if (start is None or date >= start) and (end is None or date <= end))
+        return sorted(dates)
+
+    def read(self, date: str) -> bytes | None:
+        segment = self.segment(date[:7])
+        return segment.read(date) if segment is not None else None
+
+    def load(self, date: str) -> dict | None:
+        data = self.read(date)
+        return serialization.loads(data) if data is not None else None
+
+    def has(self, date: str) -> bool:
+        segment = self.segment(date[:7])
+        return segment is not None and date in segment.index
+
+    def stamp(self, date: str) -> str:
+        """Change token of an archived day ("" if it isn't archived)"""
+        segment = self.segment(date[:7])
+        if segment is None or date not in segment.index:
+            return ""
+        return f"{segment.stamp}-{segment.index[date][0]:x}"
+
+    def mtime(self, date: str) -> float:
+        return self.segment(date[:7]).index[date][2]
+
+    def newest_change(self) -> float:
+        """When the most recently changed archived day was last changed before archiving"""
+        newest = 0
+        for month in self.months():
+            segment = self.segment(month)
+            if segment is not None:
+                newest = max(newest, segment.newest)
+        return newest
+
+    def write(self, month: str, days: dict) -> None:
+        """Replace a month's segment with {date: (compact JSON bytes, mtime)}"""
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write_bytes(self.path(month), pack_segment(days))
+
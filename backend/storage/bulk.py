@@ -0,0 +1,136 @@
+import codecs
+import csv
+import json
+from itertools import chain
+from storage import serialization
+
+IMPORT_FORMATS = ("json", "ndjson", "csv")
+CONTENT_TYPES = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+# CSV cells that mean "no value" for the optional fields
+OPTIONAL_FIELDS = ("id", "description", "end_time")
+
+
+def detect_format(content_type: str | None, filename: str | None = None) -> str | None:
+    """Import format named by a Content-Type header or a file extension"""
+    if content_type:
+        fmt = CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+        if fmt:
+            return fmt
+    if filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        if extension in ("jsonl", "ndjson"):
+            return "ndjson"
+        if extension in IMPORT_FORMATS:
+            return extension
+    return None
+
+
+def iter_records(chunks, fmt: str):
+    """Yield (number, record) for each record in a stream of byte chunks.
+
+    number counts records from 1. record is the parsed dict, or the
+    ValueError that made a single record unreadable. A JSON array whose
+    structure is broken raises ValueError instead, since nothing after the
+    damage can be trusted.
+    """
+    if fmt == "ndjson":
+        return _ndjson_records(chunks)
+    if fmt == "csv":
+        return _csv_records(chunks)
+    if fmt == "json":
+        return _json_array_records(chunks)
+    raise ValueError(f"Unknown import format: {fmt}")
+
+
+def _lines(chunks):
+    """Decoded text lines (with their line endings) from byte chunks"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    for chunk in chain(chunks, [None]):
+        pending += decoder.decode(chunk or b"", final=chunk is None)
+        # The last piece may be an incomplete line; keep it for the next chunk
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    if pending:
+        yield pending
+
+
+def _ndjson_records(chunks):
+    number = 0
+    for line in _lines(chunks):
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            yield number, serialization.loads(line)
+        except ValueError as error:
+            yield number, ValueError(f"Invalid JSON: {error}")
+
+
+def _csv_records(chunks):
+    reader = csv.DictReader(_lines(chunks))
+    for number, row in enumerate(reader, start=1):
+        if None in row:
+            yield number, ValueError("Row has more cells than the header")
+            continue
+        for field in OPTIONAL_FIELDS:
+            if row.get(field) == "":
+                row[field] = None
+        yield number, row
+
+
+def _json_array_records(chunks):
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    expect = "["
+    number = 0
+    for chunk in chain(chunks, [None]):
+        final = chunk is None
+        buffer += text.decode(chunk or b"", final=final)
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+            if expect == "[":
+                if char != "[":
+                    raise ValueError("Expected a JSON array")
+                pos += 1
+                expect = "first"
+            elif expect in ("first", "item"):
+                if expect == "first" and char == "]":
+                    pos += 1
+                    expect = "end"
+                    continue
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    if final:
+                        raise ValueError(f"Malformed JSON array after record {number}")
+                    break  # the item continues in the next chunk
+                if end == len(buffer) and not final and not isinstance(value, (dict, list)):
+                    break  # a number or literal may continue in the next chunk
+                number += 1
+                yield number, value
+                pos = end
+                expect = "separator"
+            elif expect == "separator":
+                if char not in ",]":
+                    raise ValueError(f"Malformed JSON array after record {number}")
+                pos += 1
+                expect = "item" if char == "," else "end"
+            else:
+                raise ValueError("Unexpected data after the JSON array")
+        buffer = buffer[pos:]
+    if expect != "end":
+        raise ValueError("Unterminated JSON array")
@@ -0,0 +1,92 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+def clone(value):
+    """Deep copy of plain JSON data (dicts, lists and scalars)"""
+    if isinstance(value, dict):
+        return {key: clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [clone(item) for item in value]
+    return value
+
+
+class FileCache:
+    """Bounded LRU cache of parsed JSON files.
+
+    Each cached value remembers the file's (mtime, size) when it was read or
+    written, and is only served while a stat() of the file still matches, so
+    edits made outside the app are picked up on the next access. Callers
+    always get their own copy and may mutate it freely.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, loader):
+        """Return the parsed contents of path, calling loader(path) on a miss.
+
+        Returns None without calling the loader if the file doesn't exist.
+        """
+        try:
+            signature = _signature(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            return None
+
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == signature:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return clone(cached[1])
+            self.misses += 1
+
+        value = loader(path)
+        self._store(path, signature, value)
+        return clone(value)
+
+    def put(self, path: str, value) -> None:
+        """Record a value that was just written to path (write-through)"""
+        try:
+            signature = _signature(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            return
+        self._store(path, signature, clone(value))
+
+    def invalidate(self, path: str) -> None:
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def _store(self, path: str, signature: tuple, value) -> None:
+        with self._lock:
+            self._entries[path] = (signature, value)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def _signature(path: str) -> tuple:
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from storage.journal import JournalMap
+
+SETTINGS_KEY = "settings"
+FLOOR_KEY = "_floor"
+
+
+def fingerprint(entry: dict) -> str:
+    """Short content hash used to tell whether a saved entry actually changed"""
+    return hashlib.blake2b(json.dumps(entry, sort_keys=True).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ChangeLog:
+    """A global, monotonically increasing version for every entry and settings change.
+
+    Only the latest change per key is kept (entry id, or "settings"), persisted
+    in a JournalMap as ``{"v", "date", "hash"}`` or a ``{"v", "date",
+    "deleted": true}`` tombstone. In memory the keys are ordered by version,
+    so finding what changed after version N walks back from the newest change
+    and costs O(changes since N), not O(history).
+
+    Versions up to ``floor`` are unknown (the log was rebuilt); a client
+    asking for changes since an older version has to reload everything.
+    """
+
+    def __init__(self, path: str, locks=None):
+        self._log = JournalMap(path, locks)
+        self._order = OrderedDict()
+        self._by_date = {}
+        self._lock = threading.Lock()
+        # Dates other processes changed since the last refresh(); None for "any"
+        self._foreign_dates = set()
+        self.version = 0
+        self.floor = 0
+        self.loaded = False
+
+    def load(self, newest_day_change: float = 0) -> bool:
+        """Load the persisted log. Returns False if missing or older than the data"""
+        with self._lock:
+            found = self._log.load()
+            self._reindex()
+            self.loaded = True
+            return found and not self.is_stale(newest_day_change)
+
+    def is_stale(self, newest_day_change: float) -> bool:
+        return newest_day_change > self._log.mtime()
+
+    def rebuild(self, days) -> None:
+        """Start a fresh log from an iterable of (date, entries) pairs.
+
+        Every entry gets a new version above the old ones and the floor moves
+        past all earlier versions, so existing replicas reload in full. The
+        floor also jumps to the current time in milliseconds, so it stays above
+        versions handed out before the log file was lost.
+        """
+        with self._lock:
+            version = max(self.version, int(time.time() * 1000))
+            floor = version + 1
+            records = {FLOOR_KEY: {"v": floor}}
+            for date, entries in days:
+                for entry in entries:
+                    if entry.get("id"):
+                        version += 1
+                        records[entry["id"]] = {"v": version, "date": date, "hash": fingerprint(entry)}
+            version += 1
+            records[SETTINGS_KEY] = {"v": version}
+            self._log.replace(records)
+            self._reindex()
+            self.loaded = True
+
+    def update_day(self, date: str, entries: list) -> None:
+        """Give a new version to each entry of a saved day that changed, and tombstone any that left it"""
+        with self._lock, self._log.exclusive():
+            # Versions must keep increasing across processes: catch up on
+            # theirs while holding the log, then number ours after them
+            self._apply_changes(self._log.sync())
+            updates = {}
+            ids = set()
+            for entry in entries:
+                entry_id = entry.get("id")
+                if not entry_id:
+                    continue
+                ids.add(entry_id)
+                record = {"date": date, "hash": fingerprint(entry)}
+                previous = self._log.get(entry_id)
+                if previous is None or previous.get("date") != date or previous.get("hash") != record["hash"]:
+                    updates[entry_id] = record
+            for entry_id in self._by_date.get(date, set()) - ids:
+                previous = self._log.get(entry_id)
+                if previous is not None and previous.get("date") == date and not previous.get("deleted"):
+                    updates[entry_id] = {"date": date, "deleted": True}
+            if not updates:
+                self._log.touch()
+                return
+            for entry_id, record in updates.items():
+                previous = self._log.get(entry_id)
+                if previous is not None and previous.get("date") != date:
+                    self._by_date.get(previous.get("date"), set()).discard(entry_id)
+                self._bump(entry_id, record)
+            self._log.apply(updates)
+            if ids:
+                self._by_date[date] = ids
+            else:
+                self._by_date.pop(date, None)
+
+    def record_settings(self) -> None:
+        with self._lock, self._log.exclusive():
+            self._apply_changes(self._log.sync())
+            record = self._bump(SETTINGS_KEY, {})
+            self._log.set(SETTINGS_KEY, record)
+
+    def refresh(self) -> set | None:
+        """Pick up changes other processes logged since the last load or refresh.
+
+        Returns the dates whose entries they changed, or None if the log was
+        replaced and any date may have changed.
+        """
+        with self._lock:
+            self._apply_changes(self._log.sync())
+            dates, self._foreign_dates = self._foreign_dates, set()
+            return dates
+
+    def since(self, version: int) -> tuple[bool, int, list]:
+        """Changes after version as (reset, latest version, [(key, record), ...]) in version order.
+
+        reset is True when version is older than the floor (or newer than
+        anything issued); the list then holds every live key instead.
+        """
+        with self._lock:
+            reset = version < self.floor or version > self.version
+            if reset:
+                return True, self.version, [(key, self._log.get(key)) for key in self._order
+                                            if not self._log.get(key).get("deleted")]
+            changed = []
+            for key in reversed(self._order):
+                record = self._log.get(key)
+                if record["v"] <= version:
+                    break
+                changed.append((key, record))
+            changed.reverse()
+            return False, self.version, changed
+
+    def _bump(self, key: str, record: dict) -> dict:
+        self.version += 1
+        record["v"] = self.version
+        self._order.pop(key, None)
+        self._order[key] = self.version
+        return record
+
+    def _apply_changes(self, changes: list | None) -> None:
+        if changes is None:
+            self._reindex()
+            self._foreign_dates = None
+            return
+        dates = set()
+        for key, old, new in changes:
+            if key == FLOOR_KEY or new is None:
+                continue
+            # Lines are appended in version order, so these are all newer than what we had
+            self.version = max(self.version, new["v"])
+            self._order.pop(key, None)
+            self._order[key] = new["v"]
+            if key == SETTINGS_KEY:
+                continue
+            if old is not None and old.get("date") != new["date"]:
+                self._by_date.get(old.get("date"), set()).discard(key)
+                dates.add(old.get("date"))
+            if new.get("deleted"):
+                self._by_date.get(new["date"], set()).discard(key)
+            else:
+                self._by_date.setdefault(new["date"], set()).add(key)
+            dates.add(new["date"])
+        if self._foreign_dates is not None:
+            self._foreign_dates |= dates
+
+    def _reindex(self) -> None:
+        self._order = OrderedDict()
+        self._by_date = {}
+        self.floor = (self._log.get(FLOOR_KEY) or {}).get("v", 0)
+        self.version = self.floor
+        for key, record in sorted(self._log.items(), key=lambda item: item[1]["v"]):
+            self.version = max(self.version, record["v"])
+            if key == FLOOR_KEY:
+                continue
+            self._order[key] = record["v"]
+            if key != SETTINGS_KEY and not record.get("deleted"):
+                self._by_date.setdefault(record["date"], set()).add(key)
@@ -0,0 +1,210 @@
+import bisect
+import threading
+from datetime import date as date_cls, datetime, timedelta, timezone
+import numpy as np
+from storage.rollups import parse_day
+
+EPOCH = date_cls(1970, 1, 1)
+DAY_SECONDS = 86400
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def _timestamp(value: str | None) -> int | None:
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+class _Dictionary:
+    """Append-only string <-> int32 code mapping for dictionary-encoded columns"""
+
+    def __init__(self):
+        self.names = []
+        self.codes = {}
+
+    def encode(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+class ColumnarStore:
+    """Entries held as NumPy columns, one small chunk per day.
+
+    Each chunk has int64 start/end/duration arrays (epoch seconds) and int32
+    dictionary codes for project and category. A range query concatenates the
+    chunks in range and answers group-bys and histograms with vectorized
+    bincount/sort operations instead of walking entry dicts. Chunks are
+    replaced whenever a day is saved, so the store stays current without
+    rebuilding.
+    """
+
+    def __init__(self):
+        self.projects = _Dictionary()
+        self.categories = _Dictionary()
+        self._chunks = {}
+        self._dates = []
+        self._updated = set()
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def rebuild(self, days) -> None:
+        """Rebuild from an iterable of (date, entries) pairs.
+
+        The store counts as loaded from the start, so days saved while the
+        rebuild is still reading win over the (older) copy it reads later.
+        """
+        with self._lock:
+            self._chunks = {}
+            self._dates = []
+            self._updated = set()
+            self.loaded = True
+        for date, entries in days:
+            with self._lock:
+                if date not in self._updated:
+                    self._set_chunk(date, entries)
+        with self._lock:
+            self._updated = set()
+
+    def unload(self) -> None:
+        """Drop everything; the next rebuild() starts over"""
+        with self._lock:
+            self._chunks = {}
+            self._dates = []
+            self.loaded = False
+
+    def update_day(self, date: str, entries: list) -> None:
+        with self._lock:
+            self._updated.add(date)
+            self._set_chunk(date, entries)
+
+    def _set_chunk(self, date: str, entries: list) -> None:
+        day = parse_day(date)
+        if day is None:
+            return  # not a real day (e.g. a stray 2024-02-30.json); nothing can query it
+        if not entries:
+            if self._chunks.pop(date, None) is not None:
+                self._dates.remove(date)
+            return
+        starts, ends, durations, projects, categories = [], [], [], [], []
+        for entry in entries:
+            duration = int(entry.get("duration", 0))
+            start = _timestamp(entry.get("start_time"))
+            if start is None:
+                start = (day - EPOCH).days * DAY_SECONDS
+            end = _timestamp(entry.get("end_time"))
+            starts.append(start)
+            ends.append(end if end is not None else start + duration)
+            durations.append(duration)
+            projects.append(self.projects.encode(entry.get("project", "Uncategorized")))
+            categories.append(self.categories.encode(entry.get("category", "Uncategorized")))
+        if date not in self._chunks:
+            bisect.insort(self._dates, date)
+        self._chunks[date] = {
+            "day": (day - EPOCH).days,
+            "total": sum(durations),
+            "start": np.array(starts, dtype=np.int64),
+            "end": np.array(ends, dtype=np.int64),
+            "duration": np.array(durations, dtype=np.int64),
+            "project": np.array(projects, dtype=np.int32),
+            "category": np.array(categories, dtype=np.int32),
+        }
+
+    def columns(self, start: str, end: str) -> dict:
+        """Concatenated entry columns between start and end inclusive, plus per-day totals"""
+        with self._lock:
+            lo = bisect.bisect_left(self._dates, start)
+            hi = bisect.bisect_right(self._dates, end)
+            chunks = [self._chunks[date] for date in self._dates[lo:hi]]
+        result = {
+            "day": np.array([chunk["day"] for chunk in chunks], dtype=np.int64),
+            "day_total": np.array([chunk["total"] for chunk in chunks], dtype=np.int64),
+        }
+        for name in ("start", "end", "duration", "project", "category"):
+            result[name] = np.concatenate([chunk[name] for chunk in chunks]) if chunks else np.zeros(0, dtype=np.int64)
+        return result
+
+    def report(self, start: str, end: str, top: int = 5, utc_offset: int = 0) -> dict:
+        """Totals, group-bys and histograms for entries between start and end inclusive.
+
+        utc_offset (minutes east of UTC) shifts the hour-of-day histogram into
+        the caller's local time.
+        """
+        cols = self.columns(start, end)
+        duration = cols["duration"]
+        total = int(duration.sum())
+
+        project_seconds, project_present = self._group(cols["project"], duration, len(self.projects.names))
+        category_seconds, category_present = self._group(cols["category"], duration, len(self.categories.names))
+        by_project = {self.projects.names[code]: int(project_seconds[code]) for code in project_present}
+        by_category = {self.categories.names[code]: int(category_seconds[code]) for code in category_present}
+        # Stable sort on negated seconds keeps ties in first-seen order
+        leaders = project_present[np.argsort(-project_seconds[project_present], kind="stable")[:top]]
+
+        # Day and weekday totals come from the per-day sums; 1970-01-01 was a
+        # Thursday, so day numbers shifted by 3 give Monday = 0
+        days = cols["day"]
+        day_totals = cols["day_total"]
+        by_weekday = np.bincount((days + 3) % 7, weights=day_totals, minlength=7).astype(np.int64)
+        by_day = {}
+        by_month = {}
+        for number, seconds in zip(days.tolist(), day_totals.tolist()):
+            if seconds:
+                day = (EPOCH + timedelta(days=number)).isoformat()
+                by_day[day] = seconds
+                by_month[day[:7]] = by_month.get(day[:7], 0) + seconds
+
+        return {
+            "from": start,
+            "to": end,
+            "total_seconds": total,
+            "entry_count": int(len(duration)),
+            "days_with_entries": len(by_day),
+            "project_breakdown": by_project,
+            "category_breakdown": by_category,
+            "weekday_breakdown": {WEEKDAYS[i]: int(by_weekday[i]) for i in range(7)},
+            "hourly_breakdown": self._hours(cols["start"], cols["end"], utc_offset),
+            "daily_breakdown": by_day,
+            "monthly_breakdown": by_month,
+            "top_projects": [
+                {
+                    "project": self.projects.names[code],
+                    "seconds": int(project_seconds[code]),
+                    "share": int(project_seconds[code]) / total if total else 0.0,
+                }
+                for code in leaders
+            ],
+        }
+
+    @staticmethod
+    def _group(codes: np.ndarray, weights: np.ndarray, size: int) -> tuple[np.ndarray, np.ndarray]:
+        """Seconds per code, and the codes that have at least one entry"""
+        seconds = np.bincount(codes, weights=weights, minlength=size).astype(np.int64)
+        counts = np.bincount(codes, minlength=size)
+        return seconds, np.flatnonzero(counts)
+
+    @staticmethod
+    def _hours(starts: np.ndarray, ends: np.ndarray, utc_offset: int) -> list[int]:
+        """Seconds spent in each hour of the (local) day, splitting entries across hours"""
+        if not len(starts):
+            return [0] * 24
+        shift = utc_offset * 60
+        midnight = (starts + shift) // DAY_SECONDS * DAY_SECONDS - shift
+        # Seconds since the entry's local midnight; entries are clipped to two days
+        begin = np.sort(starts - midnight)
+        finish = np.sort(np.minimum(ends - midnight, 2 * DAY_SECONDS))
+        # Seconds covered before each hour boundary: sum(x - begin) over entries
+        # begun by x, minus sum(x - finish) over entries already finished
+        bounds = np.arange(49, dtype=np.int64) * 3600
+        begun = np.searchsorted(begin, bounds)
+        finished = np.searchsorted(finish, bounds)
+        begin_sums = np.concatenate(([0], np.cumsum(begin)))
+        finish_sums = np.concatenate(([0], np.cumsum(finish)))
+        covered = (bounds * begun - begin_sums[begun]) - (bounds * finished - finish_sums[finished])
+        per_hour = np.diff(covered)
+        return [int(seconds) for seconds in per_hour[:24] + per_hour[24:]]
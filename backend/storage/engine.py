@@ -0,0 +1,112 @@
+class StorageEngine:
+    """Where day documents, settings and the active timer are kept.
+
+    Day documents have the shape ``{"date", "entries", "total_duration"}``.
+    Loads return a private copy the caller may mutate, or None if nothing is
+    stored. Callers are responsible for locking read-modify-write cycles.
+    """
+
+    name = "base"
+    # Engines that can look entries up by id themselves don't need the EntryIndex
+    indexes_entries = False
+
+    def start(self) -> None:
+        """Prepare the engine (recovery, background threads). Safe to call twice"""
+
+    def close(self) -> None:
+        """Flush anything pending and stop background work"""
+
+    def list_dates(self, start: str | None = None, end: str | None = None) -> list[str]:
+        """Dates that have a stored day, ascending, optionally within [start, end]"""
+        raise NotImplementedError
+
+    def has_day(self, date: str) -> bool:
+        raise NotImplementedError
+
+    def load_day(self, date: str) -> dict | None:
+        raise NotImplementedError
+
+    def save_day(self, date: str, data: dict) -> None:
+        raise NotImplementedError
+
+    def day_stamp(self, date: str) -> str:
+        """Cheap token that changes whenever the stored day changes ("" if there is none)"""
+        raise NotImplementedError
+
+    def settings_stamp(self) -> str:
+        """Cheap token that changes whenever the stored settings change"""
+        raise NotImplementedError
+
+    def newest_change(self) -> float:
+        """Timestamp of the most recent change to any stored day"""
+        raise NotImplementedError
+
+    def load_settings(self) -> dict | None:
+        raise NotImplementedError
+
+    def save_settings(self, settings: dict) -> None:
+        raise NotImplementedError
+
+    def load_active_timer(self) -> dict | None:
+        raise NotImplementedError
+
+    def save_active_timer(self, timer_data: dict | None) -> None:
+        raise NotImplementedError
+
+    def reformat(self, indent: int | None = None) -> dict:
+        """Rewrite stored JSON in the current on-disk format without changing its content.
+
+        Returns counts of stored items, items rewritten and bytes before and after.
+        """
+        raise NotImplementedError
+
+    def archive_months(self, before: str) -> list[str]:
+        """Months (YYYY-MM) before the given one with days that archive_month would pack.
+
+        Engines that don't keep a file per day have nothing to archive.
+        """
+        return []
+
+    def archive_month(self, month: str) -> dict:
+        """Pack a closed month's days into cold storage, still readable through load_day.
+
+        Returns counts of months and days packed and bytes before and after.
+        Callers hold the locks of the month's dates.
+        """
+        raise NotImplementedError
+
+    def find_entry_date(self, entry_id: str) -> str | None:
+        """Date an entry is stored under (only for engines with indexes_entries)"""
+        raise NotImplementedError
+
+    def iter_entries(self, start: str, end: str, project: str | None = None, category: str | None = None):
+        """Yield entries between start and end inclusive, optionally filtered by project/category"""
+        for date in self.list_dates(start, end):
+            day_data = self.load_day(date) or {}
+            for entry in day_data.get("entries", []):
+                if project is not None and entry.get("project") != project:
+                    continue
+                if category is not None and entry.get("category") != category:
+                    continue
+                entry["date"] = date  # The day decides which date an entry belongs to
+                yield entry
+
+    def stats(self) -> dict:
+        """Counters describing the engine's caches and internal state"""
+        return {"engine": self.name}
+
+
+def open_engine(name: str, data_dir: str, cache_size: int = 512) -> StorageEngine:
+    """Create the storage engine selected by STORAGE_ENGINE"""
+    from storage.json_engine import JsonFileEngine
+
+    if name == "sqlite":
+        from storage.sqlite_engine import SqliteEngine
+        return SqliteEngine(data_dir)
+    base = JsonFileEngine(data_dir, cache_size)
+    if name == "json":
+        return base
+    if name == "wal":
+        from storage.wal_engine import WalEngine
+        return WalEngine(data_dir, base)
+    raise ValueError(f"Unknown storage engine: {name}")
@@ -0,0 +1,94 @@
+import threading
+from storage.journal import JournalMap
+
+
+class EntryIndex:
+    """Persistent map from entry id to the date of the day file holding it"""
+
+    def __init__(self, path: str, locks=None):
+        self._map = JournalMap(path, locks)
+        self._by_date = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self, newest_day_mtime: float = 0) -> bool:
+        """Load the persisted index.
+
+        Returns False when there is no index on disk or a day file was
+        modified after the index was last written (i.e. edited outside the
+        app), in which case the caller should rebuild it.
+        """
+        with self._lock:
+            found = self._map.load()
+            self._reindex_dates()
+            self.loaded = True
+            return found and not self.is_stale(newest_day_mtime)
+
+    def rebuild(self, days) -> None:
+        """Rebuild from scratch given an iterable of (date, entries) pairs"""
+        mapping = {}
+        for date, entries in days:
+            for entry in entries:
+                if entry.get("id"):
+                    mapping[entry["id"]] = date
+        with self._lock:
+            self._map.replace(mapping)
+            self._reindex_dates()
+            self.loaded = True
+
+    def is_stale(self, newest_day_mtime: float) -> bool:
+        """Whether a day file changed after the index was last synced"""
+        return newest_day_mtime > self._map.mtime()
+
+    def lookup(self, entry_id: str) -> str | None:
+        """Get the date an entry is stored under, if known"""
+        return self._map.get(entry_id)
+
+    def update_day(self, date: str, entries: list) -> None:
+        """Record the ids now stored in a day file, dropping any that left it"""
+        ids = {entry["id"] for entry in entries if entry.get("id")}
+        with self._lock, self._map.exclusive():
+            self._apply_changes(self._map.sync())
+            previous = self._by_date.get(date, set())
+            removed = [entry_id for entry_id in previous - ids
+                       if self._map.get(entry_id) == date]
+            added = {entry_id: date for entry_id in ids - previous}
+            for entry_id in added:
+                old_date = self._map.get(entry_id)
+                if old_date and old_date != date:
+                    self._by_date.get(old_date, set()).discard(entry_id)
+            if added or removed:
+                self._map.apply(added, deletes=removed)
+            else:
+                self._map.touch()
+            if ids:
+                self._by_date[date] = ids
+            else:
+                self._by_date.pop(date, None)
+
+    def refresh(self) -> None:
+        """Pick up entries other processes indexed since the last load or refresh"""
+        with self._lock:
+            self._apply_changes(self._map.sync())
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def _apply_changes(self, changes: list | None) -> None:
+        if changes is None:
+            self._reindex_dates()
+            return
+        for entry_id, old_date, new_date in changes:
+            if old_date is not None:
+                ids = self._by_date.get(old_date)
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del self._by_date[old_date]
+            if new_date is not None:
+                self._by_date.setdefault(new_date, set()).add(entry_id)
+
+    def _reindex_dates(self) -> None:
+        self._by_date = {}
+        for entry_id, date in self._map.items():
+            self._by_date.setdefault(date, set()).add(entry_id)
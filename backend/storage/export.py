@@ -0,0 +1,67 @@
+import csv
+import io
+import zlib
+from storage import serialization
+
+EXPORT_FIELDS = ["date", "id", "project", "category", "description", "start_time", "end_time", "duration"]
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson", "json": "application/json"}
+# Output is handed to the response in pieces of about this size
+CHUNK_BYTES = 64 * 1024
+
+
+def encode_entries(entries, fmt: str):
+    """Yield the encoded pieces of a csv, ndjson or json export of entries, one entry at a time"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        for entry in entries:
+            writer.writerow([entry.get(field) for field in EXPORT_FIELDS])
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        # Header of an empty export
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+    elif fmt == "ndjson":
+        for entry in entries:
+            yield serialization.dumps(entry) + b"\n"
+    elif fmt == "json":
+        separator = b"[\n"
+        for entry in entries:
+            yield separator + serialization.dumps(entry)
+            separator = b",\n"
+        yield b"[]\n" if separator == b"[\n" else b"\n]\n"
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+
+def chunked(pieces, size: int = CHUNK_BYTES):
+    """Join small pieces into chunks of about size bytes"""
+    chunk = []
+    length = 0
+    for piece in pieces:
+        chunk.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield b"".join(chunk)
+            chunk = []
+            length = 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+def gzipped(chunks):
+    """Compress a stream of chunks into one gzip stream as it goes"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(entries, fmt: str, compress: bool = False):
+    """Encoded export of an entry iterator in chunks, holding one chunk in memory at a time"""
+    chunks = chunked(encode_entries(entries, fmt))
+    return gzipped(chunks) if compress else chunks
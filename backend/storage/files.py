@@ -0,0 +1,230 @@
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from storage import iostats, serialization
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# "off" leaves flushing to the OS (the historical behaviour), "always" fsyncs
+# every write before it becomes visible, "group" batches fsyncs from
+# concurrent writers into one flush every FSYNC_GROUP_MS milliseconds
+FSYNC_MODE = os.getenv("FSYNC_MODE", "off")
+FSYNC_GROUP_MS = int(os.getenv("FSYNC_GROUP_MS", 10))
+# Day, settings and active timer files are written compact by default; set
+# JSON_INDENT=2 for hand-readable files. Either format is read back the same
+JSON_INDENT = int(os.getenv("JSON_INDENT", 0)) or None
+# Read once: os.umask() can only be queried by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+class KeyedLocks:
+    """Per-key locks that hold across threads and, where fcntl exists, processes.
+
+    Each key gets a re-entrant thread lock plus an exclusive flock() on
+    ``<lock_dir>/<key>.lock``, so writers to different keys (dates) never
+    wait on each other while writers to the same key are serialized. A
+    lock file only exists while its key is held, so they don't pile up
+    one per date.
+    """
+
+    def __init__(self, lock_dir: str):
+        self.lock_dir = lock_dir
+        self._states = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def hold(self, *keys):
+        """Acquire the locks for all keys (in sorted order, to avoid deadlocks)"""
+        ordered = sorted(set(keys))
+        acquired = []
+        started = time.perf_counter()
+        try:
+            for key in ordered:
+                self._acquire(key)
+                acquired.append(key)
+            iostats.record_lock(time.perf_counter() - started)
+            yield
+        finally:
+            for key in reversed(acquired):
+                self._release(key)
+
+    def _acquire(self, key: str) -> None:
+        with self._guard:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _LockState()
+            state.users += 1
+        state.lock.acquire()
+        state.depth += 1
+        if state.depth == 1 and fcntl is not None:
+            # flock() is per open file, so only the outermost hold takes it
+            state.fd = self._lock_file(key)
+
+    def _release(self, key: str) -> None:
+        with self._guard:
+            state = self._states[key]
+            state.depth -= 1
+            if state.depth == 0 and state.fd is not None:
+                # Removed while still locked: a process waiting on this file
+                # sees it is gone once it gets the lock, and creates a new one
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+                fcntl.flock(state.fd, fcntl.LOCK_UN)
+                os.close(state.fd)
+                state.fd = None
+            state.lock.release()
+            state.users -= 1
+            if state.users == 0:
+                del self._states[key]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.lock_dir, f"{key}.lock")
+
+    def _lock_file(self, key: str) -> int:
+        """Open and flock the key's lock file, retrying if its holder removed it meanwhile"""
+        path = self._path(key)
+        os.makedirs(self.lock_dir, exist_ok=True)
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+
+class _LockState:
+    __slots__ = ("lock", "depth", "users", "fd")
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.users = 0
+        self.fd = None
+
+
+class _GroupSyncer:
+    """Background flusher that fsyncs files from many writers in one batch"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def sync(self, fd: int) -> None:
+        """Block until fd has been fsynced by the next group flush"""
+        done = threading.Event()
+        with self._cond:
+            self._pending.append((fd, done))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-fsync", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        done.wait()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Let concurrent writers join this batch
+            time.sleep(self.interval)
+            with self._cond:
+                batch, self._pending = self._pending, []
+            for fd, done in batch:
+                try:
+                    os.fsync(fd)
+                finally:
+                    done.set()
+
+
+_group_syncer = _GroupSyncer(FSYNC_GROUP_MS / 1000)
+
+
+def sync_file(fd: int) -> None:
+    """fsync an open file according to FSYNC_MODE"""
+    if FSYNC_MODE == "always":
+        os.fsync(fd)
+    elif FSYNC_MODE == "group":
+        _group_syncer.sync(fd)
+
+
+def _fsync_dir(directory: str) -> None:
+    # Group mode trades the directory flush for throughput; the file data
+    # itself is still synced before it is renamed into place
+    if FSYNC_MODE != "always" or os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def stat_stamp(st: os.stat_result) -> str:
+    """Token from a file's mtime, size and inode; atomic replaces always get a new inode"""
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}-{st.st_ino:x}"
+
+
+def file_mode(path: str) -> int:
+    """Permissions for a rewrite of path: the existing file's, or what open() would give a new one"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~UMASK
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """Write a file so readers only ever see the old or the new contents.
+
+    The data goes to a temp file in the same directory which then replaces
+    the target with os.replace(), so a crash mid-write can't truncate it.
+    The temp file gets the target's permissions first, as mkstemp() makes
+    it owner-only.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if hasattr(os, "fchmod"):
+                os.fchmod(f.fileno(), file_mode(path))
+            f.write(data)
+            f.flush()
+            sync_file(f.fileno())
+        os.replace(tmp_path, path)
+        iostats.record_write(len(data))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_dir(directory)
+
+
+def atomic_write_text(path: str, text: str, encoding: str = 'utf-8') -> None:
+    """Write text atomically (see atomic_write_bytes)"""
+    atomic_write_bytes(path, text.encode(encoding))
+
+
+def atomic_write_json(path: str, data, indent: int | None = JSON_INDENT) -> None:
+    """Serialize data as UTF-8 JSON and write it atomically"""
+    atomic_write_bytes(path, serialization.dumps(data, indent=indent))
+
+
+def remove_file(path: str) -> None:
+    """Delete a file if it exists"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return
+    _fsync_dir(os.path.dirname(path) or ".")
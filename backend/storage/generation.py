@@ -0,0 +1,77 @@
+import mmap
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: counters are only shared between threads
+    fcntl = None
+
+SLOT = struct.Struct("<Q")
+
+
+class SharedCounters:
+    """Named 64-bit counters in a small memory-mapped file shared by all worker processes.
+
+    A process bumps a counter after it changes the data the counter stands
+    for; every process compares the value with the one it last saw to know
+    when to pick up another's changes. read() is a plain memory read, cheap
+    enough for every request; bump() takes an exclusive flock on the file.
+    A torn read can only make a reader catch up once more than needed.
+    """
+
+    def __init__(self, path: str, names: tuple):
+        self.path = path
+        self.names = names
+        self._map = None
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def read(self, name: str) -> int:
+        self._open()
+        return SLOT.unpack_from(self._map, self.names.index(name) * SLOT.size)[0]
+
+    def bump(self, name: str) -> int:
+        """Increment a counter and return its new value"""
+        self._open()
+        offset = self.names.index(name) * SLOT.size
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                value = SLOT.unpack_from(self._map, offset)[0] + 1
+                SLOT.pack_into(self._map, offset, value)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return value
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                os.close(self._fd)
+                self._map = None
+                self._fd = None
+
+    def _open(self) -> None:
+        if self._map is not None:
+            return
+        with self._lock:
+            if self._map is not None:
+                return
+            size = SLOT.size * len(self.names)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            # The first process to get here sizes the (zero-filled) file
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd = fd
+            self._map = mmap.mmap(fd, size)
@@ -0,0 +1,88 @@
+import bisect
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+
+def parse_time(value: str) -> datetime:
+    """Parse a stored ISO timestamp, treating naive values as UTC"""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def entry_span(entry: dict) -> tuple[datetime, datetime]:
+    """(start, end) of an entry; entries without an end last for their duration"""
+    start = parse_time(entry["start_time"])
+    if entry.get("end_time"):
+        return start, parse_time(entry["end_time"])
+    return start, start + timedelta(seconds=entry.get("duration", 0))
+
+
+class DayIntervals:
+    """One day's entries sorted by start time, for O(log n + k) overlap queries.
+
+    Alongside the sorted starts it keeps a running maximum of the end times,
+    so a query can walk back from the last entry starting before its end and
+    stop as soon as no earlier entry can reach its start.
+    """
+
+    def __init__(self, entries: list):
+        spans = sorted(
+            (start.timestamp(), end.timestamp(), entry["id"])
+            for entry in entries
+            if entry.get("id") and entry.get("start_time")
+            for start, end in [entry_span(entry)]
+        )
+        self.starts = [span[0] for span in spans]
+        self.ends = [span[1] for span in spans]
+        self.ids = [span[2] for span in spans]
+        self.max_end = []
+        running = float("-inf")
+        for end in self.ends:
+            running = max(running, end)
+            self.max_end.append(running)
+
+    def overlapping(self, start: datetime, end: datetime) -> list[str]:
+        """Ids of entries that overlap [start, end), in start order"""
+        start, end = start.timestamp(), end.timestamp()
+        found = []
+        i = bisect.bisect_left(self.starts, end) - 1
+        while i >= 0 and self.max_end[i] > start:
+            if self.ends[i] > start:
+                found.append(self.ids[i])
+            i -= 1
+        found.reverse()
+        return found
+
+
+class IntervalIndex:
+    """DayIntervals per date, built on demand and dropped when the day is saved"""
+
+    def __init__(self, max_days: int = 512):
+        self.max_days = max_days
+        self._days = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, date: str, entries: list) -> DayIntervals:
+        """The index for a day, built from its entries if not already held"""
+        with self._lock:
+            intervals = self._days.get(date)
+            if intervals is not None:
+                self._days.move_to_end(date)
+                return intervals
+        intervals = DayIntervals(entries)
+        with self._lock:
+            self._days[date] = intervals
+            while len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+        return intervals
+
+    def invalidate(self, date: str) -> None:
+        with self._lock:
+            self._days.pop(date, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._days.clear()
@@ -0,0 +1,65 @@
+import contextvars
+import threading
+
+FIELDS = ("reads", "writes", "bytes_read", "bytes_written", "parses", "parse_seconds", "locks", "lock_wait_seconds")
+
+
+class IOStats:
+    """Counts of storage reads, writes, bytes, JSON parsing and storage locks.
+
+    A read or write is one file (or one SQLite day/key) loaded or stored.
+    Updated from whichever I/O pool threads serve a request, so additions
+    take a lock.
+    """
+
+    def __init__(self):
+        for field in FIELDS:
+            setattr(self, field, 0)
+        self._lock = threading.Lock()
+
+    def add(self, **amounts) -> None:
+        with self._lock:
+            for field, amount in amounts.items():
+                setattr(self, field, getattr(self, field) + amount)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {field: getattr(self, field) for field in FIELDS}
+
+
+# Everything since the process started, requests or not (e.g. WAL compaction)
+totals = IOStats()
+_current = contextvars.ContextVar("storage_io", default=None)
+
+
+def track() -> tuple:
+    """Start counting for the current request; returns (stats, token for untrack)"""
+    stats = IOStats()
+    return stats, _current.set(stats)
+
+
+def untrack(token) -> None:
+    _current.reset(token)
+
+
+def _record(**amounts) -> None:
+    totals.add(**amounts)
+    stats = _current.get()
+    if stats is not None:
+        stats.add(**amounts)
+
+
+def record_read(nbytes: int) -> None:
+    _record(reads=1, bytes_read=nbytes)
+
+
+def record_write(nbytes: int) -> None:
+    _record(writes=1, bytes_written=nbytes)
+
+
+def record_parse(seconds: float) -> None:
+    _record(parses=1, parse_seconds=seconds)
+
+
+def record_lock(wait_seconds: float) -> None:
+    _record(locks=1, lock_wait_seconds=wait_seconds)
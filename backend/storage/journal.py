@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from storage import iostats
+
+
+class JournalMap:
+    """A dict persisted as an append-only JSON-lines log.
+
+    Every change appends one line (``[key, value]`` to set, ``[key]`` to
+    delete), so a write costs O(1) regardless of how many keys are stored.
+    Loading replays the log; once dead lines outnumber live keys the log is
+    rewritten in place.
+
+    Several processes may share one log when given KeyedLocks: writes then
+    hold the log's cross-process lock, and lines other processes appended
+    are read before appending and reported by sync(), so whoever derives
+    state from the map can apply them too.
+    """
+
+    def __init__(self, path: str, locks=None):
+        self.path = path
+        self.locks = locks
+        self.data = {}
+        self._lines = 0
+        self._offset = 0
+        self._inode = None
+        # Changes read from other processes that sync() hasn't reported yet;
+        # None when the log was replaced and everything must be re-derived
+        self._unseen = []
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the log against other threads and (with locks) other processes"""
+        with self._lock:
+            with self.locks.hold(os.path.basename(self.path)) if self.locks is not None else nullcontext():
+                yield
+
+    def load(self) -> bool:
+        """Replay the log from disk. Returns False if no log exists yet"""
+        with self.exclusive():
+            found = self._replay()
+            self._unseen = []
+            if found and self._lines > 2 * len(self.data) + 100:
+                self._rewrite()
+            return found
+
+    def sync(self) -> list | None:
+        """Read lines other processes appended and report what they changed.
+
+        Returns [(key, old value, new value), ...] in log order, where a value
+        of None means the key is absent, or None if the log was rewritten and
+        the whole map should be treated as new.
+        """
+        with self.exclusive():
+            self._read_new()
+            changes, self._unseen = self._unseen, []
+            return changes
+
+    def mtime(self) -> float:
+        """Last modification time of the log, or 0 if it doesn't exist"""
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return 0
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def items(self):
+        return list(self.data.items())
+
+    def __contains__(self, key) -> bool:
+        return key in self.data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def apply(self, updates: dict, deletes=()) -> None:
+        """Set and delete several keys with a single append"""
+        lines = []
+        with self.exclusive():
+            self._read_new()
+            for key in deletes:
+                if key in self.data:
+                    del self.data[key]
+                    lines.append(json.dumps([key]))
+            for key, value in updates.items():
+                if self.data.get(key) != value:
+                    self.data[key] = value
+                    lines.append(json.dumps([key, value]))
+            if lines:
+                self._append(lines)
+
+    def touch(self) -> None:
+        """Bump the log's mtime to mark it as up to date without changing it"""
+        if os.path.exists(self.path):
+            self._stamp()
+
+    def set(self, key, value) -> None:
+        self.apply({key: value})
+
+    def delete(self, key) -> None:
+        self.apply({}, deletes=(key,))
+
+    def replace(self, data: dict) -> None:
+        """Swap the whole contents and rewrite the log from scratch"""
+        with self.exclusive():
+            self.data = dict(data)
+            self._rewrite()
+            self._unseen = []
+
+    def _replay(self) -> bool:
+        self.data = {}
+        self._lines = 0
+        self._offset = 0
+        self._inode = None
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        with f:
+            self._inode = os.fstat(f.fileno()).st_ino
+            self._read_lines(f, None)
+        return True
+
+    def _read_new(self) -> None:
+        """Pick up lines appended by other processes, or everything if the log was replaced"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._inode is not None:
+                self._replay()
+                self._unseen = None
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._replay()
+            self._unseen = None
+        elif stat.st_size > self._offset:
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                self._read_lines(f, self._unseen)
+
+    def _read_lines(self, f, changes: list | None) -> None:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # an append still being written, or torn by a crash
+            self._offset += len(raw)
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                # A crash mid-append can leave a torn line
+                continue
+            self._lines += 1
+            key = record[0]
+            old = self.data.get(key)
+            if len(record) == 2:
+                self.data[key] = record[1]
+            else:
+                self.data.pop(key, None)
+            if changes is not None:
+                changes.append((key, old, self.data.get(key)))
+
+    def _append(self, lines: list) -> None:
+        payload = ("\n".join(lines) + "\n").encode("utf-8")
+        with open(self.path, 'ab') as f:
+            f.write(payload)
+            if self._inode is None:
+                self._inode = os.fstat(f.fileno()).st_ino
+        iostats.record_write(len(payload))
+        self._offset += len(payload)
+        self._lines += len(lines)
+        self._stamp()
+
+    def _rewrite(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            for key, value in self.data.items():
+                f.write(json.dumps([key, value]).encode("utf-8") + b"\n")
+            self._offset = f.tell()
+            self._inode = os.fstat(f.fileno()).st_ino
+        os.replace(tmp_path, self.path)
+        self._lines = len(self.data)
+        self._stamp()
+
+    def _stamp(self) -> None:
+        # The kernel stamps writes with a coarse clock that can lag time.time()
+        # by a few ms; set the mtime explicitly so it compares correctly with
+        # change times engines record themselves (e.g. SQLite's updated_at)
+        now = time.time()
+        os.utime(self.path, (now, now))
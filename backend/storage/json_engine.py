@@ -0,0 +1,186 @@
+import os
+import re
+from storage import iostats, serialization
+from storage.archive import DayArchive
+from storage.cache import FileCache
+from storage.engine import StorageEngine
+from storage.files import JSON_INDENT, atomic_write_bytes, atomic_write_json, remove_file, stat_stamp
+
+DAY_FILE_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2})\.json$")
+
+
+def file_stamp(path: str) -> str:
+    """Change token of a file (see stat_stamp), or "" if it doesn't exist"""
+    try:
+        return stat_stamp(os.stat(path))
+    except FileNotFoundError:
+        return ""
+
+
+def disk_usage(st: os.stat_result) -> int:
+    """Bytes of disk a file occupies: whole blocks, so even a tiny day file takes one"""
+    blocks = getattr(st, "st_blocks", None)  # not reported on Windows
+    return blocks * 512 if blocks is not None else st.st_size
+
+
+def read_json_file(file_path: str):
+    """Parse a JSON file from disk, compact or pretty-printed (a UTF-8 BOM is ignored)"""
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    iostats.record_read(len(raw))
+    return serialization.loads(raw)
+
+
+class JsonFileEngine(StorageEngine):
+    """One ``YYYY-MM-DD.json`` file per day, plus settings.json and active_timer.json.
+
+    Closed months can be packed into archive segments (see archive_month);
+    a day with no file of its own is read from its month's segment, and
+    saving it writes a day file again, which then takes precedence.
+    """
+
+    name = "json"
+
+    def __init__(self, data_dir: str, cache_size: int = 512):
+        self.data_dir = data_dir
+        self.settings_file = os.path.join(data_dir, "settings.json")
+        self.active_timer_file = os.path.join(data_dir, "active_timer.json")
+        # Parsed day and settings files, revalidated against each file's mtime
+        self.cache = FileCache(cache_size)
+        self.archive = DayArchive(os.path.join(data_dir, "archive"))
+
+    def day_path(self, date: str) -> str:
+        """Get the path to the data file for a given date (YYYY-MM-DD)"""
+        return os.path.join(self.data_dir, f"{date}.json")
+
+    def list_dates(self, start: str | None = None, end: str | None = None) -> list[str]:
+        return sorted(set(self._file_dates(start, end)).union(self.archive.dates(start, end)))
+
+    def _file_dates(self, start: str | None = None, end: str | None = None) -> list[str]:
+        """Dates that have a day file (not archived), ascending"""
+        if not os.path.isdir(self.data_dir):
+            return []
+        dates = []
+        for name in os.listdir(self.data_dir):
+            match = DAY_FILE_PATTERN.match(name)
+            if match:
+                date = match.group(1)
+                # ISO dates compare correctly as strings
+                if (start is None or date >= start) and (end is None or date <= end):
+                    dates.append(date)
+        return sorted(dates)
+
+    def has_day(self, date: str) -> bool:
+        return os.path.exists(self.day_path(date)) or self.archive.has(date)
+
+    def load_day(self, date: str) -> dict | None:
+        day_data = self.cache.get(self.day_path(date), read_json_file)
+        if day_data is None:
+            return self.archive.load(date)
+        return day_data
+
+    def save_day(self, date: str, data: dict, mtime: float | None = None) -> None:
+        """Write a day file. mtime backdates the file to when the change was made"""
+        file_path = self.day_path(date)
+        atomic_write_json(file_path, data)
+        if mtime is not None:
+            os.utime(file_path, (mtime, mtime))
+        self.cache.put(file_path, data)
+
+    def day_stamp(self, date: str) -> str:
+        return file_stamp(self.day_path(date)) or self.archive.stamp(date)
+
+    def settings_stamp(self) -> str:
+        return file_stamp(self.settings_file)
+
+    def newest_change(self) -> float:
+        if not os.path.isdir(self.data_dir):
+            return 0
+        # One directory scan; called at startup with thousands of day files.
+        # Archived days keep the mtime their file had
+        with os.scandir(self.data_dir) as entries:
+            newest = max((entry.stat().st_mtime for entry in entries if DAY_FILE_PATTERN.match(entry.name)), default=0)
+        return max(newest, self.archive.newest_change())
+
+    def load_settings(self) -> dict | None:
+        return self.cache.get(self.settings_file, read_json_file)
+
+    def save_settings(self, settings: dict) -> None:
+        atomic_write_json(self.settings_file, settings)
+        self.cache.put(self.settings_file, settings)
+
+    def load_active_timer(self) -> dict | None:
+        if os.path.exists(self.active_timer_file):
+            return read_json_file(self.active_timer_file)
+        return None
+
+    def save_active_timer(self, timer_data: dict | None) -> None:
+        if timer_data is None:
+            remove_file(self.active_timer_file)
+        else:
+            atomic_write_json(self.active_timer_file, timer_data)
+
+    def reformat(self, indent: int | None = JSON_INDENT) -> dict:
+        """Rewrite every stored file in the current format (compact unless indent is set).
+
+        Files keep their mtime, so indexes built from them don't look stale
+        and are not rebuilt. Not safe while another process is writing.
+        """
+        paths = [self.day_path(date) for date in self._file_dates()] + [self.settings_file, self.active_timer_file]
+        result = {"items": 0, "rewritten": 0, "bytes_before": 0, "bytes_after": 0}
+        for path in paths:
+            try:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            data = serialization.dumps(serialization.loads(raw), indent=indent)
+            result["items"] += 1
+            result["bytes_before"] += len(raw)
+            result["bytes_after"] += len(data)
+            if data != raw:
+                atomic_write_bytes(path, data)
+                os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+                self.cache.invalidate(path)
+                result["rewritten"] += 1
+        return result
+
+    def archive_months(self, before: str) -> list[str]:
+        return sorted({date[:7] for date in self._file_dates() if date[:7] < before})
+
+    def archive_month(self, month: str) -> dict:
+        """Pack a month's day files into its archive segment, then delete them.
+
+        Days already archived for the month are kept unless a day file
+        replaces them. A file changed while the month was being packed is
+        left in place (it takes precedence over its archived copy). Byte
+        counts are the disk space the files occupy, not their length.
+        """
+        days = {}
+        bytes_before = 0
+        if self.archive.has_month(month):
+            bytes_before += disk_usage(os.stat(self.archive.path(month)))
+            for date in self.archive.dates(f"{month}-01", f"{month}-31"):
+                days[date] = (self.archive.read(date), self.archive.mtime(date))
+        packed = {}
+        for date in self._file_dates(f"{month}-01", f"{month}-31"):
+            path = self.day_path(date)
+            with open(path, 'rb') as f:
+                raw = f.read()
+                st = os.fstat(f.fileno())
+            iostats.record_read(len(raw))
+            days[date] = (serialization.dumps(serialization.loads(raw)), st.st_mtime)
+            packed[date] = stat_stamp(st)
+            bytes_before += disk_usage(st)
+        self.archive.write(month, days)
+        bytes_after = disk_usage(os.stat(self.archive.path(month)))
+        for date, stamp in packed.items():
+            path = self.day_path(date)
+            if file_stamp(path) == stamp:
+                remove_file(path)
+                self.cache.invalidate(path)
+        return {"months": 1, "days": len(packed), "bytes_before": bytes_before, "bytes_after": bytes_after}
+
+    def stats(self) -> dict:
+        return {"engine": self.name, "cache": self.cache.stats(), "archived_months": len(self.archive.months())}
@@ -0,0 +1,69 @@
+"""Copy data between storage engines.
+
+    cd backend
+    python -m storage.migrate                 # data/*.json -> data/timetracker.db
+    python -m storage.migrate --data-dir /path/to/data
+"""
+import argparse
+import os
+import sys
+from storage.engine import StorageEngine
+from storage.json_engine import JsonFileEngine
+
+BATCH_DAYS = 200
+
+
+def migrate_json_to_sqlite(data_dir: str, target: StorageEngine) -> dict:
+    """Import every JSON day file, the settings and the active timer into target"""
+    source = JsonFileEngine(data_dir, cache_size=0)
+    counts = {"days": 0, "entries": 0}
+    batch = {}
+    for date in source.list_dates():
+        day_data = source.load_day(date)
+        if day_data is None:
+            continue
+        day_data["total_duration"] = sum(entry.get("duration", 0) for entry in day_data.get("entries", []))
+        batch[date] = day_data
+        counts["days"] += 1
+        counts["entries"] += len(day_data.get("entries", []))
+        if len(batch) >= BATCH_DAYS:
+            target.save_days(batch)
+            batch = {}
+    if batch:
+        target.save_days(batch)
+
+    settings = source.load_settings()
+    if settings is not None:
+        target.save_settings(settings)
+    active = source.load_active_timer()
+    if active is not None:
+        target.save_active_timer(active)
+    return counts
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="data")
+    args = parser.parse_args()
+
+    from storage.sqlite_engine import SqliteEngine
+
+    if not os.path.isdir(args.data_dir):
+        print(f"No data directory at {args.data_dir}")
+        return 1
+    target = SqliteEngine(args.data_dir)
+    # start() imports automatically when it creates the database; otherwise
+    # re-import explicitly (days are replaced, so this is idempotent)
+    existed = os.path.exists(target.path)
+    target.start()
+    if existed:
+        counts = migrate_json_to_sqlite(args.data_dir, target)
+    else:
+        counts = target.stats()
+    target.close()
+    print(f"Imported {counts['days']} days / {counts['entries']} entries into {target.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
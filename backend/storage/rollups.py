@@ -0,0 +1,218 @@
+import threading
+from datetime import date as date_cls, timedelta
+from storage.journal import JournalMap
+
+
+def empty_bucket() -> dict:
+    return {"total": 0, "count": 0, "projects": {}, "categories": {}}
+
+
+def summarize_entries(entries: list) -> dict:
+    """Totals for a list of entries, shaped like a rollup bucket"""
+    bucket = empty_bucket()
+    for entry in entries:
+        duration = entry.get("duration", 0)
+        project = entry.get("project", "Uncategorized")
+        category = entry.get("category", "Uncategorized")
+        bucket["total"] += duration
+        bucket["count"] += 1
+        bucket["projects"][project] = bucket["projects"].get(project, 0) + duration
+        bucket["categories"][category] = bucket["categories"].get(category, 0) + duration
+    return bucket
+
+
+def parse_day(date: str) -> date_cls | None:
+    """The day a YYYY-MM-DD string names, or None if it isn't a real day"""
+    try:
+        return date_cls.fromisoformat(date)
+    except ValueError:
+        return None
+
+
+def period_keys(date: str) -> list[str]:
+    """Keys of the week, month and year buckets a day belongs to (none for an invalid date)"""
+    day = parse_day(date)
+    if day is None:
+        return []
+    year, week, _ = day.isocalendar()
+    return [f"{year}-W{week:02d}", date[:7], date[:4]]
+
+
+class RollupStore:
+    """Incrementally maintained totals per day, ISO week, month and year.
+
+    Day buckets are persisted in a JournalMap; the week/month/year buckets
+    are derived from them in memory when loading and then kept up to date
+    with the delta of every day that is saved. Each bucket holds the total
+    seconds, entry count and per-project/per-category seconds.
+    """
+
+    def __init__(self, path: str, locks=None):
+        self._days = JournalMap(path, locks)
+        self._periods = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self, newest_day_change: float = 0) -> bool:
+        """Load persisted day buckets. Returns False if missing or older than the data"""
+        with self._lock:
+            found = self._days.load()
+            self._derive_periods()
+            self.loaded = True
+            return found and not self.is_stale(newest_day_change)
+
+    def is_stale(self, newest_day_change: float) -> bool:
+        return newest_day_change > self._days.mtime()
+
+    def rebuild(self, days) -> None:
+        """Recompute everything from an iterable of (date, entries) pairs"""
+        buckets = {}
+        for date, entries in days:
+            # A stray file like 2024-02-30.json must not stop a rebuild
+            if entries and parse_day(date) is not None:
+                buckets[date] = summarize_entries(entries)
+        with self._lock:
+            self._days.replace(buckets)
+            self._derive_periods()
+            self.loaded = True
+
+    def update_day(self, date: str, entries: list) -> None:
+        """Replace a day's bucket and shift its week/month/year buckets by the difference"""
+        if parse_day(date) is None:
+            return
+        new = summarize_entries(entries)
+        with self._lock, self._days.exclusive():
+            self._apply_changes(self._days.sync())
+            old = self._days.get(date) or empty_bucket()
+            if old == new:
+                self._days.touch()
+                return
+            self._shift_periods(date, old, new)
+            if new["count"]:
+                self._days.set(date, new)
+            else:
+                self._days.delete(date)
+
+    def refresh(self) -> None:
+        """Pick up days other processes saved since the last load or refresh"""
+        with self._lock:
+            self._apply_changes(self._days.sync())
+
+    def bucket(self, key: str) -> dict:
+        """A single bucket: YYYY-MM-DD, YYYY-Www, YYYY-MM or YYYY"""
+        with self._lock:
+            source = self._days.get(key) if len(key) == 10 else self._periods.get(key)
+            return _copy(source or empty_bucket())
+
+    def summarize(self, start: str, end: str, daily: bool = False) -> dict:
+        """Totals between start and end inclusive, using the coarsest buckets that fit.
+
+        Whole years, months and ISO weeks inside the range are read from their
+        own bucket, so the cost is O(buckets) rather than O(days or entries).
+        With daily=True the result also has a per-day "daily" breakdown.
+        """
+        first = date_cls.fromisoformat(start)
+        last = date_cls.fromisoformat(end)
+        result = empty_bucket()
+        with self._lock:
+            if daily:
+                result["daily"] = {}
+                day = first
+                while day <= last:
+                    bucket = self._days.get(day.isoformat())
+                    result["daily"][day.isoformat()] = bucket["total"] if bucket else 0
+                    day += timedelta(days=1)
+            cursor = first
+            while cursor <= last:
+                key, span_end = _largest_bucket(cursor, last)
+                source = self._days.get(key) if len(key) == 10 else self._periods.get(key)
+                if source:
+                    _add(result, source, 1)
+                cursor = span_end + timedelta(days=1)
+        return result
+
+    def check(self, days) -> list[str]:
+        """Compare stored buckets against an iterable of (date, entries); returns the problems found"""
+        problems = []
+        expected = {}
+        for date, entries in days:
+            if entries and parse_day(date) is not None:
+                expected[date] = summarize_entries(entries)
+        with self._lock:
+            stored = dict(self._days.items())
+            for date in sorted(set(expected) | set(stored)):
+                if expected.get(date) != stored.get(date):
+                    problems.append(f"day {date}: stored {stored.get(date)} != actual {expected.get(date)}")
+            periods = {}
+            for date, bucket in expected.items():
+                for key in period_keys(date):
+                    _add(periods.setdefault(key, empty_bucket()), bucket, 1)
+            for key in sorted(set(periods) | set(self._periods)):
+                if _strip(periods.get(key)) != _strip(self._periods.get(key)):
+                    problems.append(f"period {key}: stored {self._periods.get(key)} != actual {periods.get(key)}")
+        return problems
+
+    def _apply_changes(self, changes: list | None) -> None:
+        if changes is None:
+            self._derive_periods()
+            return
+        for date, old, new in changes:
+            self._shift_periods(date, old or empty_bucket(), new or empty_bucket())
+
+    def _shift_periods(self, date: str, old: dict, new: dict) -> None:
+        """Move a day's week/month/year buckets from its old totals to its new ones"""
+        for key in period_keys(date):
+            bucket = self._periods.setdefault(key, empty_bucket())
+            _add(bucket, old, -1)
+            _add(bucket, new, 1)
+            if bucket["count"] == 0:
+                del self._periods[key]
+
+    def _derive_periods(self) -> None:
+        self._periods = {}
+        for date, bucket in self._days.items():
+            for key in period_keys(date):
+                _add(self._periods.setdefault(key, empty_bucket()), bucket, 1)
+
+
+def _largest_bucket(cursor: date_cls, last: date_cls) -> tuple[str, date_cls]:
+    """The coarsest bucket starting at cursor that ends on or before last"""
+    if cursor.month == 1 and cursor.day == 1:
+        year_end = date_cls(cursor.year, 12, 31)
+        if year_end <= last:
+            return str(cursor.year), year_end
+    if cursor.day == 1:
+        next_month = date_cls(cursor.year + cursor.month // 12, cursor.month % 12 + 1, 1)
+        month_end = next_month - timedelta(days=1)
+        if month_end <= last:
+            return cursor.isoformat()[:7], month_end
+    if cursor.weekday() == 0 and cursor + timedelta(days=6) <= last:
+        year, week, _ = cursor.isocalendar()
+        return f"{year}-W{week:02d}", cursor + timedelta(days=6)
+    return cursor.isoformat(), cursor
+
+
+def _add(target: dict, source: dict, sign: int) -> None:
+    target["total"] += sign * source["total"]
+    target["count"] += sign * source["count"]
+    for field in ("projects", "categories"):
+        totals = target[field]
+        for name, seconds in source[field].items():
+            totals[name] = totals.get(name, 0) + sign * seconds
+            if sign < 0 and totals[name] == 0:
+                del totals[name]
+
+
+def _copy(bucket: dict) -> dict:
+    return {
+        "total": bucket["total"],
+        "count": bucket["count"],
+        "projects": dict(bucket["projects"]),
+        "categories": dict(bucket["categories"]),
+    }
+
+
+def _strip(bucket: dict | None) -> dict | None:
+    if bucket is None or bucket["count"] == 0:
+        return None
+    return bucket
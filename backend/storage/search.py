@@ -0,0 +1,193 @@
+import bisect
+import math
+import re
+import threading
+from storage.journal import JournalMap
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# A term found in the project or category counts for more than one in the description
+FIELD_WEIGHTS = {"description": 1.0, "project": 2.0, "category": 1.5}
+# Score factor for a query word that only matched as the prefix of a longer term
+PREFIX_FACTOR = 0.5
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Lower-cased words of text"""
+    return TOKEN_PATTERN.findall(text.casefold()) if text else []
+
+
+def entry_terms(entry: dict) -> dict:
+    """Weighted term frequencies of an entry's searchable fields"""
+    terms = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for term in tokenize(entry.get(field)):
+            terms[term] = terms.get(term, 0) + weight
+    return terms
+
+
+class SearchIndex:
+    """Inverted index over entry descriptions, projects and categories.
+
+    Each entry's weighted terms are persisted in a JournalMap as ``{"date",
+    "start", "terms"}``, so a restart replays that log instead of parsing
+    every day. The postings (term -> {entry id: weight}) and a sorted
+    vocabulary for prefix lookups are derived from it in memory.
+    """
+
+    def __init__(self, path: str, locks=None):
+        self._docs = JournalMap(path, locks)
+        self._postings = {}
+        self._by_date = {}
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self, newest_day_change: float = 0) -> bool:
+        """Load the persisted index. Returns False if missing or older than the data"""
+        with self._lock:
+            found = self._docs.load()
+            self._reindex()
+            self.loaded = True
+            return found and not self.is_stale(newest_day_change)
+
+    def is_stale(self, newest_day_change: float) -> bool:
+        return newest_day_change > self._docs.mtime()
+
+    def rebuild(self, days) -> None:
+        """Rebuild from scratch given an iterable of (date, entries) pairs"""
+        docs = {}
+        for date, entries in days:
+            for entry in entries:
+                if entry.get("id"):
+                    docs[entry["id"]] = _document(date, entry)
+        with self._lock:
+            self._docs.replace(docs)
+            self._reindex()
+            self.loaded = True
+
+    def update_day(self, date: str, entries: list) -> None:
+        """Re-index the entries of a saved day and drop any that left it"""
+        docs = {entry["id"]: _document(date, entry) for entry in entries if entry.get("id")}
+        with self._lock, self._docs.exclusive():
+            self._apply_changes(self._docs.sync())
+            removed = [entry_id for entry_id in self._by_date.get(date, set()) - docs.keys()
+                       if self._docs.get(entry_id, {}).get("date") == date]
+            changed = {entry_id: doc for entry_id, doc in docs.items() if self._docs.get(entry_id) != doc}
+            if not changed and not removed:
+                self._docs.touch()
+                return
+            for entry_id in removed:
+                self._unpost(entry_id, self._docs.get(entry_id))
+            for entry_id, doc in changed.items():
+                self._unpost(entry_id, self._docs.get(entry_id))
+                self._post(entry_id, doc)
+            self._docs.apply(changed, deletes=removed)
+
+    def refresh(self) -> None:
+        """Pick up entries other processes indexed since the last load or refresh"""
+        with self._lock:
+            self._apply_changes(self._docs.sync())
+
+    def search(self, query: str, start: str | None = None, end: str | None = None) -> list[tuple]:
+        """Entries matching every word of query, best first, as (score, entry id, date).
+
+        Each query word matches terms equal to it or starting with it (at
+        PREFIX_FACTOR of the score). Scores add up the words' TF-IDF; ties go
+        to the most recent entry. start and end bound the entry dates.
+        """
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+        with self._lock:
+            total = len(self._docs)
+            scores = None
+            for word in words:
+                matches = {}
+                for term in self._expand(word):
+                    postings = self._postings[term]
+                    idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                    factor = idf if term == word else idf * PREFIX_FACTOR
+                    for entry_id, weight in postings.items():
+                        score = weight * factor
+                        if score > matches.get(entry_id, 0):
+                            matches[entry_id] = score
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {entry_id: score + matches[entry_id] for entry_id, score in scores.items()
+                              if entry_id in matches}
+                if not scores:
+                    return []
+            hits = []
+            for entry_id, score in scores.items():
+                doc = self._docs.get(entry_id)
+                if (start is None or doc["date"] >= start) and (end is None or doc["date"] <= end):
+                    hits.append((score, entry_id, doc["date"], doc.get("start") or ""))
+        hits.sort(key=lambda hit: (hit[0], hit[3]), reverse=True)
+        return [hit[:3] for hit in hits]
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _expand(self, word: str) -> list[str]:
+        """Indexed terms equal to or starting with word"""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        terms = []
+        for term in self._vocabulary[bisect.bisect_left(self._vocabulary, word):]:
+            if not term.startswith(word):
+                break
+            terms.append(term)
+        return terms
+
+    def _post(self, entry_id: str, doc: dict) -> None:
+        for term, weight in doc["terms"].items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary_dirty = True
+            postings[entry_id] = weight
+        old_date = self._docs.get(entry_id, {}).get("date")
+        if old_date is not None and old_date != doc["date"]:
+            self._by_date.get(old_date, set()).discard(entry_id)
+        self._by_date.setdefault(doc["date"], set()).add(entry_id)
+
+    def _unpost(self, entry_id: str, doc: dict | None) -> None:
+        if doc is None:
+            return
+        for term in doc["terms"]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(entry_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._vocabulary_dirty = True
+        ids = self._by_date.get(doc["date"])
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_date[doc["date"]]
+
+    def _apply_changes(self, changes: list | None) -> None:
+        if changes is None:
+            self._reindex()
+            return
+        for entry_id, old, new in changes:
+            self._unpost(entry_id, old)
+            if new is not None:
+                self._post(entry_id, new)
+
+    def _reindex(self) -> None:
+        self._postings = {}
+        self._by_date = {}
+        for entry_id, doc in self._docs.items():
+            for term, weight in doc["terms"].items():
+                self._postings.setdefault(term, {})[entry_id] = weight
+            self._by_date.setdefault(doc["date"], set()).add(entry_id)
+        self._vocabulary_dirty = True
+
+
+def _document(date: str, entry: dict) -> dict:
+    return {"date": date, "start": entry.get("start_time"), "terms": entry_terms(entry)}
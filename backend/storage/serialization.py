@@ -0,0 +1,39 @@
+import json
+import time
+from storage import iostats
+
+try:
+    import orjson
+except ImportError:  # optional: the standard library is used instead
+    orjson = None
+
+UTF8_BOM = b"\xef\xbb\xbf"
+
+
+def dumps(data, indent: int | None = None) -> bytes:
+    """Serialize plain JSON data to UTF-8 bytes, compact unless indent is given.
+
+    orjson only knows a 2-space indent, so other indents use the standard library.
+    """
+    if orjson is not None and indent in (None, 2):
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    separators = None if indent else (",", ":")
+    return json.dumps(data, indent=indent, separators=separators, ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: bytes | str):
+    """Parse JSON text or bytes, compact or pretty-printed, ignoring a UTF-8 BOM"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    data = data.removeprefix(UTF8_BOM)
+    started = time.perf_counter()
+    try:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+    finally:
+        iostats.record_parse(time.perf_counter() - started)
+
+
+def backend() -> str:
+    return "orjson" if orjson is not None else "json"
@@ -0,0 +1,260 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from storage import iostats, serialization
+from storage.engine import StorageEngine
+from storage.files import FSYNC_MODE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS days (
+    date TEXT PRIMARY KEY,
+    total_duration INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id TEXT,
+    date TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    project TEXT,
+    category TEXT,
+    duration INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_date ON entries (date, position);
+CREATE INDEX IF NOT EXISTS entries_id ON entries (id);
+CREATE INDEX IF NOT EXISTS entries_project ON entries (project, date);
+CREATE INDEX IF NOT EXISTS entries_category ON entries (category, date);
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SqliteEngine(StorageEngine):
+    """All days, settings and the active timer in one SQLite database (WAL mode).
+
+    Each entry is a row holding its original JSON plus the columns that
+    queries filter on (date, id, project, category, duration), so cross-day
+    questions become indexed SQL instead of one file parse per day.
+    """
+
+    name = "sqlite"
+    indexes_entries = True
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, "timetracker.db")
+        self._local = threading.local()
+        # Re-entrant: the JSON import's own writes come back through start()
+        self._start_lock = threading.RLock()
+        self._started = False
+        self._importing = False
+
+    def start(self) -> None:
+        """Open the database, first importing the JSON data directory when it is created.
+
+        The import is marked done only once it completes, in the kv table;
+        until then every start redoes it (days are replaced, so that is
+        harmless) and no other thread gets to use the half-imported data.
+        """
+        with self._start_lock:
+            if self._started or self._importing:
+                return
+            is_new = not os.path.exists(self.path)
+            db = self._connection()
+            db.executescript(SCHEMA)
+            if is_new:
+                with db:
+                    db.execute("INSERT OR IGNORE INTO kv (key, value) VALUES ('json_import', '\"pending\"')")
+            row = db.execute("SELECT value FROM kv WHERE key = 'json_import'").fetchone()
+            if row is not None and serialization.loads(row[0]) != "done":
+                from storage.migrate import migrate_json_to_sqlite
+                self._importing = True
+                try:
+                    migrate_json_to_sqlite(self.data_dir, self)
+                finally:
+                    self._importing = False
+                with db:
+                    db.execute("UPDATE kv SET value = '\"done\"' WHERE key = 'json_import'")
+            self._started = True
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, so each
+        # threadpool worker gets its own
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        os.makedirs(self.data_dir, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=check_same_thread)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={'FULL' if FSYNC_MODE == 'always' else 'NORMAL'}")
+        return connection
+
+    def _db(self) -> sqlite3.Connection:
+        self.start()
+        return self._connection()
+
+    # ---------- days ----------
+
+    def list_dates(self, start: str | None = None, end: str | None = None) -> list[str]:
+        rows = self._db().execute(
+            "SELECT date FROM days WHERE date >= ? AND date <= ? ORDER BY date",
+            (start or "", end or "9999-99-99"),
+        )
+        return [row[0] for row in rows]
+
+    def has_day(self, date: str) -> bool:
+        return self._db().execute("SELECT 1 FROM days WHERE date = ?", (date,)).fetchone() is not None
+
+    def load_day(self, date: str) -> dict | None:
+        db = self._db()
+        day = db.execute("SELECT total_duration FROM days WHERE date = ?", (date,)).fetchone()
+        if day is None:
+            return None
+        rows = db.execute("SELECT data FROM entries WHERE date = ? ORDER BY position", (date,)).fetchall()
+        iostats.record_read(sum(len(row[0]) for row in rows))
+        return {"date": date, "entries": [serialization.loads(row[0]) for row in rows], "total_duration": day[0]}
+
+    def save_day(self, date: str, data: dict) -> None:
+        with self._db() as db:
+            self._write_day(db, date, data)
+
+    def save_days(self, days: dict) -> None:
+        """Write many days in a single transaction"""
+        with self._db() as db:
+            for date, data in days.items():
+                self._write_day(db, date, data)
+
+    def _write_day(self, db: sqlite3.Connection, date: str, data: dict) -> None:
+        entries = data.get("entries", [])
+        db.execute(
+            "INSERT INTO days (date, total_duration, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(date) DO UPDATE SET total_duration = excluded.total_duration, updated_at = excluded.updated_at",
+            (date, data.get("total_duration", 0), time.time()),
+        )
+        db.execute("DELETE FROM entries WHERE date = ?", (date,))
+        rows = [
+            (entry.get("id"), date, position, entry.get("project"), entry.get("category"),
+             entry.get("duration", 0), serialization.dumps(entry).decode("utf-8"))
+            for position, entry in enumerate(entries)
+        ]
+        db.executemany(
+            "INSERT INTO entries (id, date, position, project, category, duration, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        iostats.record_write(sum(len(row[-1]) for row in rows))
+
+    def day_stamp(self, date: str) -> str:
+        row = self._db().execute("SELECT updated_at, total_duration FROM days WHERE date = ?", (date,)).fetchone()
+        return f"{row[0]!r}-{row[1]}" if row is not None else ""
+
+    def settings_stamp(self) -> str:
+        row = self._db().execute("SELECT value FROM kv WHERE key = 'settings'").fetchone()
+        return hashlib.blake2b(row[0].encode("utf-8"), digest_size=12).hexdigest() if row is not None else ""
+
+    def newest_change(self) -> float:
+        row = self._db().execute("SELECT MAX(updated_at) FROM days").fetchone()
+        return row[0] or 0
+
+    def reformat(self, indent: int | None = None) -> dict:
+        """Rewrite stored entry and settings JSON compactly (or with indent) in one transaction.
+
+        updated_at is left alone, so day stamps and the indexes built from them stay valid.
+        """
+        result = {"items": 0, "rewritten": 0, "bytes_before": 0, "bytes_after": 0}
+        with self._db() as db:
+            for table, key in (("entries", "rowid"), ("kv", "key")):
+                column = "data" if table == "entries" else "value"
+                updates = []
+                for row_key, raw in db.execute(f"SELECT {key}, {column} FROM {table}").fetchall():
+                    data = serialization.dumps(serialization.loads(raw), indent=indent).decode("utf-8")
+                    result["items"] += 1
+                    result["bytes_before"] += len(raw.encode("utf-8"))
+                    result["bytes_after"] += len(data.encode("utf-8"))
+                    if data != raw:
+                        updates.append((data, row_key))
+                db.executemany(f"UPDATE {table} SET {column} = ? WHERE {key} = ?", updates)
+                result["rewritten"] += len(updates)
+        return result
+
+    # ---------- settings / active timer ----------
+
+    def _get(self, key: str) -> dict | None:
+        row = self._db().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        iostats.record_read(len(row[0]))
+        return serialization.loads(row[0])
+
+    def _set(self, key: str, value) -> None:
+        with self._db() as db:
+            if value is None:
+                db.execute("DELETE FROM kv WHERE key = ?", (key,))
+            else:
+                data = serialization.dumps(value).decode("utf-8")
+                db.execute("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (key, data))
+                iostats.record_write(len(data))
+
+    def load_settings(self) -> dict | None:
+        return self._get("settings")
+
+    def save_settings(self, settings: dict) -> None:
+        self._set("settings", settings)
+
+    def load_active_timer(self) -> dict | None:
+        return self._get("active_timer")
+
+    def save_active_timer(self, timer_data: dict | None) -> None:
+        self._set("active_timer", timer_data)
+
+    # ---------- queries ----------
+
+    def find_entry_date(self, entry_id: str) -> str | None:
+        row = self._db().execute("SELECT date FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def iter_entries(self, start: str, end: str, project: str | None = None, category: str | None = None):
+        sql = "SELECT date, data FROM entries WHERE date >= ? AND date <= ?"
+        params = [start, end]
+        if project is not None:
+            sql += " AND project = ?"
+            params.append(project)
+        if category is not None:
+            sql += " AND category = ?"
+            params.append(category)
+        self.start()
+        # Streaming responses may resume this generator on different threads,
+        # so it reads through a connection of its own
+        connection = self._connect(check_same_thread=False)
+        try:
+            cursor = connection.execute(sql + " ORDER BY date, position", params)
+            while True:
+                rows = cursor.fetchmany(500)
+                if not rows:
+                    break
+                for date, data in rows:
+                    entry = serialization.loads(data)
+                    entry["date"] = date
+                    yield entry
+        finally:
+            connection.close()
+
+    def stats(self) -> dict:
+        db = self._db()
+        return {
+            "engine": self.name,
+            "days": db.execute("SELECT COUNT(*) FROM days").fetchone()[0],
+            "entries": db.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+        }
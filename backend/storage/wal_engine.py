@@ -0,0 +1,380 @@
+import os
+import re
+import threading
+import time
+from storage import iostats, serialization
+from storage.cache import clone
+from storage.engine import StorageEngine
+from storage.files import JSON_INDENT, sync_file
+from storage.json_engine import JsonFileEngine
+
+SEGMENT_PATTERN = re.compile(r"^(\d{8})\.log$")
+# Start a new segment once the current one reaches this size
+WAL_SEGMENT_BYTES = int(os.getenv("WAL_SEGMENT_BYTES", 4 * 1024 * 1024))
+# Fold the log back into day files this often, or sooner once it grows past WAL_COMPACT_BYTES
+WAL_COMPACT_SECONDS = float(os.getenv("WAL_COMPACT_SECONDS", 30))
+WAL_COMPACT_BYTES = int(os.getenv("WAL_COMPACT_BYTES", 16 * 1024 * 1024))
+
+_UNSET = object()
+
+
+class WalEngine(StorageEngine):
+    """Append-only write-ahead log in front of the JSON day files.
+
+    Every mutation is appended to ``data/wal/NNNNNNNN.log`` as one JSON line
+    describing just what changed (an entry added/replaced/removed, the
+    settings, the active timer), so a write costs O(1) instead of rewriting
+    the whole day. Readers see an in-memory view of the days touched since
+    the last compaction layered over the day files. A background thread
+    periodically seals the current segment, writes the affected days back
+    as regular day files and deletes the sealed segments; on startup any
+    remaining segments are replayed, which is also how crashes are recovered.
+
+    The log is owned by a single process: run one worker with this engine.
+    """
+
+    name = "wal"
+
+    def __init__(self, data_dir: str, base: JsonFileEngine):
+        self.base = base
+        self.wal_dir = os.path.join(data_dir, "wal")
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._days = {}          # date -> day document, for days changed since the last compaction
+        self._changed_at = {}    # date -> time of the last change, used to date compacted files
+        self._stamps = {}        # date / "settings" -> change stamp while served from memory
+        self._epoch = f"{time.time_ns():x}"
+        self._change_no = 0
+        self._dirty = set()
+        self._settings = _UNSET
+        self._active = _UNSET
+        self._dirty_meta = set()  # "settings" / "active" when changed since the last compaction
+        self._segment = None
+        self._segment_no = 0
+        self._log_bytes = 0
+        self._started = False
+        self._stop = threading.Event()
+        self._compactor = None
+        self.appends = 0
+        self.compactions = 0
+
+    # ---------- lifecycle ----------
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            os.makedirs(self.wal_dir, exist_ok=True)
+            segments = self._segments()
+            for number in segments:
+                self._replay(self._segment_path(number))
+            # Never append to a replayed segment: it may end in a torn line
+            self._segment_no = (segments[-1] if segments else 0) + 1
+            self._open_segment()
+            self._started = True
+        self._compactor = threading.Thread(target=self._run_compactor, name="wal-compactor", daemon=True)
+        self._compactor.start()
+
+    def close(self) -> None:
+        if not self._started:
+            return
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join()
+        self.compact()
+        with self._lock:
+            self._segment.close()
+            self._segment = None
+            self._started = False
+
+    # ---------- reads ----------
+
+    def list_dates(self, start: str | None = None, end: str | None = None) -> list[str]:
+        self.start()
+        dates = set(self.base.list_dates(start, end))
+        with self._lock:
+            for date in self._days:
+                if (start is None or date >= start) and (end is None or date <= end):
+                    dates.add(date)
+        return sorted(dates)
+
+    def has_day(self, date: str) -> bool:
+        self.start()
+        with self._lock:
+            if date in self._days:
+                return True
+        return self.base.has_day(date)
+
+    def load_day(self, date: str) -> dict | None:
+        self.start()
+        with self._lock:
+            if date in self._days:
+                return clone(self._days[date])
+        return self.base.load_day(date)
+
+    def day_stamp(self, date: str) -> str:
+        self.start()
+        with self._lock:
+            if date in self._days:
+                return self._stamps[date]
+        return self.base.day_stamp(date)
+
+    def settings_stamp(self) -> str:
+        self.start()
+        with self._lock:
+            if self._settings is not _UNSET:
+                return self._stamps["settings"]
+        return self.base.settings_stamp()
+
+    def newest_change(self) -> float:
+        self.start()
+        with self._lock:
+            newest = max(self._changed_at.values(), default=0)
+        return max(newest, self.base.newest_change())
+
+    def load_settings(self) -> dict | None:
+        self.start()
+        with self._lock:
+            if self._settings is not _UNSET:
+                return clone(self._settings)
+        return self.base.load_settings()
+
+    def load_active_timer(self) -> dict | None:
+        self.start()
+        with self._lock:
+            if self._active is not _UNSET:
+                return clone(self._active)
+        return self.base.load_active_timer()
+
+    # ---------- writes ----------
+
+    def save_day(self, date: str, data: dict) -> None:
+        self.start()
+        data = clone(data)
+        with self._lock:
+            current = self._days.get(date)
+            if current is None:
+                current = self.base.load_day(date) or {"date": date, "entries": [], "total_duration": 0}
+            records = _diff_day(date, current, data)
+            if not records:
+                return
+            self._append(records)
+            for record in records:
+                self._apply(record)
+
+    def save_settings(self, settings: dict) -> None:
+        self.start()
+        with self._lock:
+            record = {"op": "settings", "data": clone(settings)}
+            self._append([record])
+            self._apply(record)
+
+    def save_active_timer(self, timer_data: dict | None) -> None:
+        self.start()
+        with self._lock:
+            record = {"op": "active", "data": clone(timer_data)}
+            self._append([record])
+            self._apply(record)
+
+    # ---------- compaction ----------
+
+    def compact(self) -> int:
+        """Fold everything logged so far into the day files. Returns the number of days written"""
+        with self._compact_lock:
+            return self._compact()
+
+    def _compact(self) -> int:
+        with self._lock:
+            if not self._started or not (self._dirty or self._dirty_meta):
+                return 0
+            # Seal the current segment; later writes land in a fresh one, so
+            # the sealed segments can be deleted once their days are on disk
+            sealed = self._segments()
+            self._segment.close()
+            self._segment_no += 1
+            self._open_segment()
+            days = {date: clone(self._days[date]) for date in self._dirty}
+            changed_at = {date: self._changed_at.get(date) for date in days}
+            settings = clone(self._settings) if "settings" in self._dirty_meta else _UNSET
+            active = clone(self._active) if "active" in self._dirty_meta else _UNSET
+            self._dirty.clear()
+            self._dirty_meta.clear()
+            self._log_bytes = 0
+
+        for date, data in days.items():
+            self.base.save_day(date, data, mtime=changed_at[date])
+        if settings is not _UNSET:
+            self.base.save_settings(settings)
+        if active is not _UNSET:
+            self.base.save_active_timer(active)
+        for number in sealed:
+            os.remove(self._segment_path(number))
+
+        with self._lock:
+            # Days not touched again since the snapshot are now served from disk
+            for date in days:
+                if date not in self._dirty:
+                    self._days.pop(date, None)
+                    self._changed_at.pop(date, None)
+                    self._stamps.pop(date, None)
+            if "settings" not in self._dirty_meta:
+                self._settings = _UNSET
+                self._stamps.pop("settings", None)
+            if "active" not in self._dirty_meta:
+                self._active = _UNSET
+            self.compactions += 1
+        return len(days)
+
+    def reformat(self, indent: int | None = JSON_INDENT) -> dict:
+        """Fold the log into the day files, then rewrite them in the current format"""
+        self.compact()
+        return self.base.reformat(indent)
+
+    def archive_months(self, before: str) -> list[str]:
+        # Days still only in the log have no day file to pack yet
+        self.compact()
+        return self.base.archive_months(before)
+
+    def archive_month(self, month: str) -> dict:
+        """Fold the log into the day files, then archive them (no compaction runs meanwhile)"""
+        with self._compact_lock:
+            self._compact()
+            return self.base.archive_month(month)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "engine": self.name,
+                "cache": self.base.cache.stats(),
+                "archived_months": len(self.base.archive.months()),
+                "appends": self.appends,
+                "compactions": self.compactions,
+                "segments": len(self._segments()) if self._started else 0,
+                "log_bytes": self._log_bytes,
+                "pending_days": len(self._dirty),
+            }
+
+    def _run_compactor(self) -> None:
+        last = time.monotonic()
+        while not self._stop.wait(1):
+            due = time.monotonic() - last >= WAL_COMPACT_SECONDS
+            if due or self._log_bytes >= WAL_COMPACT_BYTES:
+                self.compact()
+                last = time.monotonic()
+
+    # ---------- log plumbing ----------
+
+    def _segments(self) -> list[int]:
+        numbers = []
+        for name in os.listdir(self.wal_dir):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.wal_dir, f"{number:08d}.log")
+
+    def _open_segment(self) -> None:
+        self._segment = open(self._segment_path(self._segment_no), 'a', encoding='utf-8')
+
+    def _append(self, records: list) -> None:
+        payload = "".join(serialization.dumps(record).decode("utf-8") + "\n" for record in records)
+        self._segment.write(payload)
+        self._segment.flush()
+        sync_file(self._segment.fileno())
+        iostats.record_write(len(payload))
+        self._log_bytes += len(payload)
+        self.appends += 1
+        if self._segment.tell() >= WAL_SEGMENT_BYTES:
+            self._segment.close()
+            self._segment_no += 1
+            self._open_segment()
+
+    def _replay(self, path: str) -> None:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = serialization.loads(line)
+                except ValueError:
+                    # A crash mid-append leaves at most one torn line at the end
+                    continue
+                self._log_bytes += len(line)
+                self._apply(record, changed_at=os.path.getmtime(path))
+
+    def _apply(self, record: dict, changed_at: float | None = None) -> None:
+        """Apply one log record to the in-memory view"""
+        op = record["op"]
+        # Stamps are unique to this process, so they never repeat across restarts
+        self._change_no += 1
+        stamp = f"w{self._epoch}-{self._change_no}"
+        if op == "settings":
+            self._settings = record["data"]
+            self._dirty_meta.add("settings")
+            self._stamps["settings"] = stamp
+            return
+        if op == "active":
+            self._active = record["data"]
+            self._dirty_meta.add("active")
+            return
+
+        date = record["date"]
+        day = self._days.get(date)
+        if day is None:
+            day = self.base.load_day(date) or {"date": date, "entries": [], "total_duration": 0}
+            self._days[date] = day
+        if op == "day":
+            day = self._days[date] = record["data"]
+        elif op == "put":
+            _put_entry(day, record["entry"])
+        elif op == "del":
+            day["entries"] = [entry for entry in day["entries"] if entry.get("id") != record["id"]]
+            day["total_duration"] = sum(entry.get("duration", 0) for entry in day["entries"])
+        self._dirty.add(date)
+        self._changed_at[date] = changed_at or time.time()
+        self._stamps[date] = stamp
+
+
+def _put_entry(day: dict, entry: dict) -> None:
+    """Replace the entry with the same id in place, or append it"""
+    entries = day["entries"]
+    for idx, existing in enumerate(entries):
+        if existing.get("id") == entry["id"]:
+            entries[idx] = entry
+            break
+    else:
+        entries.append(entry)
+    day["total_duration"] = sum(item.get("duration", 0) for item in entries)
+
+
+def _diff_day(date: str, old: dict, new: dict) -> list:
+    """Log records that turn old into new: per-entry puts/deletes where possible.
+
+    If the per-entry records can't reproduce new exactly (entries without an
+    id, a reordering, extra keys), a single full-day record is used instead.
+    """
+    if old == new:
+        return []
+    new_ids = {entry.get("id") for entry in new.get("entries", [])}
+    if None in new_ids or len(new_ids) != len(new.get("entries", [])):
+        return [{"op": "day", "date": date, "data": new}]
+
+    old_entries = {entry.get("id"): entry for entry in old.get("entries", [])}
+    records = [{"op": "del", "date": date, "id": entry_id}
+               for entry_id in old_entries if entry_id not in new_ids]
+    for entry in new.get("entries", []):
+        if old_entries.get(entry["id"]) != entry:
+            records.append({"op": "put", "date": date, "entry": entry})
+
+    # Check the records replay to exactly the new document
+    replayed = clone(old)
+    replayed.setdefault("entries", [])
+    for record in records:
+        if record["op"] == "del":
+            replayed["entries"] = [entry for entry in replayed["entries"] if entry.get("id") != record["id"]]
+            replayed["total_duration"] = sum(entry.get("duration", 0) for entry in replayed["entries"])
+        else:
+            _put_entry(replayed, clone(record["entry"]))
+    if replayed != new:
+        return [{"op": "day", "date": date, "data": new}]
+    return records
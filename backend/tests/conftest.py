@@ -0,0 +1,20 @@
+import os
+import sys
+import pytest
+
+# The backend runs from its own directory; import its packages the same way
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """A TestClient for the app serving an empty data/ in a temp directory"""
+    from fastapi.testclient import TestClient
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    import main
+    # Entering the client runs startup (opening data/), leaving it shutdown
+    with TestClient(main.app) as client:
+        yield client
+
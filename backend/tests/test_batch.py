@@ -0,0 +1,27 @@
+def entry(date: str, description: str = "", start: str = "09:00", end: str = "10:00") -> dict:
+    day = "2024-05-05"
+    return {"project": "Project", "category": "Work", "description": description,
+            "start_time": f"{day}T{start}:00+00:00", "end_time": f"{day}T{end}:00+00:00", "duration": 3600, "date": date}
+
+
+def test_create_with_unpadded_date_lands_on_its_day(client):
+    response = client.post("/api/timers/batch", json=[
+        {"op": "create", "entry": entry("2024-5-5", "unpadded")},
+        {"op": "create", "entry": entry("2024-05-05", "padded", "11:00", "12:00")},
+    ])
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == [200, 200]
+    assert results[0]["entry"]["date"] == "2024-05-05"
+    assert response.json()["days"] == 1
+
+    entries = client.get("/api/timers/2024-05-05").json()["entries"]
+    assert sorted(entry["description"] for entry in entries) == ["padded", "unpadded"]
+
+
+def test_invalid_create_is_skipped(client):
+    results = client.post("/api/timers/batch", json=[
+        {"op": "create", "entry": entry("2024-02-30", "bad")},
+        {"op": "create", "entry": entry("2024-05-05", "good")},
+    ]).json()["results"]
+    assert [result["status"] for result in results] == [400, 200]
+    assert [entry["description"] for entry in client.get("/api/timers/2024-05-05").json()["entries"]] == ["good"]
@@ -0,0 +1,75 @@
+import pytest
+from storage.bulk import detect_format, iter_records
+
+
+def chunked(data: bytes, size: int):
+    """The data split into chunks of size bytes, as an upload arrives"""
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def parse(data: bytes, fmt: str, size: int) -> list:
+    return list(iter_records(chunked(data, size), fmt))
+
+
+RECORDS = [{"id": "a", "description": "über, \"quoted\""}, {"id": "b", "n": 12345}, {"id": "c", "tags": [1, [2]]}]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_json_array_across_chunk_boundaries(size):
+    data = b'\xef\xbb\xbf[ {"id": "a", "description": "\xc3\xbcber, \\"quoted\\""},\n {"id": "b", "n": 12345} ,{"id": "c", "tags": [1, [2]]} ]\n'
+    assert parse(data, "json", size) == list(enumerate(RECORDS, start=1))
+
+
+@pytest.mark.parametrize("size", [1, 2, 5])
+def test_json_array_number_split_across_chunks(size):
+    assert parse(b"[123456, 7]", "json", size) == [(1, 123456), (2, 7)]
+
+
+@pytest.mark.parametrize("data", [b"[]", b"  [ ]  "])
+def test_empty_json_array(data):
+    assert parse(data, "json", 1) == []
+
+
+@pytest.mark.parametrize("data, message", [
+    (b'[{"id": "a"}, {"id": }, {"id": "c"}]', "after record 1"),
+    (b'[{"id": "a"} {"id": "b"}]', "after record 1"),
+    (b'[{"id": "a"}', "Unterminated"),
+    (b'{"id": "a"}', "Expected a JSON array"),
+    (b'[{"id": "a"}] []', "Unexpected data"),
+])
+def test_broken_json_array_raises(data, message):
+    # Records before the damage are still yielded; the rest can't be trusted
+    records = iter_records(chunked(data, 3), "json")
+    with pytest.raises(ValueError, match=message):
+        for _ in records:
+            pass
+
+
+@pytest.mark.parametrize("size", [1, 4, 64])
+def test_ndjson_skips_blank_lines_and_reports_bad_ones(size):
+    data = b'{"id": "a"}\r\n\n{"id": broken}\n{"id": "\xc3\xbc"}'
+    records = parse(data, "ndjson", size)
+    assert [number for number, _ in records] == [1, 2, 3]
+    assert records[0][1] == {"id": "a"} and records[2][1] == {"id": "ü"}
+    assert isinstance(records[1][1], ValueError)
+
+
+@pytest.mark.parametrize("size", [1, 5, 64])
+def test_csv_quoted_cells_and_optional_fields(size):
+    data = ('id,description,end_time,project\n'
+            'a,"multi\nline, with comma",,P\n'
+            ',plain,2024-05-05T10:00:00,Q\n'
+            'c,x,,R,extra\n').encode()
+    records = parse(data, "csv", size)
+    assert records[0] == (1, {"id": "a", "description": "multi\nline, with comma", "end_time": None, "project": "P"})
+    assert records[1] == (2, {"id": None, "description": "plain", "end_time": "2024-05-05T10:00:00", "project": "Q"})
+    assert records[2][0] == 3 and isinstance(records[2][1], ValueError)
+
+
+def test_detect_format():
+    assert detect_format("application/x-ndjson; charset=utf-8") == "ndjson"
+    assert detect_format("text/plain", "entries.jsonl") == "ndjson"
+    assert detect_format(None, "Export.CSV") == "csv"
+    assert detect_format("text/plain", "notes.txt") is None
+    with pytest.raises(ValueError):
+        iter_records([], "xml")
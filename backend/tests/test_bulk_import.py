@@ -0,0 +1,54 @@
+def csv_body(*rows) -> bytes:
+    header = "date,start_time,end_time,duration,project,category,description"
+    return ("\n".join([header, *rows]) + "\n").encode()
+
+
+def test_unpadded_date_is_stored_under_its_day(client):
+    body = csv_body("2024-5-5,2024-05-05T09:00:00+00:00,2024-05-05T10:00:00+00:00,3600,Alpha,Work,padded")
+    result = client.post("/api/timers/bulk?format=csv", content=body).json()
+    assert result["inserted"] == 1, result
+
+    entries = client.get("/api/timers/2024-05-05").json()["entries"]
+    assert [(entry["description"], entry["date"]) for entry in entries] == [("padded", "2024-05-05")]
+    week = client.get("/api/stats/week/2024-04-29").json()
+    assert week["total_seconds"] == 3600
+
+
+def test_invalid_dates_are_rejected(client):
+    body = csv_body("2024-02-30,2024-02-28T09:00:00+00:00,,60,Alpha,Work,",
+                    "05/05/2024,2024-05-05T09:00:00+00:00,,60,Alpha,Work,")
+    result = client.post("/api/timers/bulk?format=csv", content=body).json()
+    assert result["inserted"] == 0 and result["rejected"] == 2, result
+    assert client.get("/api/timers/range?from=2024-01-01&to=2024-12-31").content == b""
+
+
+def ndjson_body(*records) -> bytes:
+    return "".join(f"{record}\n" for record in records).encode()
+
+
+def record(entry_id: str, description: str = "") -> str:
+    return ('{"id": "%s", "date": "2024-05-06", "start_time": "2024-05-06T09:00:00+00:00", "duration": 60, '
+            '"project": "Alpha", "category": "Work", "description": "%s"}' % (entry_id, description))
+
+
+def test_bad_record_mid_stream_and_duplicate_ids(client, monkeypatch):
+    from routes import timers
+    # Small validation chunks, so duplicates are caught across chunk boundaries too
+    monkeypatch.setattr(timers, "BULK_CHUNK_SIZE", 2)
+    body = ndjson_body(record("a", "first"), "{not json", record("b"), record("a", "again"), '{"id": "c"}', record("c"))
+    result = client.post("/api/timers/bulk?format=ndjson", content=body).json()
+    assert (result["received"], result["inserted"], result["duplicates"], result["rejected"]) == (6, 3, 1, 2), result
+    assert sorted(error["record"] for error in result["errors"]) == [2, 5], result["errors"]
+
+    # Importing the same records again only finds duplicates
+    again = client.post("/api/timers/bulk?format=ndjson", content=body).json()
+    assert (again["inserted"], again["duplicates"]) == (0, 4), again
+    entries = client.get("/api/timers/2024-05-06").json()["entries"]
+    assert sorted((entry["id"], entry["description"]) for entry in entries) == [("a", "first"), ("b", ""), ("c", "")]
+
+
+def test_broken_json_array_writes_nothing(client):
+    body = b"[" + record("a").encode() + b", {broken}]"
+    response = client.post("/api/timers/bulk", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+    assert client.get("/api/timers/2024-05-06").json()["entries"] == []
@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from storage.files import KeyedLocks
+
+THREADS = 8
+WRITES = 40
+
+
+def entry(date: str, n: int) -> dict:
+    return {"project": f"Project {n % 5}", "category": "Stress", "description": f"write {n}",
+            "start_time": f"{date}T09:00:00+00:00", "end_time": f"{date}T09:01:00+00:00", "duration": 60, "date": date}
+
+
+def hammer(dates: list[str]) -> None:
+    from models.timer import TimerCreate
+    from routes import timers
+
+    def worker(t: int) -> None:
+        for i in range(WRITES):
+            date = dates[(t + i) % len(dates)]
+            # The route is async; call the blocking body it runs on the I/O pool
+            timers.create_timer.__wrapped__(TimerCreate(**entry(date, t * WRITES + i)))
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        list(pool.map(worker, range(THREADS)))
+
+
+@pytest.mark.parametrize("dates", [["2024-01-01"], [f"2024-02-{day:02d}" for day in range(1, 5)]])
+def test_no_write_is_lost(client, dates):
+    hammer(dates)
+
+    stored = []
+    for date in dates:
+        day_data = client.get(f"/api/timers/{date}").json()
+        assert day_data["total_duration"] == sum(entry["duration"] for entry in day_data["entries"])
+        stored += [entry["description"] for entry in day_data["entries"]]
+    assert sorted(stored) == sorted(f"write {n}" for n in range(THREADS * WRITES))
+    assert not os.listdir(os.path.join("data", ".locks"))
+
+
+def test_lock_files_are_removed(tmp_path):
+    locks = KeyedLocks(str(tmp_path))
+    with locks.hold("2024-01-01", "2024-01-02"):
+        with locks.hold("2024-01-01"):
+            pass
+    assert not os.listdir(tmp_path)
+
+
+def increment(lock_dir: str, path: str, times: int) -> None:
+    locks = KeyedLocks(lock_dir)
+    for _ in range(times):
+        with locks.hold("counter"):
+            with open(path) as file:
+                value = int(file.read())
+            with open(path, "w") as file:
+                file.write(str(value + 1))
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork (and with it fcntl) to run writers in processes")
+def test_processes_are_serialized(tmp_path):
+    counter = tmp_path / "counter"
+    counter.write_text("0")
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=increment, args=(str(tmp_path / ".locks"), str(counter), 200)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert counter.read_text() == "800"
+    assert not os.listdir(tmp_path / ".locks")
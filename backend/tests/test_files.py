@@ -0,0 +1,25 @@
+import os
+import stat
+import pytest
+from storage.files import UMASK, atomic_write_bytes
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fchmod"), reason="permissions are only kept on POSIX")
+
+
+def mode(path) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_file_gets_default_mode(tmp_path):
+    path = tmp_path / "2024-05-05.json"
+    atomic_write_bytes(str(path), b"{}")
+    assert mode(path) == 0o666 & ~UMASK
+
+
+def test_rewrite_keeps_existing_mode(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_bytes(b"{}")
+    os.chmod(path, 0o640)
+    atomic_write_bytes(str(path), b'{"projects": []}')
+    assert mode(path) == 0o640
+    assert path.read_bytes() == b'{"projects": []}'
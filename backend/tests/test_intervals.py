@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+from storage.intervals import DayIntervals, IntervalIndex, entry_span
+
+
+def at(hhmm: str) -> datetime:
+    return datetime(2024, 5, 6, int(hhmm[:2]), int(hhmm[3:]), tzinfo=timezone.utc)
+
+
+def entry(entry_id: str, start: str, end: str | None = None, duration: int = 0) -> dict:
+    return {"id": entry_id, "start_time": at(start).isoformat(),
+            "end_time": at(end).isoformat() if end else None, "duration": duration}
+
+
+def test_overlapping_returns_ids_in_start_order():
+    intervals = DayIntervals([entry("c", "13:00", "14:00"), entry("a", "09:00", "10:00"), entry("b", "09:30", "12:00")])
+    assert intervals.overlapping(at("09:45"), at("13:30")) == ["a", "b", "c"]
+    assert intervals.overlapping(at("10:30"), at("11:00")) == ["b"]
+
+
+def test_touching_intervals_do_not_overlap():
+    intervals = DayIntervals([entry("a", "09:00", "10:00"), entry("b", "11:00", "12:00")])
+    assert intervals.overlapping(at("10:00"), at("11:00")) == []
+    assert intervals.overlapping(at("08:00"), at("09:00")) == []
+
+
+def test_long_entry_is_found_past_shorter_later_ones():
+    # The running max end keeps the scan going past short entries to a long one
+    intervals = DayIntervals([entry("long", "08:00", "18:00"), entry("x", "09:00", "09:10"), entry("y", "10:00", "10:10")])
+    assert intervals.overlapping(at("16:00"), at("17:00")) == ["long"]
+
+
+def test_open_entries_last_for_their_duration():
+    assert entry_span(entry("a", "09:00", duration=1800)) == (at("09:00"), at("09:30"))
+    intervals = DayIntervals([entry("a", "09:00", duration=1800), {"id": "", "start_time": at("09:00").isoformat()}])
+    assert intervals.overlapping(at("09:15"), at("09:20")) == ["a"]
+    assert intervals.overlapping(at("09:30"), at("10:00")) == []
+
+
+def test_index_caches_until_invalidated_and_evicts_oldest():
+    index = IntervalIndex(max_days=2)
+    first = index.get("2024-05-06", [entry("a", "09:00", "10:00")])
+    assert index.get("2024-05-06", []) is first
+    index.invalidate("2024-05-06")
+    assert index.get("2024-05-06", []).overlapping(at("09:00"), at("10:00")) == []
+    index.get("2024-05-07", [])
+    index.get("2024-05-08", [])
+    rebuilt = index.get("2024-05-06", [entry("b", "09:00", "10:00")])
+    assert rebuilt.overlapping(at("09:00"), at("10:00")) == ["b"]
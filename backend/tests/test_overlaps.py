@@ -0,0 +1,71 @@
+DAY = "2024-05-06"
+
+
+def entry(start: str, end: str, description: str = "", **fields) -> dict:
+    hours = int(end[:2]) - int(start[:2]) + (int(end[3:]) - int(start[3:])) / 60
+    return {"project": "Project", "category": "Work", "description": description,
+            "start_time": f"{DAY}T{start}:00+00:00", "end_time": f"{DAY}T{end}:00+00:00",
+            "duration": int(hours * 3600), "date": DAY, **fields}
+
+
+def day_spans(client, date: str = DAY) -> list[tuple]:
+    """(description, start HH:MM, end HH:MM) of a day's entries, by start"""
+    entries = client.get(f"/api/timers/{date}").json()["entries"]
+    return sorted((entry["description"], entry["start_time"][11:16], entry["end_time"][11:16]) for entry in entries)
+
+
+def test_unpadded_date_resolves_against_its_day(client):
+    client.post("/api/timers", json=entry("09:00", "11:00", "existing"))
+    body = client.post("/api/timers/upsert-resolving-overlaps",
+                       json=entry("10:00", "12:00", "new", date="2024-5-6")).json()
+    assert body["entry"]["date"] == DAY
+    assert len(body["trimmed"]) == 1
+    assert sorted(day_spans(client)) == [("existing", "09:00", "10:00"), ("new", "10:00", "12:00")]
+
+
+def test_trims_entries_overlapping_either_end(client):
+    client.post("/api/timers", json=entry("08:00", "10:00", "morning"))
+    client.post("/api/timers", json=entry("11:00", "13:00", "midday"))
+    body = client.post("/api/timers/upsert-resolving-overlaps", json=entry("09:30", "11:30", "new")).json()
+    assert len(body["trimmed"]) == 2 and body["deleted"] == [] and body["split"] == []
+    assert day_spans(client) == [("midday", "11:30", "13:00"), ("morning", "08:00", "09:30"), ("new", "09:30", "11:30")]
+    day = client.get(f"/api/timers/{DAY}").json()
+    assert day["total_duration"] == sum(e["duration"] for e in day["entries"]) == 5 * 3600
+
+
+def test_splits_an_entry_it_sits_inside(client):
+    outer = client.post("/api/timers", json=entry("09:00", "17:00", "outer")).json()
+    body = client.post("/api/timers/upsert-resolving-overlaps", json=entry("12:00", "13:00", "lunch")).json()
+    assert body["split"] == [{"id": outer["id"], "new_id": body["split"][0]["new_id"]}]
+    assert day_spans(client) == [("lunch", "12:00", "13:00"), ("outer", "09:00", "12:00"), ("outer", "13:00", "17:00")]
+    durations = {e["id"]: e["duration"] for e in client.get(f"/api/timers/{DAY}").json()["entries"]}
+    assert durations[outer["id"]] == 3 * 3600 and durations[body["split"][0]["new_id"]] == 4 * 3600
+
+
+def test_deletes_entries_it_fully_covers(client):
+    inside = client.post("/api/timers", json=entry("10:00", "11:00", "inside")).json()
+    exact = client.post("/api/timers", json=entry("11:00", "12:00", "exact")).json()
+    body = client.post("/api/timers/upsert-resolving-overlaps", json=entry("10:00", "12:00", "cover")).json()
+    assert sorted(body["deleted"]) == sorted([inside["id"], exact["id"]])
+    assert day_spans(client) == [("cover", "10:00", "12:00")]
+
+
+def test_touching_entries_are_left_alone(client):
+    client.post("/api/timers", json=entry("08:00", "09:00", "before"))
+    client.post("/api/timers", json=entry("10:00", "11:00", "after"))
+    body = client.post("/api/timers/upsert-resolving-overlaps", json=entry("09:00", "10:00", "between")).json()
+    assert body["trimmed"] == body["deleted"] == body["split"] == []
+    assert len(day_spans(client)) == 3
+
+
+def test_editing_an_entry_does_not_resolve_against_itself(client):
+    own = client.post("/api/timers", json=entry("09:00", "10:00", "own")).json()
+    client.post("/api/timers", json=entry("10:00", "12:00", "other"))
+    body = client.post("/api/timers/upsert-resolving-overlaps", json=entry("09:30", "11:00", "own", id=own["id"])).json()
+    assert body["entry"]["id"] == own["id"] and len(body["trimmed"]) == 1
+    assert day_spans(client) == [("other", "11:00", "12:00"), ("own", "09:30", "11:00")]
+
+
+def test_rejects_an_end_before_the_start(client):
+    response = client.post("/api/timers/upsert-resolving-overlaps", json=entry("10:00", "09:00"))
+    assert response.status_code == 400
@@ -0,0 +1,83 @@
+import pytest
+from storage.json_engine import JsonFileEngine
+from storage.sqlite_engine import SqliteEngine
+
+DAYS = {
+    "2024-05-05": ["a", "b"],
+    "2024-05-06": ["c"],
+    "2024-06-01": ["d", "e", "f"],
+}
+
+
+def entry(entry_id: str, date: str, project: str = "Alpha") -> dict:
+    return {"id": entry_id, "project": project, "category": "Work", "description": entry_id,
+            "start_time": f"{date}T09:00:00+00:00", "end_time": None, "duration": 600, "date": date}
+
+
+@pytest.fixture
+def json_data(tmp_path):
+    """A data directory of JSON day files, settings and a running timer"""
+    source = JsonFileEngine(str(tmp_path), cache_size=0)
+    for date, ids in DAYS.items():
+        # A stale total, which the import recomputes
+        source.save_day(date, {"date": date, "entries": [entry(entry_id, date) for entry_id in ids], "total_duration": 1})
+    source.save_settings({"projects": ["Alpha"], "categories": ["Work"], "project_colors": {}, "category_colors": {}})
+    source.save_active_timer({"project": "Alpha", "start_time": "2024-06-01T10:00:00+00:00"})
+    return tmp_path
+
+
+def test_migrates_json_data_on_first_start(json_data):
+    engine = SqliteEngine(str(json_data))
+    engine.start()
+    assert engine.stats() == {"engine": "sqlite", "days": 3, "entries": 6}
+    assert engine.list_dates() == sorted(DAYS)
+    day = engine.load_day("2024-06-01")
+    assert [e["id"] for e in day["entries"]] == ["d", "e", "f"] and day["total_duration"] == 1800
+    assert engine.find_entry_date("c") == "2024-05-06"
+    assert [e["id"] for e in engine.iter_entries("2024-05-06", "2024-06-01")] == ["c", "d", "e", "f"]
+    assert engine.load_settings()["projects"] == ["Alpha"]
+    assert engine.load_active_timer()["project"] == "Alpha"
+    engine.close()
+
+
+def test_restart_does_not_import_again(json_data):
+    engine = SqliteEngine(str(json_data))
+    engine.start()
+    engine.save_day("2024-05-05", {"date": "2024-05-05", "entries": [entry("a", "2024-05-05")], "total_duration": 600})
+    engine.close()
+    # A JSON file left behind (or written later) must not be imported over the database
+    JsonFileEngine(str(json_data), cache_size=0).save_day(
+        "2024-07-01", {"date": "2024-07-01", "entries": [entry("z", "2024-07-01")], "total_duration": 600})
+
+    restarted = SqliteEngine(str(json_data))
+    restarted.start()
+    assert restarted.stats() == {"engine": "sqlite", "days": 3, "entries": 5}
+    assert [e["id"] for e in restarted.load_day("2024-05-05")["entries"]] == ["a"]
+    assert restarted.find_entry_date("z") is None
+    restarted.close()
+
+
+def test_interrupted_import_is_redone(json_data, monkeypatch):
+    import storage.migrate
+
+    monkeypatch.setattr(storage.migrate, "BATCH_DAYS", 1)
+    save_days = SqliteEngine.save_days
+    calls = []
+
+    def crash_on_second_batch(self, days):
+        calls.append(days)
+        if len(calls) == 2:
+            raise RuntimeError("killed mid-import")
+        save_days(self, days)
+
+    monkeypatch.setattr(SqliteEngine, "save_days", crash_on_second_batch)
+    engine = SqliteEngine(str(json_data))
+    with pytest.raises(RuntimeError):
+        engine.start()
+    engine.close()
+    monkeypatch.setattr(SqliteEngine, "save_days", save_days)
+
+    restarted = SqliteEngine(str(json_data))
+    restarted.start()
+    assert restarted.stats() == {"engine": "sqlite", "days": 3, "entries": 6}
+    restarted.close()
@@ -0,0 +1,132 @@
+import os
+import storage.wal_engine
+from storage.json_engine import JsonFileEngine
+from storage.wal_engine import WalEngine
+
+
+def open_wal(data_dir) -> WalEngine:
+    engine = WalEngine(str(data_dir), JsonFileEngine(str(data_dir), cache_size=0))
+    engine.start()
+    return engine
+
+
+def crash(engine: WalEngine) -> None:
+    """Stop the engine the way a killed process would: no final compaction"""
+    engine._stop.set()
+    engine._compactor.join()
+    engine._segment.close()
+
+
+def entry(entry_id: str | None, date: str, duration: int = 600, **fields) -> dict:
+    return {"id": entry_id, "project": "Alpha", "category": "Work", "description": "",
+            "start_time": f"{date}T09:00:00+00:00", "end_time": None, "duration": duration, "date": date, **fields}
+
+
+def day(date: str, *entries) -> dict:
+    return {"date": date, "entries": list(entries), "total_duration": sum(e["duration"] for e in entries)}
+
+
+def log_files(data_dir) -> list[str]:
+    return sorted(os.listdir(os.path.join(data_dir, "wal")))
+
+
+def day_files(data_dir) -> list[str]:
+    return sorted(name for name in os.listdir(data_dir) if name.endswith(".json") and name[0].isdigit())
+
+
+def write_sample(engine: WalEngine) -> None:
+    engine.save_day("2024-05-05", day("2024-05-05", entry("a", "2024-05-05"), entry("b", "2024-05-05")))
+    engine.save_day("2024-05-05", day("2024-05-05", entry("a", "2024-05-05", 1200, description="edited")))
+    engine.save_day("2024-05-06", day("2024-05-06", entry(None, "2024-05-06")))  # no id: logged as a whole day
+    engine.save_settings({"projects": ["Alpha"], "categories": []})
+    engine.save_active_timer({"project": "Alpha"})
+
+
+def assert_sample(engine: WalEngine) -> None:
+    assert engine.list_dates() == ["2024-05-05", "2024-05-06"]
+    assert engine.load_day("2024-05-05") == day("2024-05-05", entry("a", "2024-05-05", 1200, description="edited"))
+    assert engine.load_day("2024-05-06")["entries"][0]["id"] is None
+    assert engine.load_settings() == {"projects": ["Alpha"], "categories": []}
+    assert engine.load_active_timer() == {"project": "Alpha"}
+
+
+def test_writes_only_append_to_the_log(tmp_path):
+    engine = open_wal(tmp_path)
+    write_sample(engine)
+    assert_sample(engine)
+    assert day_files(tmp_path) == [] and engine.stats()["pending_days"] == 2
+    engine.close()
+
+
+def test_replay_after_crash(tmp_path):
+    engine = open_wal(tmp_path)
+    write_sample(engine)
+    crash(engine)
+
+    recovered = open_wal(tmp_path)
+    assert_sample(recovered)
+    assert day_files(tmp_path) == []
+    recovered.close()
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    engine = open_wal(tmp_path)
+    write_sample(engine)
+    crash(engine)
+    last = os.path.join(tmp_path, "wal", log_files(tmp_path)[-1])
+    with open(last, "a", encoding="utf-8") as f:
+        f.write('{"op": "put", "date": "2024-05-05", "entry": {"id": "torn"')
+
+    recovered = open_wal(tmp_path)
+    assert_sample(recovered)
+    # New writes go to a fresh segment, never after the torn line
+    recovered.save_day("2024-05-07", day("2024-05-07", entry("c", "2024-05-07")))
+    crash(recovered)
+    again = open_wal(tmp_path)
+    assert again.list_dates() == ["2024-05-05", "2024-05-06", "2024-05-07"]
+    again.close()
+
+
+def test_segment_rollover(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage.wal_engine, "WAL_SEGMENT_BYTES", 512)
+    engine = open_wal(tmp_path)
+    entries = []
+    for n in range(20):
+        entries.append(entry(f"e{n}", "2024-05-05", description="x" * 100))
+        engine.save_day("2024-05-05", day("2024-05-05", *entries))
+    assert len(log_files(tmp_path)) > 3
+    crash(engine)
+
+    recovered = open_wal(tmp_path)
+    assert recovered.load_day("2024-05-05") == day("2024-05-05", *entries)
+    recovered.close()
+
+
+def test_compaction_writes_day_files_and_drops_sealed_segments(tmp_path):
+    engine = open_wal(tmp_path)
+    write_sample(engine)
+    assert engine.compact() == 2
+    assert day_files(tmp_path) == ["2024-05-05.json", "2024-05-06.json"]
+    assert len(log_files(tmp_path)) == 1 and engine.stats()["pending_days"] == 0
+    assert_sample(engine)
+
+    # Changes after a compaction are replayed on top of the day files
+    engine.save_day("2024-05-06", day("2024-05-06"))
+    crash(engine)
+    recovered = open_wal(tmp_path)
+    assert recovered.load_day("2024-05-06") == day("2024-05-06")
+    assert recovered.load_day("2024-05-05")["entries"][0]["description"] == "edited"
+    recovered.close()
+
+
+def test_close_compacts_everything(tmp_path):
+    engine = open_wal(tmp_path)
+    write_sample(engine)
+    engine.close()
+    assert day_files(tmp_path) == ["2024-05-05.json", "2024-05-06.json"]
+    assert all(os.path.getsize(os.path.join(tmp_path, "wal", name)) == 0 for name in log_files(tmp_path))
+
+    reopened = open_wal(tmp_path)
+    assert_sample(reopened)
+    assert reopened.stats()["pending_days"] == 0
+    reopened.close()
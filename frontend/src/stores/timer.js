@@ -2,6 +2,7 @@ import { writable, get } from 'svelte/store';
 import axios from 'axios';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
+const DESCRIPTION_DEBOUNCE_MS = 500;
 
 function createTimerStore() {
   const { subscribe, set, update } = writable({
@@ -16,6 +17,35 @@ function createTimerStore() {
     synced: false,
   });
 
+  // Field edits are merged and sent together in one PATCH
+  let pendingFields = {};
+  let flushTimeout = null;
+
+  async function flushUpdates() {
+    clearTimeout(flushTimeout);
+    flushTimeout = null;
+    const fields = pendingFields;
+    pendingFields = {};
+    const state = get({ subscribe });
+    if (Object.keys(fields).length === 0 || !state.isRunning || !state.synced) {
+      return;
+    }
+    try {
+      await axios.patch(`${API_URL}/timer/active`, fields);
+    } catch (error) {
+      console.error('Error updating timer:', error);
+    }
+  }
+
+  function queueUpdate(fields, delay) {
+    pendingFields = { ...pendingFields, ...fields };
+    clearTimeout(flushTimeout);
+    if (delay <= 0) {
+      return flushUpdates();
+    }
+    flushTimeout = setTimeout(flushUpdates, delay);
+  }
+
   return {
     subscribe,
     
@@ -86,6 +116,8 @@ function createTimerStore() {
     })),
     
     resetTimer: async () => {
+      clearTimeout(flushTimeout);
+      pendingFields = {};
       try {
         await axios.delete(`${API_URL}/timer/discard`);
       } catch (error) {
@@ -111,49 +143,68 @@ function createTimerStore() {
     
     setProject: async (project) => {
       update(state => ({ ...state, project }));
-      const state = get({ subscribe });
-      if (state.isRunning && state.synced) {
-        try {
-          await axios.put(`${API_URL}/timer/update`, null, {
-            params: { project }
-          });
-        } catch (error) {
-          console.error('Error updating timer project:', error);
-        }
-      }
+      await queueUpdate({ project }, 0);
     },
     
     setCategory: async (category) => {
       update(state => ({ ...state, category }));
-      const state = get({ subscribe });
-      if (state.isRunning && state.synced) {
-        try {
-          await axios.put(`${API_URL}/timer/update`, null, {
-            params: { category }
-          });
-        } catch (error) {
-          console.error('Error updating timer category:', error);
-        }
-      }
+      await queueUpdate({ category }, 0);
     },
     
+    // Description changes on every keystroke, so wait for typing to pause
     setDescription: async (description) => {
       update(state => ({ ...state, description }));
+      await queueUpdate({ description }, DESCRIPTION_DEBOUNCE_MS);
+    },
+    
+    // Apply a timer change pushed by the backend (e.g. from another tab)
+    applyServerEvent: async (type, data) => {
       const state = get({ subscribe });
-      if (state.isRunning && state.synced) {
-        try {
-          await axios.put(`${API_URL}/timer/update`, null, {
-            params: { description }
-          });
-        } catch (error) {
-          console.error('Error updating timer description:', error);
+      if (type === 'resync') {
+        const active = await timerStore.syncWithBackend();
+        if (!active && state.synced) {
+          await timerStore.applyServerEvent('timer.discarded', { id: state.backendId });
+        }
+      } else if (type === 'timer.started' && state.backendId !== data.timer.id) {
+        set({
+          isRunning: true,
+          startTime: new Date(data.timer.start_time).getTime(),
+          elapsedSeconds: 0,
+          stoppedTime: null,
+          project: data.timer.project || '',
+          category: data.timer.category || '',
+          description: data.timer.description || '',
+          backendId: data.timer.id,
+          synced: true,
+        });
+      } else if (type === 'timer.updated' && state.backendId === data.timer.id) {
+        // Fields still waiting to be sent from here are newer than the pushed ones
+        const fields = {};
+        for (const field of ['project', 'category', 'description']) {
+          if (!(field in pendingFields)) fields[field] = data.timer[field] || '';
         }
+        update(s => ({ ...s, ...fields }));
+      } else if ((type === 'timer.stopped' || type === 'timer.discarded') && state.backendId === data.id) {
+        clearTimeout(flushTimeout);
+        pendingFields = {};
+        set({
+          isRunning: false,
+          startTime: null,
+          elapsedSeconds: 0,
+          stoppedTime: null,
+          project: '',
+          category: '',
+          description: '',
+          backendId: null,
+          synced: false,
+        });
       }
     },
     
     // Submit and stop via backend
     submitToBackend: async () => {
       try {
+        await flushUpdates();
         const response = await axios.post(`${API_URL}/timer/stop`);
         set({
           isRunning: false,
@@ -176,3 +227,4 @@ function createTimerStore() {
 }
 
 export const timerStore = createTimerStore();
+export const TIMER_EVENTS = ['timer.started', 'timer.updated', 'timer.stopped', 'timer.discarded', 'resync'];
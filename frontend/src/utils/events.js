@@ -0,0 +1,48 @@
+// Shared Server-Sent Events connection for timer and entry changes
+const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
+
+let source = null;
+let connected = false;
+const handlers = new Map();
+
+function ensureSource() {
+  if (source || typeof EventSource === 'undefined') return;
+  source = new EventSource(`${API_URL}/events`);
+  source.onopen = () => { connected = true; };
+  source.onerror = () => { connected = false; }; // EventSource reconnects by itself
+  for (const type of handlers.keys()) {
+    listen(type);
+  }
+}
+
+function listen(type) {
+  source.addEventListener(type, (event) => {
+    const data = JSON.parse(event.data);
+    for (const handler of handlers.get(type) || []) {
+      handler(type, data);
+    }
+  });
+}
+
+// Call handler(type, data) for each of the given event types; returns an unsubscribe function.
+// A "resync" event means this client missed events and should refetch what it shows.
+export function onServerEvent(types, handler) {
+  for (const type of types) {
+    if (!handlers.has(type)) {
+      handlers.set(type, new Set());
+      if (source) listen(type);
+    }
+    handlers.get(type).add(handler);
+  }
+  ensureSource();
+  return () => {
+    for (const type of types) {
+      handlers.get(type)?.delete(handler);
+    }
+  };
+}
+
+// Whether changes are currently being pushed (if not, callers should refetch themselves)
+export function isLive() {
+  return connected;
+}
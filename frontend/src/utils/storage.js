@@ -156,6 +156,7 @@ export async function syncProjects() {
     
     // Update localStorage with merged list
     localStorage.setItem('customProjects', JSON.stringify(mergedProjects));
+    localStorage.setItem('serverProjects', JSON.stringify(mergedProjects));
     
     return mergedProjects;
   } catch (error) {
@@ -177,6 +178,7 @@ export async function syncCategories() {
     
     // Update localStorage with merged list
     localStorage.setItem('customCategories', JSON.stringify(mergedCategories));
+    localStorage.setItem('serverCategories', JSON.stringify(mergedCategories));
     
     return mergedCategories;
   } catch (error) {
@@ -185,14 +187,56 @@ export async function syncCategories() {
   }
 }
 
-// Sync both projects and categories
+// Names the backend had in the last settings it sent us (null if unknown)
+function getServerNames(key) {
+  const stored = localStorage.getItem(key);
+  return stored ? JSON.parse(stored) : null;
+}
+
+// Sync both projects and categories.
+// GET /changes tells us whether settings changed since the last sync (the
+// version is kept in localStorage), so unchanged lists and colors aren't
+// refetched. Local names the backend doesn't have (e.g. added while
+// offline) are sent on every sync, whether or not settings changed.
 export async function syncAll() {
+  const since = Number(localStorage.getItem('settingsVersion') || 0);
+  let changes;
+  try {
+    const response = await axios.get(`${API_URL}/changes`, { params: { since, entries: false } });
+    changes = response.data;
+  } catch (error) {
+    console.error('Error fetching changes:', error);
+    await Promise.all([syncProjects(), syncCategories()]);
+    colorCache = null;
+    await getColors();
+    return;
+  }
+
+  const settings = changes.settings;
+  if (settings) {
+    localStorage.setItem('serverProjects', JSON.stringify(settings.projects || []));
+    localStorage.setItem('serverCategories', JSON.stringify(settings.categories || []));
+  }
+  const serverProjects = getServerNames('serverProjects');
+  const serverCategories = getServerNames('serverCategories');
+  // Only send names back when this browser has some the backend doesn't
+  const sendProjects = serverProjects === null || getCustomProjects().some(p => !serverProjects.includes(p));
+  const sendCategories = serverCategories === null || getCustomCategories().some(c => !serverCategories.includes(c));
   await Promise.all([
-    syncProjects(),
-    syncCategories()
+    sendProjects
+      ? syncProjects()
+      : settings && localStorage.setItem('customProjects', JSON.stringify(serverProjects)),
+    sendCategories
+      ? syncCategories()
+      : settings && localStorage.setItem('customCategories', JSON.stringify(serverCategories)),
   ]);
-  
-  // Also refresh colors
-  colorCache = null;
+
+  if (settings || sendProjects || sendCategories) {
+    colorCache = null;
+  } else if (!colorCache) {
+    getCachedColors(); // Unchanged since last sync: the localStorage copy is current
+  }
+
   await getColors();
+  localStorage.setItem('settingsVersion', String(changes.version));
 }